@@ -0,0 +1,384 @@
+"""MCP Server 도구 벤치마크
+
+university 스키마(departments, students, courses, enrollments)를 로컬 SQLite에 생성하고
+mcp_server_db.py의 각 도구를 반복 실행해 지연 시간(p50/p95/p99), DB 왕복 횟수,
+최대 메모리를 측정합니다. --agent를 주면 Ollama 대신 결정적인 가짜 채팅 모델로
+에이전트 전체(LLM -> MCP stdio -> DB)를 측정합니다. 결과는 JSON 파일로 저장합니다.
+
+    python benchmark.py --sizes 1000,100000 --repeat 20 --agent --output bench_results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 벤치마크 전용 테이블 (쓰기 도구 측정용)
+SCHEMA = """
+CREATE TABLE departments (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, building VARCHAR(100));
+CREATE TABLE students (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, email VARCHAR(200),
+                       department_id INTEGER REFERENCES departments(id), year INTEGER, gpa REAL);
+CREATE TABLE courses (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, credits INTEGER,
+                      department_id INTEGER NOT NULL REFERENCES departments(id));
+CREATE TABLE enrollments (id INTEGER PRIMARY KEY, student_id INTEGER NOT NULL REFERENCES students(id),
+                          course_id INTEGER NOT NULL REFERENCES courses(id), grade VARCHAR(2), semester VARCHAR(10));
+CREATE TABLE bench_log (id INTEGER PRIMARY KEY, note VARCHAR(100));
+CREATE INDEX ix_students_name ON students(name);
+CREATE INDEX ix_enrollments_student ON enrollments(student_id);
+"""
+
+GRADES = ["A+", "A", "B+", "B", "C+", "C", "D", "F"]
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def generate_sqlite(path: str, students: int, seed: int = 42):
+    """students명 규모의 university DB 생성 (학과 = students/1000, 과목 = students/200, 수강 = students*2)"""
+    rng = random.Random(seed)
+    departments = max(5, students // 1000)
+    courses = max(20, students // 200)
+    enrollments = students * 2
+
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;" + SCHEMA)
+
+    def insert_chunks(sql, rows, chunk=50000):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk:
+                conn.executemany(sql, batch)
+                batch = []
+        if batch:
+            conn.executemany(sql, batch)
+
+    insert_chunks("INSERT INTO departments VALUES (?, ?, ?)",
+                  ((i, f"Department {i}", f"Building {i % 20}") for i in range(1, departments + 1)))
+    insert_chunks("INSERT INTO students VALUES (?, ?, ?, ?, ?, ?)",
+                  ((i, f"Student {i}", f"student{i}@univ.ac.kr", rng.randint(1, departments),
+                    rng.randint(1, 4), round(rng.uniform(1.5, 4.5), 2)) for i in range(1, students + 1)))
+    insert_chunks("INSERT INTO courses VALUES (?, ?, ?, ?)",
+                  ((i, f"Course {i}", rng.choice([1, 2, 3]), rng.randint(1, departments))
+                   for i in range(1, courses + 1)))
+    insert_chunks("INSERT INTO enrollments VALUES (?, ?, ?, ?, ?)",
+                  ((i, rng.randint(1, students), rng.randint(1, courses), rng.choice(GRADES),
+                    f"202{rng.randint(0, 5)}-{rng.randint(1, 2)}") for i in range(1, enrollments + 1)))
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return {"departments": departments, "students": students, "courses": courses, "enrollments": enrollments}
+
+
+def prepare_workdir(workdir: str, sizes: list, seed: int, regenerate: bool) -> dict:
+    """크기별 SQLite DB와 connections.json 생성 (같은 크기/시드의 DB는 재사용)"""
+    os.makedirs(workdir, exist_ok=True)
+    connections = {}
+    tables = {}
+    for size in sizes:
+        path = os.path.abspath(os.path.join(workdir, f"university_{size}_{seed}.db"))
+        meta_path = path + ".json"
+        if regenerate or not os.path.exists(path) or not os.path.exists(meta_path):
+            started = time.perf_counter()
+            counts = generate_sqlite(path, size, seed)
+            counts["generate_sec"] = round(time.perf_counter() - started, 2)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(counts, f)
+            print(f"generated {path} in {counts['generate_sec']}s", file=sys.stderr)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            tables[size] = json.load(f)
+        name = f"bench_{size}"
+        connections[name] = {"description": f"벤치마크용 university DB (학생 {size:,}명)",
+                             "url": f"sqlite:///{path}"}
+        # query_databases 측정용 - 같은 파일을 다른 이름으로 한 번 더 등록
+        connections[f"{name}_copy"] = {"description": f"{name} 복사본", "url": f"sqlite:///{path}"}
+    with open(os.path.join(workdir, "connections.json"), "w", encoding="utf-8") as f:
+        json.dump(connections, f, ensure_ascii=False, indent=2)
+    return tables
+
+
+def tool_scenarios(db: str, size: int) -> list:
+    """(이름, 도구, 인자) 목록 - 읽기 도구를 먼저, 쓰기 도구는 마지막에 측정"""
+    mid = max(1, size // 2)
+    csv_rows = "\n".join(["id,note"] + [f"{i},bulk" for i in range(1, 1001)])
+    return [
+        ("list_databases", "list_databases", {}),
+        ("list_tables", "list_tables", {"database": db}),
+        ("list_tables_exact", "list_tables", {"database": db, "exact": True}),
+        ("show_data", "show_data", {"database": db, "table": "students", "limit": 20}),
+        ("show_data_tsv", "show_data", {"database": db, "table": "students", "limit": 20, "format": "tsv"}),
+        ("show_data_page_10", "show_data_pages", {"database": db, "table": "enrollments", "limit": 50, "pages": 10}),
+        ("search_exact", "search_data", {"database": db, "table": "students", "column": "name",
+                                         "value": f"Student {mid}", "match": "exact"}),
+        ("search_prefix", "search_data", {"database": db, "table": "students", "column": "name",
+                                          "value": f"Student {mid}", "match": "prefix"}),
+        ("search_contains", "search_data", {"database": db, "table": "students", "column": "email",
+                                            "value": f"student{mid}@"}),
+        ("join_2", "join_tables", {"database": db, "table1": "enrollments", "table2": "students"}),
+        ("join_3", "join_tables", {"database": db, "table1": "enrollments", "table2": "students",
+                                   "extra_tables": "departments"}),
+        ("run_query_aggregate", "run_query", {"database": db, "format": "tsv",
+                                              "sql": "SELECT department_id, COUNT(*) AS n, AVG(gpa) AS gpa "
+                                                     "FROM students GROUP BY department_id"}),
+        ("query_databases", "query_databases", {"databases": f"{db},{db}_copy", "format": "tsv",
+                                                "sql": "SELECT COUNT(*) AS n FROM enrollments"}),
+        ("profile_table", "profile_table", {"database": db, "table": "enrollments", "format": "tsv"}),
+        ("find_schema", "find_schema", {"question": "average gpa of students by department", "database": db}),
+        ("server_status", "server_status", {}),
+        ("add_data", "add_data_cycle", {"database": db}),
+        ("update_data", "update_data", {"database": db, "table": "students", "set_data": "year:2",
+                                        "condition": f"id:{mid}"}),
+        ("bulk_insert_1000", "bulk_cycle", {"database": db, "data": csv_rows}),
+    ]
+
+
+class RoundTripCounter:
+    """SQLAlchemy 이벤트로 실행된 SQL 문 수 집계"""
+
+    def __init__(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        self.count = 0
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+async def call_tool(server, tool: str, args: dict, state: dict):
+    """도구 호출 - 여러 번의 호출로 이루어진 시나리오(페이지 넘김, 추가/삭제 반복) 포함"""
+    if tool == "show_data_pages":
+        cursor = ""
+        args = dict(args)
+        pages = args.pop("pages")
+        for _ in range(pages):
+            output = await server.show_data(cursor=cursor, format="tsv", **args)
+            marker = "next_cursor="
+            if marker not in output:
+                break
+            cursor = output.split(marker, 1)[1].strip()
+        return output
+    if tool == "add_data_cycle":
+        # 같은 id를 추가한 뒤 삭제해 DB 크기를 유지 (삭제 시간도 함께 측정)
+        state["log_id"] = state.get("log_id", 1000000) + 1
+        output = await server.add_data(args["database"], "bench_log", f"id:{state['log_id']},note:add")
+        await server.delete_data(args["database"], "bench_log", f"id:{state['log_id']}")
+        return output
+    if tool == "bulk_cycle":
+        output = await server.bulk_insert(args["database"], "bench_log", data=args["data"])
+        await server.delete_data(args["database"], "bench_log", "note:bulk", batch_size=500)
+        return output
+    return await getattr(server, tool)(**args)
+
+
+async def bench_tools(server, databases: list, sizes: dict, repeat: int, warmup: int) -> list:
+    counter = RoundTripCounter()
+    results = []
+    for db, size in databases:
+        for name, tool, args in tool_scenarios(db, size):
+            state = {}
+            for _ in range(warmup):
+                await call_tool(server, tool, args, state)
+
+            timings, trips, output = [], [], ""
+            for _ in range(repeat):
+                before = counter.count
+                started = time.perf_counter()
+                output = await call_tool(server, tool, args, state)
+                timings.append((time.perf_counter() - started) * 1000)
+                trips.append(counter.count - before)
+
+            # 메모리는 tracemalloc 오버헤드가 시간 측정에 섞이지 않도록 따로 한 번 측정
+            tracemalloc.start()
+            await call_tool(server, tool, args, state)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            error = output.startswith(("Error", "❌")) or " error:" in output.split("\n", 1)[0]
+            results.append({
+                "database": db,
+                "rows": sizes[size],
+                "scenario": name,
+                "tool": tool,
+                "repeat": repeat,
+                "p50_ms": round(percentile(timings, 50), 3),
+                "p95_ms": round(percentile(timings, 95), 3),
+                "p99_ms": round(percentile(timings, 99), 3),
+                "mean_ms": round(statistics.fmean(timings), 3),
+                "max_ms": round(max(timings), 3),
+                "round_trips": round(statistics.fmean(trips), 2),
+                "peak_memory_kb": round(peak / 1024, 1),
+                "output_bytes": len(output.encode("utf-8")),
+                "error": output.split("\n", 1)[0][:200] if error else None,
+            })
+            print(f"{db:>16} {name:<22} p50 {results[-1]['p50_ms']:>9.2f} ms  p95 {results[-1]['p95_ms']:>9.2f} ms  "
+                  f"trips {results[-1]['round_trips']:>6}  peak {results[-1]['peak_memory_kb']:>9.1f} KB"
+                  + (f"  ERROR {results[-1]['error']}" if error else ""), file=sys.stderr)
+    return results
+
+
+def scripted_chat_model(database: str):
+    """Ollama 대신 사용하는 결정적 채팅 모델
+
+    질문을 받으면 show_data 호출을 요청하고, 도구 결과를 받으면 고정된 답변을 반환합니다.
+    """
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, ToolMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class ScriptedChatModel(BaseChatModel):
+        @property
+        def _llm_type(self) -> str:
+            return "scripted"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            if isinstance(messages[-1], ToolMessage):
+                message = AIMessage(content=f"조회 결과입니다.\n{messages[-1].content[:200]}")
+            else:
+                message = AIMessage(content="", tool_calls=[{
+                    "name": "show_data", "id": f"call_{len(messages)}",
+                    "args": {"database": database, "table": "students", "limit": 10},
+                }])
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    return ScriptedChatModel()
+
+
+async def bench_agent(workdir: str, database: str, repeat: int, transport: str) -> dict:
+    """에이전트 전체 경로 측정 (가짜 LLM -> langchain-mcp-adapters -> mcp_server_db.py -> SQLite)"""
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+    from langgraph.prebuilt import create_react_agent
+
+    server_process = None
+    if transport == "stdio":
+        connection = {"transport": "stdio", "command": sys.executable,
+                      "args": [os.path.join(REPO_DIR, "mcp_server_db.py")],
+                      "cwd": os.path.abspath(workdir), "env": dict(os.environ)}
+    else:
+        port = 18765
+        server_process = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_DIR, "mcp_server_db.py"), "--transport", "streamable-http",
+             "--port", str(port)], cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        connection = {"transport": "streamable_http", "url": f"http://127.0.0.1:{port}/mcp"}
+
+    try:
+        client = MultiServerMCPClient({"bench": connection})
+        started = time.perf_counter()
+        for attempt in range(50):
+            try:
+                tools = await client.get_tools()
+                break
+            except Exception:
+                if server_process is None or attempt == 49:
+                    raise
+                await asyncio.sleep(0.2)
+        setup_ms = (time.perf_counter() - started) * 1000
+
+        agent = create_react_agent(scripted_chat_model(database), tools)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await agent.ainvoke({"messages": [{"role": "user", "content": "학생 목록 보여줘"}]})
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.wait()
+
+    return {
+        "database": database,
+        "scenario": f"agent_show_data_{transport}",
+        "repeat": repeat,
+        "setup_ms": round(setup_ms, 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP Server tool benchmark")
+    parser.add_argument("--sizes", default="1000,100000",
+                        help="학생 수 목록 (쉼표로 구분, 1000 ~ 10000000), 수강 행 수는 2배")
+    parser.add_argument("--repeat", type=int, default=20, help="도구별 측정 횟수")
+    parser.add_argument("--warmup", type=int, default=2, help="측정 전 실행 횟수")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", default=".bench", help="생성한 DB와 connections.json 저장 위치")
+    parser.add_argument("--regenerate", action="store_true", help="기존 DB가 있어도 다시 생성")
+    parser.add_argument("--with-cache", action="store_true", help="조회 결과 캐시를 켠 상태로 측정")
+    parser.add_argument("--agent", action="store_true", help="가짜 채팅 모델로 에이전트 전체 경로도 측정")
+    parser.add_argument("--agent-transport", choices=["stdio", "streamable-http"], default="stdio")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    tables = prepare_workdir(args.workdir, sizes, args.seed, args.regenerate)
+
+    # 서버 모듈은 import 시 작업 디렉터리의 connections.json을 읽고 환경 변수로 캐시를 설정함
+    if not args.with_cache:
+        os.environ["MCP_RESULT_CACHE_TTL"] = "0"
+    os.environ.setdefault("MCP_SCHEMA_INDEX_DIR", os.path.abspath(os.path.join(args.workdir, "schema_index")))
+    os.chdir(args.workdir)
+    sys.path.insert(0, REPO_DIR)
+    started = time.perf_counter()
+    import mcp_server_db as server
+    import_ms = (time.perf_counter() - started) * 1000
+
+    databases = [(f"bench_{size}", size) for size in sizes]
+    results = asyncio.run(bench_tools(server, databases, tables, args.repeat, args.warmup))
+
+    agent_results = []
+    if args.agent:
+        for db, _ in databases:
+            agent_results.append(asyncio.run(bench_agent(".", db, args.repeat, args.agent_transport)))
+            print(f"{db:>16} {agent_results[-1]['scenario']:<22} p50 {agent_results[-1]['p50_ms']:>9.2f} ms",
+                  file=sys.stderr)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"sizes": sizes, "repeat": args.repeat, "warmup": args.warmup, "seed": args.seed,
+                     "result_cache": args.with_cache},
+        "tables": {f"bench_{size}": counts for size, counts in tables.items()},
+        "server_import_ms": round(import_ms, 3),
+        "tools": results,
+        "agent": agent_results,
+    }
+    output = os.path.join(REPO_DIR, args.output) if not os.path.isabs(args.output) else args.output
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"results written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
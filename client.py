@@ -1,29 +1,128 @@
+import contextvars
 import json
+import os
+import threading
 from langchain_ollama import ChatOllama
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.sessions import create_session
 from langgraph.prebuilt import create_react_agent
+import telemetry
 
-async def create_agent():
-    config_file_path = "mcp_config.json"
+# MCP Server 목록 - 공유 HTTP 서버를 사용하려면 MCP_CONFIG=mcp_config.http.json
+MCP_CONFIG = os.environ.get("MCP_CONFIG", "mcp_config.json")
+
+# 프로세스 전체에서 공유하는 도구 목록 캐시 (Streamlit의 모든 세션이 같은 MCP 클라이언트/도구를 재사용)
+# 도구는 호출마다 새 MCP 세션을 열므로 이벤트 루프에 묶이지 않습니다. 반면 ChatOllama는 처음 사용한
+# 루프에 묶인 httpx 커넥션 풀을 가지므로, 모델과 에이전트는 세션(이벤트 루프)마다 새로 만듭니다.
+_TOOLS_CACHE = {}
+_TOOLS_LOCK = threading.Lock()
+
+# 호출한 클라이언트 세션 ID (host에서 브라우저 세션마다 설정) - 서버의 세션별 공정 대기열에 사용
+CLIENT_SESSION = contextvars.ContextVar("client_session", default=None)
+
+
+class TraceInterceptor:
+    """도구 호출마다 'mcp call <도구>' span을 만들고 traceparent(와 세션 ID)를 요청의 _meta로 서버에 전달
+
+    langchain-mcp-adapters는 call_tool에 _meta를 넘기지 않으므로, 어댑터와 같은 방식
+    (호출마다 새 세션)으로 직접 호출합니다. 서버가 결과의 _meta.spans로 돌려준 span은
+    같은 trace 목록에 추가되어 host에서 단계별 시간을 계산할 수 있습니다.
+    """
+
+    def __init__(self, connections: dict):
+        self.connections = connections
+
+    async def __call__(self, request, handler):
+        connection = self.connections.get(request.server_name)
+        with telemetry.span(f"mcp call {request.name}", server=request.server_name) as call_span:
+            if connection is None:
+                return await handler(request)
+
+            meta = {"traceparent": call_span.traceparent}
+            if CLIENT_SESSION.get():
+                meta["session"] = CLIENT_SESSION.get()
+
+            error = None
+            async with create_session(connection) as session:
+                await session.initialize()
+                try:
+                    result = await session.call_tool(request.name, request.args, meta=meta)
+                except Exception as e:
+                    # 세션 종료 시 예외가 사라지지 않도록 밖에서 다시 발생 (어댑터와 동일)
+                    error = e
+            if error is not None:
+                raise error
+
+            call_span.spans.extend((result.meta or {}).get("spans", []))
+            return result
+
+
+async def _load_tools(config_file_path: str):
     with open(config_file_path, 'r', encoding='utf-8') as f:
         mcp_config = json.load(f)
 
-    client = MultiServerMCPClient(mcp_config)
+    client = MultiServerMCPClient(mcp_config, tool_interceptors=[TraceInterceptor(mcp_config)])
     tools = await client.get_tools()
-    
-    # gpt-oss:20b로 테스트 (1개 tool이므로 문제없을 것)
-    model_name_to_use = "gpt-oss:20b"
-    
+    return client, tools
+
+
+def _build_agent(client, tools, model_name_to_use: str):
     model = ChatOllama(
         model=model_name_to_use,
         temperature=0,
     )
-    
+
     # 에이전트 생성
     agent = create_react_agent(
-        model, 
+        model,
         tools,
         messages_modifier=lambda messages: messages
     )
 
-    return agent, client, model_name_to_use, tools
\ No newline at end of file
+    return agent, client, model_name_to_use, tools
+
+
+async def create_agent(config_file_path: str = None, refresh: bool = False):
+    """에이전트 생성 - 같은 설정의 MCP 클라이언트와 도구 목록이 이미 있으면 재사용
+
+    refresh=True이면 MCP Server의 도구 목록을 다시 읽습니다. 모델과 에이전트는 호출한
+    이벤트 루프에서 사용하도록 매번 새로 만듭니다 (도구 목록 조회에 비해 비용이 작음).
+    """
+    config_file_path = config_file_path or MCP_CONFIG
+
+    # gpt-oss:20b로 테스트 (1개 tool이므로 문제없을 것)
+    model_name_to_use = "gpt-oss:20b"
+
+    key = os.path.abspath(config_file_path)
+    loaded = None
+    if not refresh:
+        with _TOOLS_LOCK:
+            loaded = _TOOLS_CACHE.get(key)
+    if loaded is None:
+        created = await _load_tools(config_file_path)
+        with _TOOLS_LOCK:
+            # 동시에 생성된 경우 먼저 저장된 것을 사용
+            if refresh:
+                _TOOLS_CACHE[key] = created
+            loaded = _TOOLS_CACHE.setdefault(key, created)
+
+    client, tools = loaded
+    return _build_agent(client, tools, model_name_to_use)
+
+
+async def answer_from_results(model_name_to_use: str, question: str, results: list) -> str:
+    """도구 실행 결과로 답변만 생성 (의미 기반 캐시 적중 시 - 계획 단계 없이 LLM 1회 호출)
+
+    results: [(도구 호출, 결과), ...]
+    """
+    model = ChatOllama(
+        model=model_name_to_use,
+        temperature=0,
+    )
+    context = "\n\n".join(f"[{call['name']}({json.dumps(call['args'], ensure_ascii=False)})]\n{result}"
+                          for call, result in results)
+    response = await model.ainvoke([
+        ("system", "You are a database assistant. Answer the user's question using only the tool results below."),
+        ("human", f"Question: {question}\n\nTool results:\n{context}"),
+    ])
+    return response.content
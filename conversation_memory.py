@@ -0,0 +1,114 @@
+import json
+import os
+import re
+from db_format import estimate_tokens
+
+# 대화 메모리 설정 (환경 변수로 변경 가능)
+CHAT_MAX_PROMPT_TOKENS = int(os.environ.get("CHAT_MAX_PROMPT_TOKENS", "4000"))
+CHAT_KEEP_TURNS = int(os.environ.get("CHAT_KEEP_TURNS", "3"))
+CHAT_TOOL_SUMMARY_CHARS = int(os.environ.get("CHAT_TOOL_SUMMARY_CHARS", "200"))
+
+_RESPONSE_MARKER = "# Tool Call Response (호출 응답)"
+
+
+def message_tokens(message: dict) -> int:
+    # 역할/구분자 등 메시지마다 붙는 토큰을 4개로 가정
+    return estimate_tokens(message.get("content") or "") + 4
+
+
+def summarize_tool_info(content: str, max_chars: int = CHAT_TOOL_SUMMARY_CHARS) -> str:
+    """host.py가 저장한 도구 호출 정보(요청 JSON + 응답 markdown)를 한 줄 요약으로 변환"""
+    calls = []
+    request = re.search(r"```json\n# Tool Call Request[^\n]*\n(.*?)\n```", content, re.DOTALL)
+    if request:
+        try:
+            for call in json.loads(request.group(1)):
+                args = ", ".join(f"{key}={val!r}" for key, val in call.get("args", {}).items())
+                calls.append(f"{call.get('name')}({args})")
+        except (ValueError, TypeError, AttributeError):
+            pass
+
+    # 병렬 호출이면 응답 블록이 여러 개 ("# Tool Call Response (호출 응답) - 도구 이름")
+    responses = []
+    for block in content.split(_RESPONSE_MARKER)[1:]:
+        body = block.split("\n", 1)[1] if "\n" in block else ""
+        body = body.split("```", 1)[0]
+        responses.append(" ".join(line.strip() for line in body.splitlines() if line.strip()))
+    response = " / ".join(response for response in responses if response)
+    if len(response) > max_chars:
+        response = response[:max_chars] + "…"
+
+    summary = "[이전 도구 호출] " + ("; ".join(calls) if calls else "도구 호출")
+    if response:
+        summary += f" → {response}"
+    return summary
+
+
+class ConversationMemory:
+    """에이전트에 전달할 대화 기록을 토큰 예산 안으로 줄임
+
+    - 최근 keep_turns개의 턴(사용자 질문부터 다음 질문 전까지)은 그대로 유지
+    - 그보다 오래된 도구 호출 결과는 한 줄 요약으로 대체
+    - 그래도 예산을 넘으면 가장 오래된 턴부터 제외 (마지막 질문은 항상 유지)
+    """
+
+    def __init__(self, max_tokens: int = CHAT_MAX_PROMPT_TOKENS, keep_turns: int = CHAT_KEEP_TURNS,
+                 tool_summary_chars: int = CHAT_TOOL_SUMMARY_CHARS):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.tool_summary_chars = tool_summary_chars
+
+    @staticmethod
+    def _split_turns(messages: list) -> list:
+        turns = [[]]
+        for message in messages:
+            if message["role"] == "user" and turns[-1]:
+                turns.append([])
+            turns[-1].append(message)
+        return [turn for turn in turns if turn]
+
+    def _compact_turn(self, turn: list) -> list:
+        compacted = []
+        for message in turn:
+            if message["role"] == "tool":
+                # 오래된 도구 결과는 요약해서 assistant 메모로 전달
+                compacted.append({"role": "assistant",
+                                  "content": summarize_tool_info(message["content"], self.tool_summary_chars)})
+            else:
+                compacted.append({"role": message["role"], "content": message["content"]})
+        return compacted
+
+    def build(self, messages: list):
+        """(에이전트에 전달할 메시지 목록, 통계) 반환
+
+        통계: original_tokens, prompt_tokens, saved_tokens, summarized, dropped_turns
+        """
+        original_tokens = sum(message_tokens(message) for message in messages)
+        turns = self._split_turns(messages)
+
+        recent = max(1, self.keep_turns)
+        old_turns, recent_turns = turns[:-recent], turns[-recent:]
+        summarized = sum(1 for turn in old_turns for message in turn if message["role"] == "tool")
+        compacted = [self._compact_turn(turn) for turn in old_turns] + \
+                    [[dict(message) for message in turn] for turn in recent_turns]
+
+        # 예산을 넘으면 오래된 턴부터 제외 (최근 턴이라도 마지막 턴 전까지는 제외 대상)
+        dropped = 0
+        total = sum(message_tokens(message) for turn in compacted for message in turn)
+        while total > self.max_tokens and len(compacted) > 1:
+            total -= sum(message_tokens(message) for message in compacted.pop(0))
+            dropped += 1
+
+        prompt = [message for turn in compacted for message in turn]
+        if dropped:
+            prompt.insert(0, {"role": "assistant", "content": f"(이전 대화 {dropped}개 턴은 생략되었습니다)"})
+        prompt_tokens = sum(message_tokens(message) for message in prompt)
+
+        stats = {
+            "original_tokens": original_tokens,
+            "prompt_tokens": prompt_tokens,
+            "saved_tokens": max(0, original_tokens - prompt_tokens),
+            "summarized": summarized,
+            "dropped_turns": dropped,
+        }
+        return prompt, stats
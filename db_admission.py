@@ -0,0 +1,203 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from telemetry import Histogram
+
+# DB별 동시 실행 제한 설정 (환경 변수로 변경 가능, connections.json의 "admission"으로 DB별 변경 가능)
+ADMISSION_READ = int(os.environ.get("MCP_ADMISSION_READ", "0"))       # 0이면 커넥션 풀 크기(pool_size)
+ADMISSION_WRITE = int(os.environ.get("MCP_ADMISSION_WRITE", "2"))
+ADMISSION_QUEUE = int(os.environ.get("MCP_ADMISSION_QUEUE", "50"))     # lane별 최대 대기 호출 수
+ADMISSION_WAIT = float(os.environ.get("MCP_ADMISSION_WAIT", "10"))     # 최대 대기 시간(초)
+
+# 대기 시간 분위수(stats)를 계산할 최근 표본 수 - 히스토그램 구간 상한값은 대기가 없어도 1ms로 보이므로
+WAIT_SAMPLES = 1024
+
+
+class AdmissionRejected(Exception):
+    """대기열이 가득 찼거나 대기 시간이 지나 실행하지 않은 호출 (클라이언트는 잠시 후 재시도)"""
+
+
+class _Lane:
+    """DB 하나의 읽기 또는 쓰기 lane - 동시 실행 수 제한과 세션별 대기열
+
+    빈 자리가 생기면 세션 순서대로 돌아가며(round robin) 다음 호출을 실행하므로,
+    한 세션이 호출을 많이 쌓아도 다른 세션의 호출이 그 뒤에서 계속 기다리지 않습니다.
+    """
+
+    def __init__(self, limit: int, max_queue: int, max_wait: float):
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.running = 0
+        self.waiting = 0
+        self._queues = OrderedDict()   # 세션 -> deque[Future] (다음 차례인 세션이 앞)
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait = Histogram()
+        self._waits = deque(maxlen=WAIT_SAMPLES)   # 최근 대기 시간(초)
+
+    async def acquire(self, session) -> float:
+        """실행 자리를 얻을 때까지 대기 - 대기한 시간(초) 반환"""
+        if self.running < self.limit and not self.waiting:
+            self.running += 1
+            self._admit(0.0)
+            return 0.0
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(f"{self.running} call(s) running and {self.waiting} waiting "
+                                    f"(queue limit {self.max_queue})")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session, deque()).append(future)
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            # 제한 시간과 같은 때에 자리를 받았으면 (release()가 이미 running을 넘겨줌) 다음 호출에 넘김
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._forget(session, future)
+            self.timeouts += 1
+            raise AdmissionRejected(f"waited {self.max_wait:g}s with {self.running} call(s) running "
+                                    f"and {self.waiting} waiting") from None
+        except asyncio.CancelledError:
+            # 자리를 받은 직후에 취소되면 다음 호출에 넘김
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._forget(session, future)
+            raise
+        waited = time.perf_counter() - started
+        self._admit(waited)
+        return waited
+
+    def _admit(self, waited: float):
+        self.admitted += 1
+        self.wait.observe(waited)
+        self._waits.append(waited)
+
+    def wait_quantile(self, q: float) -> float:
+        """최근 대기 시간 표본의 분위수(초) - 표본이 없으면 0"""
+        ordered = sorted(self._waits)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+    def _forget(self, session, future):
+        queue = self._queues.get(session)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self.waiting -= 1
+            if not queue:
+                del self._queues[session]
+
+    def release(self):
+        """실행이 끝난 자리를 다음 세션의 대기 호출에 넘김 (대기 호출이 없으면 반납)"""
+        while self._queues:
+            session, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self.waiting -= 1
+            if queue:
+                self._queues.move_to_end(session)
+            else:
+                del self._queues[session]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.running -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "running": self.running,
+            "waiting": self.waiting,
+            "sessions_waiting": len(self._queues),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_ms": {
+                "mean": self.wait.sum / self.wait.count * 1000 if self.wait.count else 0.0,
+                "p50": self.wait_quantile(0.5) * 1000,
+                "p95": self.wait_quantile(0.95) * 1000,
+                "p99": self.wait_quantile(0.99) * 1000,
+            },
+        }
+
+
+class AdmissionController:
+    """DB별 읽기/쓰기 lane으로 도구 호출의 동시 실행 수를 제한
+
+    한 DB에 호출이 몰려도 그 DB의 커넥션 한도를 넘지 않고, 느린 쓰기가 읽기 자리를 차지하지 않습니다.
+    대기열이 가득 차거나 max_wait이 지나면 AdmissionRejected로 바로 거절해 (backpressure)
+    호출이 서버 안에 무한히 쌓이지 않게 합니다. lane은 처음 사용할 때 설정값으로 만들어집니다.
+    """
+
+    def __init__(self, read: int = ADMISSION_READ, write: int = ADMISSION_WRITE,
+                 max_queue: int = ADMISSION_QUEUE, max_wait: float = ADMISSION_WAIT):
+        self.defaults = {"read": read, "write": write, "queue": max_queue, "wait": max_wait}
+        self._lanes = {}   # (database, lane) -> _Lane
+
+    def settings(self, overrides: dict = None) -> dict:
+        """connections.json의 "admission" 항목으로 DB별 한도 변경"""
+        settings = dict(self.defaults)
+        settings.update({key: value for key, value in (overrides or {}).items() if key in settings})
+        return settings
+
+    def _lane(self, database: str, lane: str, overrides: dict = None) -> _Lane:
+        key = (database, lane)
+        if key not in self._lanes:
+            settings = self.settings(overrides)
+            self._lanes[key] = _Lane(settings[lane], settings["queue"], settings["wait"])
+        return self._lanes[key]
+
+    @asynccontextmanager
+    async def admit(self, database: str, lane: str, session, overrides: dict = None):
+        """lane에 자리가 날 때까지 기다린 뒤 블록 실행 - 대기한 시간(초)을 넘겨줌"""
+        entry = self._lane(database, lane, overrides)
+        try:
+            waited = await entry.acquire(session)
+        except AdmissionRejected as e:
+            raise AdmissionRejected(f"'{database}' is busy ({lane}): {e}") from None
+        try:
+            yield waited
+        finally:
+            entry.release()
+
+    def stats(self) -> dict:
+        result = {}
+        for (database, lane), entry in sorted(self._lanes.items()):
+            result.setdefault(database, {})[lane] = entry.stats()
+        return result
+
+    def prometheus(self, prefix: str = "mcp_admission") -> str:
+        """Prometheus text exposition 형식 (lane별 실행 수, 대기열 길이, 대기 시간 히스토그램)"""
+        lanes = sorted(self._lanes.items())
+        lines = []
+        for name, help_text, kind, field in (
+                ("running", "Calls running in the lane", "gauge", "running"),
+                ("queue_depth", "Calls waiting in the lane", "gauge", "waiting"),
+                ("limit", "Concurrent calls allowed in the lane", "gauge", "limit"),
+                ("rejected_total", "Calls rejected because the queue was full", "counter", "rejected"),
+                ("timeouts_total", "Calls rejected after waiting too long", "counter", "timeouts")):
+            lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} {kind}"]
+            for (database, lane), entry in lanes:
+                lines.append(f'{prefix}_{name}{{database="{database}",lane="{lane}"}} {getattr(entry, field)}')
+
+        lines += [f"# HELP {prefix}_wait_seconds Time calls waited for a slot",
+                  f"# TYPE {prefix}_wait_seconds histogram"]
+        for (database, lane), entry in lanes:
+            labels = f'database="{database}",lane="{lane}"'
+            cumulative = 0
+            for bound, n in zip(entry.wait.buckets, entry.wait.counts):
+                cumulative += n
+                lines.append(f'{prefix}_wait_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_wait_seconds_bucket{{{labels},le="+Inf"}} {entry.wait.count}')
+            lines.append(f'{prefix}_wait_seconds_sum{{{labels}}} {entry.wait.sum:.6f}')
+            lines.append(f'{prefix}_wait_seconds_count{{{labels}}} {entry.wait.count}')
+        return "\n".join(lines) + "\n"
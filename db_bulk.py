@@ -0,0 +1,150 @@
+import csv
+import io
+import itertools
+import json
+import os
+import time
+from sqlalchemy import column as sa_column, insert, table as sa_table, text
+
+# 파일 입력을 허용하는 디렉터리 (기본: 비어 있음 = file_path 사용 불가)
+# 서버 작업 디렉터리에는 connections.json(DB 접속 정보)이 있으므로 명시적으로 지정해야 함
+BULK_FILE_DIR = os.environ.get("MCP_BULK_FILE_DIR", "")
+
+INPUT_FORMATS = ("csv", "jsonl")
+
+
+def resolve_input_file(file_path: str) -> str:
+    """파일 경로 확인 - BULK_FILE_DIR이 설정되지 않았거나 그 밖의 파일이면 거부"""
+    if not BULK_FILE_DIR:
+        raise ValueError("File input is disabled. Set MCP_BULK_FILE_DIR to allow file_path, or pass data instead")
+    base = os.path.realpath(BULK_FILE_DIR)
+    path = os.path.realpath(os.path.join(base, file_path))
+    if os.path.commonpath([base, path]) != base:
+        raise ValueError(f"File must be inside {base}")
+    if not os.path.isfile(path):
+        raise ValueError(f"File not found: {file_path}")
+    return path
+
+
+def iter_records(stream, input_format: str):
+    """CSV/JSONL 입력을 한 행씩 dict로 읽음 (전체를 메모리에 올리지 않음)
+
+    CSV 값은 문자열 그대로 전달하고 컬럼 타입 변환은 DB에 맡깁니다 ('007', '010-...'처럼 앞자리 0이
+    있는 코드/전화번호가 숫자로 바뀌지 않도록). 빈 칸은 NULL로 넣습니다.
+    """
+    if input_format == "csv":
+        for row in csv.DictReader(stream):
+            yield {key.strip(): val if val else None
+                   for key, val in row.items() if key is not None}
+    else:
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_no}: {e}")
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {line_no} is not a JSON object")
+            yield record
+
+
+def scan_record_keys(stream, input_format: str) -> dict:
+    """입력 전체의 키 목록 {키: 처음 나온 행 번호} (처음 나온 순서) - 읽은 뒤 stream을 처음으로 되돌림
+
+    JSONL은 행마다 키가 다를 수 있으므로, INSERT 전에 모든 행의 키를 모아 검사해야
+    뒤쪽 행에만 있는 키(또는 오타)가 조용히 버려지지 않습니다. CSV는 헤더만 읽습니다.
+    """
+    keys = {}
+    if input_format == "csv":
+        header = next(csv.reader(stream), [])
+        keys = {key.strip(): 1 for key in header}
+    else:
+        for record_no, record in enumerate(iter_records(stream, input_format), 1):
+            for key in record:
+                keys.setdefault(key, record_no)
+    stream.seek(0)
+    return keys
+
+
+def iter_chunks(records, chunk_size: int):
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _copy_postgres(conn, quoted_table: str, quoted_columns: list, columns: list, chunk: list):
+    """PostgreSQL COPY FROM STDIN (psycopg2)"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for record in chunk:
+        writer.writerow(["\\N" if record.get(col) is None else record.get(col) for col in columns])
+    buf.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {quoted_table} ({', '.join(quoted_columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+    finally:
+        cursor.close()
+
+
+def insert_method(engine, db_type: str) -> str:
+    """DB/드라이버별 가장 빠른 대량 INSERT 방식"""
+    driver = engine.dialect.driver
+    if db_type == 'PostgreSQL' and driver == 'psycopg2':
+        return "COPY"
+    if db_type == 'MySQL':
+        return "multi-row VALUES"
+    if db_type == 'SQLServer' and driver == 'pyodbc':
+        return "fast_executemany"
+    if db_type == 'Oracle':
+        return "executemany (array binding)"
+    return "executemany"
+
+
+def bulk_insert_records(engine, db_type: str, table: str, columns: list, records, chunk_size: int) -> dict:
+    """records를 chunk_size 단위로 나누어 INSERT하고 청크마다 커밋
+
+    실패하면 이미 커밋된 청크는 유지되고, 실패한 청크 번호와 함께 예외가 전달됩니다.
+    """
+    quote = engine.dialect.identifier_preparer.quote
+    method = insert_method(engine, db_type)
+    quoted_table = quote(table)
+    quoted_columns = [quote(col) for col in columns]
+
+    if method == "multi-row VALUES":
+        target = sa_table(table, *[sa_column(col) for col in columns])
+    else:
+        placeholders = ", ".join(f":p{i}" for i in range(len(columns)))
+        insert_sql = text(f"INSERT INTO {quoted_table} ({', '.join(quoted_columns)}) VALUES ({placeholders})")
+
+    rows = 0
+    chunks = 0
+    started = time.perf_counter()
+    for chunk in iter_chunks(records, chunk_size):
+        try:
+            with engine.begin() as conn:
+                if method == "COPY":
+                    _copy_postgres(conn, quoted_table, quoted_columns, columns, chunk)
+                elif method == "multi-row VALUES":
+                    conn.execute(insert(target).values([{col: rec.get(col) for col in columns} for rec in chunk]))
+                else:
+                    conn.execute(insert_sql, [{f"p{i}": rec.get(col) for i, col in enumerate(columns)}
+                                              for rec in chunk])
+        except Exception as e:
+            raise RuntimeError(f"chunk {chunks + 1} failed after {rows:,} committed row(s): {e}") from e
+        rows += len(chunk)
+        chunks += 1
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "chunks": chunks,
+        "elapsed": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed > 0 else 0.0,
+        "method": method,
+    }
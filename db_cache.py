@@ -0,0 +1,144 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# 조회 결과 캐시 설정 (환경 변수로 변경 가능, TTL 0이면 사용 안 함)
+RESULT_CACHE_TTL = float(os.environ.get("MCP_RESULT_CACHE_TTL", "60"))
+RESULT_CACHE_SIZE = int(os.environ.get("MCP_RESULT_CACHE_SIZE", "500"))
+RESULT_CACHE_BYTES = int(os.environ.get("MCP_RESULT_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+
+def normalize_sql(sql: str) -> str:
+    """공백 차이만 있는 같은 쿼리가 같은 키가 되도록 정규화"""
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _freeze(params) -> tuple:
+    if not params:
+        return ()
+    return tuple(sorted((key, repr(val)) for key, val in params.items()))
+
+
+def _estimate_size(value) -> int:
+    """캐시 항목의 대략적인 크기(바이트) - 행 데이터의 문자열 길이 합"""
+    if isinstance(value, (list, tuple)):
+        return 16 + sum(_estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return 16 + sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    if hasattr(value, "_mapping"):  # SQLAlchemy Row
+        return 16 + sum(_estimate_size(item) for item in value)
+    return 8 + len(str(value)) if value is not None else 8
+
+
+class ResultCache:
+    """(DB, 정규화된 SQL, 파라미터) 단위 조회 결과 캐시
+
+    항목마다 읽은 테이블을 태그로 기록해 두고, 서버를 통한 쓰기(INSERT/UPDATE/DELETE/DDL)가
+    일어나면 그 테이블을 읽은 항목만 무효화합니다. 항목 수나 전체 크기가 한도를 넘으면
+    가장 오래 사용하지 않은 항목부터 제거합니다.
+    """
+
+    def __init__(self, ttl: float = RESULT_CACHE_TTL, max_entries: int = RESULT_CACHE_SIZE,
+                 max_bytes: int = RESULT_CACHE_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (만료 시각, 크기, 태그, 값)
+        self._tags = {}                 # (database, table) -> {key, ...}
+        self._generations = {}          # (database, table) -> 무효화 횟수
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get_or_load(self, database: str, statement: str, params, tables, loader):
+        """캐시된 결과 반환, 없으면 loader()를 실행해 저장
+
+        tables는 결과가 의존하는 테이블 목록입니다. 조회하는 동안 해당 테이블에 쓰기가
+        있었다면 (무효화 세대가 바뀌었다면) 결과를 저장하지 않습니다.
+        """
+        if not self.enabled:
+            return loader()
+
+        key = (database, normalize_sql(statement), _freeze(params))
+        tags = tuple(sorted({(database, table.lower()) for table in tables}))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+            if entry is not None:
+                self._remove_locked(key)
+            self.misses += 1
+            generations = self._generations_locked(database, tags)
+
+        value = loader()
+
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if self._generations_locked(database, tags) != generations:
+                return value
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, tags, value)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove_locked(next(iter(self._entries)))
+        return value
+
+    def _generations_locked(self, database: str, tags) -> list:
+        # (database, None)은 DB 전체 무효화 세대
+        return [self._generations.get(tag, 0) for tag in ((database, None),) + tags]
+
+    def _remove_locked(self, key):
+        _, size, tags, _ = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, database: str, table: str = None):
+        """쓰기 후 호출 - table을 읽은 항목만 제거 (table이 없으면 DB 전체)"""
+        with self._lock:
+            self.invalidations += 1
+            tag = (database, table.lower() if table else None)
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            if table is None:
+                keys = [key for key in self._entries if key[0] == database]
+            else:
+                keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                if key in self._entries:
+                    self._remove_locked(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_sec": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,145 @@
+import contextvars
+import logging
+import threading
+
+logger = logging.getLogger("db_cancel")
+
+_SCOPE = contextvars.ContextVar("cancel_scope", default=None)
+_OWNERS = {}                     # id(DBAPI 커넥션) -> 그 커넥션으로 SQL을 실행한 CancelScope
+_OWNERS_LOCK = threading.Lock()
+
+
+class QueryCancelled(Exception):
+    """취소된 작업이 새 SQL 문을 실행하려 할 때"""
+
+
+def cancel_statement(dbapi_conn, cursor, engine):
+    """커넥션에서 실행 중인 문장을 드라이버의 취소 API로 중단 (다른 스레드에서 호출)
+
+    - PostgreSQL(psycopg2/psycopg), Oracle(oracledb): connection.cancel()
+    - MySQL: 별도 커넥션으로 KILL QUERY <connection id> (커넥션은 유지되고 문장만 중단)
+    - SQL Server: pymssql은 dbcancel, pyodbc는 cursor.cancel()
+    - SQLite: connection.interrupt()
+    """
+    dialect = engine.dialect
+    if dialect.name == 'mysql':
+        if hasattr(dbapi_conn, "connection_id"):       # mysql-connector
+            connection_id = dbapi_conn.connection_id
+        else:                                          # pymysql, mysqlclient
+            connection_id = dbapi_conn.thread_id()
+        # 풀이 가득 찬 상황에서도 취소할 수 있도록 풀을 거치지 않고 연결
+        cargs, cparams = dialect.create_connect_args(engine.url)
+        killer = dialect.connect(*cargs, **cparams)
+        try:
+            killer.cursor().execute(f"KILL QUERY {int(connection_id)}")
+        finally:
+            killer.close()
+    elif dialect.name == 'mssql':
+        if hasattr(dbapi_conn, "_conn"):               # pymssql
+            dbapi_conn._conn.cancel()
+        elif cursor is not None:                       # pyodbc
+            cursor.cancel()
+    elif dialect.name == 'sqlite':
+        dbapi_conn.interrupt()
+    else:
+        dbapi_conn.cancel()
+
+
+class CancelScope:
+    """DB 작업 하나가 SQL을 실행한 커넥션 목록
+
+    cancel()은 이벤트 루프 쪽에서 호출되어 작업 스레드에서 실행 중인 문장을 DB에서 중단하고,
+    이후 같은 작업이 새 SQL을 실행하면 QueryCancelled를 발생시킵니다. 작업이 끝나면 close()로
+    닫으며, 닫힌 뒤에는 커넥션이 다른 작업에 재사용될 수 있으므로 cancel()은 아무것도 하지 않습니다.
+    """
+
+    def __init__(self):
+        self.reason = None
+        self.closed = False
+        self._connections = {}     # id(DBAPI 커넥션) -> (DBAPI 커넥션, 마지막 커서, Engine)
+        self._lock = threading.Lock()
+
+    def attach(self, dbapi_conn, cursor, engine):
+        with self._lock:
+            if self.reason:
+                raise QueryCancelled(self.reason)
+            self._connections[id(dbapi_conn)] = (dbapi_conn, cursor, engine)
+        with _OWNERS_LOCK:
+            _OWNERS[id(dbapi_conn)] = self
+
+    def detach(self, dbapi_conn):
+        with self._lock:
+            self._connections.pop(id(dbapi_conn), None)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            connections = list(self._connections)
+            self._connections.clear()
+        with _OWNERS_LOCK:
+            for key in connections:
+                if _OWNERS.get(key) is self:
+                    del _OWNERS[key]
+
+    def cancel(self, reason: str = "cancelled") -> int:
+        """실행 중인 문장 취소 - 취소 요청을 보낸 문장 수 반환"""
+        # 취소하는 동안 close()를 막아 커넥션이 다른 작업으로 넘어가지 않게 함
+        with self._lock:
+            if self.closed or self.reason:
+                return 0
+            self.reason = reason
+            cancelled = 0
+            for dbapi_conn, cursor, engine in self._connections.values():
+                try:
+                    cancel_statement(dbapi_conn, cursor, engine)
+                    cancelled += 1
+                except Exception as e:
+                    logger.warning("failed to cancel statement on %s: %s", engine.url.render_as_string(), e)
+            return cancelled
+
+
+def run_in_scope(scope: CancelScope, func, *args, **kwargs):
+    """작업 스레드에서 scope를 현재 작업으로 지정하고 func 실행 (끝나면 scope를 닫음)"""
+    token = _SCOPE.set(scope)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _SCOPE.reset(token)
+        scope.close()
+
+
+def cancel_all(reason: str = "server shutdown") -> int:
+    """실행 중인 모든 작업의 문장 취소 (서버 종료 시)"""
+    with _OWNERS_LOCK:
+        scopes = set(_OWNERS.values())
+    return sum(scope.cancel(reason) for scope in scopes)
+
+
+def install_cancel_hooks():
+    """SQL 실행 시 커넥션을 현재 작업의 CancelScope에 등록하고, 풀로 반납될 때 해제 (한 번만 등록)
+
+    서버 측 커서로 조금씩 읽는 동안에도 취소할 수 있도록 실행이 끝난 뒤가 아니라
+    커넥션이 풀로 돌아갈 때 해제합니다.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.pool import Pool
+
+    if getattr(install_cancel_hooks, "installed", False):
+        return
+    install_cancel_hooks.installed = True
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        scope = _SCOPE.get()
+        if scope is not None:
+            scope.attach(conn.connection.dbapi_connection, cursor, conn.engine)
+
+    @event.listens_for(Pool, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        if dbapi_connection is None:
+            return
+        with _OWNERS_LOCK:
+            scope = _OWNERS.pop(id(dbapi_connection), None)
+        if scope is not None:
+            scope.detach(dbapi_connection)
@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import inspect, text
+from db_cancel import QueryCancelled
+
+# 스키마 캐시 설정 (환경 변수로 변경 가능)
+SCHEMA_CACHE_TTL = float(os.environ.get("MCP_SCHEMA_CACHE_TTL", "300"))
+SCHEMA_CACHE_SIZE = int(os.environ.get("MCP_SCHEMA_CACHE_SIZE", "2000"))
+
+# DB별 카탈로그 통계(추정 행 수) 조회 쿼리 - 한 번의 쿼리로 모든 테이블의 행 수를 가져옴
+ROW_ESTIMATE_SQL = {
+    'PostgreSQL': """
+        SELECT c.relname, c.reltuples
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p') AND n.nspname = current_schema()
+    """,
+    'MySQL': """
+        SELECT TABLE_NAME, TABLE_ROWS
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE()
+    """,
+    'Oracle': """
+        SELECT TABLE_NAME, NUM_ROWS
+        FROM ALL_TABLES
+        WHERE OWNER = SYS_CONTEXT('USERENV', 'CURRENT_SCHEMA')
+    """,
+    'SQLServer': """
+        SELECT t.name, SUM(p.row_count)
+        FROM sys.dm_db_partition_stats p
+        JOIN sys.tables t ON t.object_id = p.object_id
+        WHERE p.index_id IN (0, 1) AND t.schema_id = SCHEMA_ID()
+        GROUP BY t.name
+    """,
+    # ANALYZE로 수집된 통계 - 각 행의 stat은 "<행 수> ..." 형식 (ANALYZE 전에는 테이블이 없음)
+    'SQLite': """
+        SELECT tbl, MAX(CAST(stat AS INTEGER))
+        FROM sqlite_stat1
+        GROUP BY tbl
+    """,
+}
+
+def estimate_row_counts(engine, db_type: str) -> dict:
+    """카탈로그 통계에서 테이블별 추정 행 수 조회 (테이블명은 소문자 키)
+
+    통계가 없거나(SQLite에서 ANALYZE 전 등) 권한이 없는 경우 빈 dict를 반환합니다.
+    """
+    sql = ROW_ESTIMATE_SQL.get(db_type)
+    if sql is None:
+        return {}
+
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text(sql)).fetchall()
+    except Exception:
+        return {}
+
+    estimates = {}
+    for name, count in rows:
+        # PostgreSQL은 ANALYZE 전 reltuples가 -1, Oracle은 통계 수집 전 NUM_ROWS가 NULL
+        if count is None or count < 0:
+            continue
+        estimates[name.lower()] = int(count)
+    return estimates
+
+
+def exact_row_counts(engine, tables: list, max_connections: int, mapper=map) -> dict:
+    """COUNT(*)로 정확한 행 수 조회
+
+    테이블을 최대 max_connections개의 그룹으로 나누고, 그룹마다 풀에서 커넥션 하나를
+    빌려 mapper로 실행합니다 (서버에서는 DB_EXECUTOR.map으로 병렬 실행). 실패한 테이블은 결과에서 빠지며,
+    작업이 취소되면 남은 테이블을 세지 않고 QueryCancelled를 그대로 발생시킵니다.
+    """
+    if not tables:
+        return {}
+
+    preparer = engine.dialect.identifier_preparer
+    groups = [tables[i::max_connections] for i in range(min(max_connections, len(tables)))]
+
+    def count_group(group):
+        counts = {}
+        with engine.connect() as conn:
+            for table in group:
+                try:
+                    counts[table] = conn.execute(text(f"SELECT COUNT(*) FROM {preparer.quote(table)}")).scalar()
+                except QueryCancelled:
+                    raise
+                except Exception:
+                    conn.rollback()
+        return counts
+
+    result = {}
+    for counts in mapper(count_group, groups):
+        result.update(counts)
+    return result
+
+
+def get_row_counts(engine, db_type: str, tables: list, exact: bool = False, max_connections: int = 4,
+                   mapper=map) -> dict:
+    """테이블별 (행 수, 'estimate' | 'exact' | 'unknown') 반환
+
+    기본은 카탈로그 통계의 추정치만 사용하며, 통계가 없는 테이블은 전체 스캔을 하지 않고
+    (None, 'unknown')으로 반환합니다. exact=True일 때만 모든 테이블을 COUNT(*)로 셉니다.
+    """
+    if exact:
+        return {table: (count, 'exact')
+                for table, count in exact_row_counts(engine, tables, max_connections, mapper).items()}
+
+    estimates = estimate_row_counts(engine, db_type)
+    return {table: (estimates[table.lower()], 'estimate') if table.lower() in estimates else (None, 'unknown')
+            for table in tables}
+
+
+class SchemaCache:
+    """DB별 스키마 메타데이터(테이블, 컬럼, PK, FK, 인덱스) 캐시
+
+    Oracle/SQL Server에서 리플렉션은 가장 느린 작업 중 하나이므로 결과를 TTL 동안
+    재사용합니다. 항목 수가 max_entries를 넘으면 가장 오래 사용하지 않은 항목부터
+    제거하고, DDL을 실행한 경우 invalidate()로 즉시 무효화합니다.
+    """
+
+    def __init__(self, engines, ttl: float = SCHEMA_CACHE_TTL, max_entries: int = SCHEMA_CACHE_SIZE):
+        self._engines = engines
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (database, kind, table) -> (만료 시각, 값)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, database: str, kind: str, table, loader):
+        key = (database, kind, table)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader(inspect(self._engines.get(database)))
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def cached(self, database: str, kind: str, table: str, loader):
+        """임의의 테이블 단위 메타데이터 캐시 (loader는 Inspector를 받아 값을 반환)"""
+        return self._get(database, kind, table, loader)
+
+    def table_names(self, database: str) -> list:
+        return self._get(database, 'tables', None, lambda insp: insp.get_table_names())
+
+    def columns(self, database: str, table: str) -> list:
+        return self._get(database, 'columns', table, lambda insp: insp.get_columns(table))
+
+    def primary_key(self, database: str, table: str) -> list:
+        return self._get(database, 'pk', table,
+                         lambda insp: insp.get_pk_constraint(table).get('constrained_columns') or [])
+
+    def foreign_keys(self, database: str, table: str) -> list:
+        return self._get(database, 'fks', table, lambda insp: insp.get_foreign_keys(table))
+
+    def indexes(self, database: str, table: str) -> list:
+        return self._get(database, 'indexes', table, lambda insp: insp.get_indexes(table))
+
+    def resolve_table(self, database: str, name: str):
+        """대소문자를 무시하고 실제 테이블명 반환 (없으면 None)"""
+        tables = self.table_names(database)
+        if name in tables:
+            return name
+        for table in tables:
+            if table.lower() == name.lower():
+                return table
+        return None
+
+    def resolve_column(self, database: str, table: str, name: str):
+        """대소문자를 무시하고 컬럼 정보(get_columns 항목) 반환 (없으면 None)"""
+        for col in self.columns(database, table):
+            if col['name'] == name or col['name'].lower() == name.lower():
+                return col
+        return None
+
+    def invalidate(self, database: str, table: str = None):
+        """스키마 변경 후 캐시 무효화 (table이 없으면 DB 전체)
+
+        테이블 목록은 어떤 DDL로도 바뀔 수 있으므로 항상 함께 무효화합니다.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] != database:
+                    continue
+                if table is None or key[2] is None or key[2] == table:
+                    del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_sec": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,138 @@
+import math
+import os
+import threading
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+# connections.json 항목에 "pool"이 없을 때 사용하는 기본값
+DEFAULT_POOL_SETTINGS = {
+    "pool_size": 5,          # 유지할 커넥션 수
+    "max_overflow": 10,      # pool_size를 넘어 추가로 열 수 있는 커넥션 수
+    "pool_timeout": 30,      # 풀이 가득 찼을 때 대기 시간(초)
+    "pool_pre_ping": True,   # 체크아웃 시 끊어진 커넥션 감지
+    "pool_recycle": 1800,    # 이 시간(초)보다 오래된 커넥션은 재연결
+    "idle_timeout": 600,     # 이 시간(초) 동안 사용되지 않은 Engine은 풀을 정리
+}
+
+# connections.json 항목에 "connect_timeout"이 없을 때 사용하는 연결 제한 시간(초), 0이면 드라이버 기본값
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("MCP_CONNECT_TIMEOUT", "10"))
+
+# 드라이버별 연결 제한 시간 인자 (연결할 수 없는 호스트에서 OS TCP 제한 시간까지 기다리지 않도록)
+CONNECT_TIMEOUT_ARGS = {
+    "psycopg2": "connect_timeout",
+    "psycopg": "connect_timeout",
+    "pymysql": "connect_timeout",
+    "mysqldb": "connect_timeout",
+    "mysqlconnector": "connection_timeout",
+    "oracledb": "tcp_connect_timeout",
+    "pymssql": "login_timeout",
+    "pyodbc": "timeout",
+}
+
+
+class EngineRegistry:
+    """connections.json 기반 DB별 Engine(커넥션 풀) 레지스트리
+
+    Engine은 처음 사용될 때 생성되고 프로세스가 끝날 때까지 재사용됩니다.
+    idle_timeout 동안 사용되지 않은 Engine은 풀을 비워 원격 DB의 커넥션을 반납합니다.
+    """
+
+    def __init__(self, connections: dict):
+        self._connections = connections
+        self._engines = {}
+        self._last_used = {}
+        self._created_at = {}
+        self._lock = threading.Lock()
+
+    def pool_settings(self, database: str) -> dict:
+        """DB별 풀 설정 (기본값 + connections.json의 "pool" 항목)"""
+        settings = dict(DEFAULT_POOL_SETTINGS)
+        settings.update(self._connections[database].get("pool", {}))
+        return settings
+
+    def connect_timeout(self, database: str) -> float:
+        """DB별 연결 제한 시간(초) - connections.json의 "connect_timeout" 항목 또는 기본값"""
+        return float(self._connections[database].get("connect_timeout", DEFAULT_CONNECT_TIMEOUT))
+
+    def get(self, database: str):
+        """DB 이름에 해당하는 Engine 반환 (없으면 생성)"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle_locked(now, keep=database)
+            engine = self._engines.get(database)
+            if engine is None:
+                engine = self._create_engine(database)
+                self._engines[database] = engine
+                self._created_at[database] = now
+            self._last_used[database] = now
+        return engine
+
+    def _create_engine(self, database: str):
+        url = self._connections[database]["url"]
+        settings = self.pool_settings(database)
+
+        kwargs = {
+            "pool_pre_ping": settings["pool_pre_ping"],
+            "pool_recycle": settings["pool_recycle"],
+        }
+        # SQLite는 파일/메모리 전용 풀을 사용하므로 크기 설정을 넘기지 않음
+        if not url.startswith("sqlite"):
+            kwargs["pool_size"] = settings["pool_size"]
+            kwargs["max_overflow"] = settings["max_overflow"]
+            kwargs["pool_timeout"] = settings["pool_timeout"]
+        # SQL Server(pyodbc)는 executemany를 배열 바인딩으로 실행
+        if url.startswith("mssql+pyodbc"):
+            kwargs["fast_executemany"] = True
+
+        timeout = self.connect_timeout(database)
+        arg = CONNECT_TIMEOUT_ARGS.get(make_url(url).get_dialect().driver)
+        if timeout > 0 and arg:
+            # oracledb만 실수 초를 받음 (libpq는 2초 미만을 2초로 처리)
+            kwargs["connect_args"] = {arg: timeout if arg == "tcp_connect_timeout" else max(2, math.ceil(timeout))}
+
+        return create_engine(url, **kwargs)
+
+    def _evict_idle_locked(self, now: float, keep: str = None):
+        for database in list(self._engines):
+            if database == keep:
+                continue
+            idle_timeout = self.pool_settings(database)["idle_timeout"]
+            if idle_timeout and now - self._last_used[database] > idle_timeout:
+                self._engines.pop(database).dispose()
+                self._last_used.pop(database, None)
+                self._created_at.pop(database, None)
+
+    def evict_idle(self):
+        """idle_timeout이 지난 Engine 정리"""
+        with self._lock:
+            self._evict_idle_locked(time.monotonic())
+
+    def dispose_all(self):
+        """모든 Engine의 커넥션 풀 정리"""
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._last_used.clear()
+            self._created_at.clear()
+
+    def stats(self) -> dict:
+        """생성된 Engine별 풀 상태"""
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for database, engine in self._engines.items():
+                pool = engine.pool
+                info = {
+                    "pool_class": type(pool).__name__,
+                    "age_sec": round(now - self._created_at[database], 1),
+                    "idle_sec": round(now - self._last_used[database], 1),
+                }
+                # QueuePool 계열만 제공하는 통계
+                for name in ("size", "checkedin", "checkedout", "overflow"):
+                    method = getattr(pool, name, None)
+                    if callable(method):
+                        info[name] = method()
+                result[database] = info
+        return result
@@ -0,0 +1,103 @@
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import telemetry
+from db_cancel import CancelScope, cancel_all, run_in_scope
+
+# 서버 전체 설정 (환경 변수로 변경 가능)
+DEFAULT_WORKERS = int(os.environ.get("MCP_DB_WORKERS", "16"))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("MCP_DB_MAX_CONCURRENCY", str(DEFAULT_WORKERS)))
+
+
+class DBExecutor:
+    """동기 DB 작업을 이벤트 루프 밖의 스레드 풀에서 실행
+
+    SQLAlchemy/드라이버 호출은 블로킹이므로 async tool 안에서 그대로 실행하면
+    FastMCP 이벤트 루프 전체가 멈춥니다. 모든 DB 작업은 이 실행기를 거쳐
+    스레드 풀에서 실행되고, 동시에 실행되는 작업 수는 max_concurrency로 제한됩니다.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    async def run(self, func, *args, **kwargs):
+        """func(*args, **kwargs)를 스레드 풀에서 실행하고 결과 반환
+
+        실행 중인 span(contextvars)을 작업 스레드로 넘기므로 SQL 실행 횟수/시간이 호출한 도구에 기록됩니다.
+        기다리는 쪽이 취소되면(클라이언트 취소, 도구 제한 시간) 작업이 실행 중인 SQL도 DB에서 취소하며,
+        동시 실행 슬롯은 작업 스레드가 실제로 끝난 뒤에 반납합니다.
+        """
+        with telemetry.span("db executor", function=getattr(func, "__name__", "task")):
+            queued = time.perf_counter()
+            self.waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+            telemetry.count("queue_ms", (time.perf_counter() - queued) * 1000)
+
+            self.active += 1
+            scope = CancelScope()
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(self._pool, functools.partial(context.run, run_in_scope, scope,
+                                                                        func, *args, **kwargs))
+            future.add_done_callback(self._finished)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 드라이버의 취소 API는 블로킹이므로 기본 실행기에서 호출 (작업 스레드 풀이 가득 차도 실행됨)
+                self.cancelled += 1
+                loop.run_in_executor(None, scope.cancel, "request cancelled")
+                raise
+
+    def map(self, func, items) -> list:
+        """작업 스레드 안에서 func(item)들을 공유 스레드 풀로 나눠 병렬 실행 (결과는 items 순서)
+
+        현재 작업의 컨텍스트(CancelScope, span)를 복사해 넘기므로 나눠 실행한 SQL도 함께 취소되고
+        호출한 도구의 지표에 기록됩니다. 첫 항목은 호출한 스레드가 직접 실행하고, 풀이 가득 차서
+        아직 시작되지 않은 항목도 호출한 스레드가 가져와 실행하므로 교착 상태가 생기지 않습니다.
+        """
+        items = list(items)
+        if not items:
+            return []
+        futures = [self._pool.submit(contextvars.copy_context().run, func, item) for item in items[1:]]
+        try:
+            results = [func(items[0])]
+            for item, future in zip(items[1:], futures):
+                results.append(func(item) if future.cancel() else future.result())
+            return results
+        finally:
+            # 이미 시작된 항목은 끝날 때까지 기다림 (작업이 끝나면 CancelScope가 닫히므로)
+            wait([future for future in futures if not future.cancel()])
+
+    def _finished(self, future):
+        self.active -= 1
+        self.completed += 1
+        self._semaphore.release()
+        if not future.cancelled():
+            future.exception()   # 취소된 요청의 작업 예외는 기다리는 쪽이 없으므로 여기서 확인 처리
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+        }
+
+    def shutdown(self):
+        cancel_all()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,407 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import text
+from db_cache import normalize_sql
+
+# 실행 계획 검사 설정 (환경 변수로 변경 가능, connections.json의 "explain"으로 DB별 변경 가능)
+EXPLAIN_ACTION = os.environ.get("MCP_EXPLAIN_ACTION", "rewrite")        # off | warn | reject | rewrite
+EXPLAIN_MAX_ROWS = int(os.environ.get("MCP_EXPLAIN_MAX_ROWS", "1000000"))
+EXPLAIN_MAX_COST = float(os.environ.get("MCP_EXPLAIN_MAX_COST", "0"))     # 0이면 비용은 검사하지 않음
+EXPLAIN_CACHE_TTL = float(os.environ.get("MCP_EXPLAIN_CACHE_TTL", "600"))
+EXPLAIN_CACHE_SIZE = int(os.environ.get("MCP_EXPLAIN_CACHE_SIZE", "1000"))
+
+EXPLAIN_ACTIONS = ("off", "warn", "reject", "rewrite")
+
+# 같은 판정을 재사용해도 되는 리터럴 - =, <>, !=, LIKE 바로 뒤의 값만 (범위 비교, LIMIT/TOP/FETCH 값은
+# 읽는 행 수를 바꾸므로 그대로 둠)
+_EQUALITY_LITERAL = re.compile(r"((?<![<>!])=|<>|!=|\bLIKE\b)(\s*)('(?:[^']|'')*'|-?\b\d+(?:\.\d+)?\b)",
+                               re.IGNORECASE)
+_FROM_ALIAS = re.compile(r'\b(?:FROM|JOIN)\s+([\w."`\[\]]+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_NOT_ALIAS = {"WHERE", "JOIN", "LEFT", "RIGHT", "INNER", "OUTER", "FULL", "CROSS", "ON", "ORDER", "GROUP",
+              "HAVING", "LIMIT", "OFFSET", "FETCH", "UNION", "USING", "NATURAL", "WINDOW", "FOR"}
+
+
+class PlanRejected(ValueError):
+    """예상 비용이 한도를 넘어 실행하지 않은 쿼리"""
+
+    def __init__(self, verdict: dict):
+        self.verdict = verdict
+        super().__init__(verdict["reason"])
+
+
+def statement_shape(sql: str) -> str:
+    """등호/LIKE 비교 값을 ?로 바꾼 SQL - 찾는 값만 다른 쿼리는 같은 판정을 재사용
+
+    범위 조건(id < 10 / id < 999999999)과 LIMIT/TOP/FETCH 값은 읽는 행 수를 바꾸므로 남겨서
+    다른 모양으로 취급합니다.
+    """
+    return _EQUALITY_LITERAL.sub(r"\1\2?", normalize_sql(sql))
+
+
+def _table_aliases(sql: str) -> dict:
+    aliases = {}
+    for name, alias in _FROM_ALIAS.findall(sql):
+        name = name.strip('"`[]').split(".")[-1].strip('"`[]')
+        aliases[name.lower()] = name
+        if alias and alias.upper() not in _NOT_ALIAS:
+            aliases[alias.lower()] = name
+    return aliases
+
+
+def _node(op: str, table, full: bool, rows, limit) -> dict:
+    return {"op": op, "table": table, "full": full, "rows": rows, "limit": limit}
+
+
+def _min_limit(current, new):
+    if new is None:
+        return current
+    return new if current is None else min(current, new)
+
+
+# ---------------------------------------------------------------- DB별 실행 계획 -> 공통 노드 목록
+# 각 노드의 limit은 그 노드 위에 정렬/집계 같은 블로킹 연산 없이 행 수 제한이 걸려 있을 때의 제한 값
+# (None이면 끝까지 읽음)
+
+_PG_BLOCKING = {"Sort", "Incremental Sort", "Aggregate", "Hash", "Materialize", "WindowAgg", "SetOp",
+                "Recursive Union"}
+_PG_FULL = {"Seq Scan", "Parallel Seq Scan"}
+
+
+def _postgres_plan(conn, sql: str, params: dict, limit):
+    value = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params or {}).scalar()
+    plan = (json.loads(value) if isinstance(value, str) else value)[0]["Plan"]
+    nodes = []
+
+    def walk(node, limit):
+        op = node.get("Node Type", "")
+        if op == "Limit":
+            limit = _min_limit(limit, node.get("Plan Rows"))
+        elif op in _PG_BLOCKING:
+            limit = None
+        if "Relation Name" in node:
+            nodes.append(_node(op, node["Relation Name"], op in _PG_FULL, node.get("Plan Rows"), limit))
+        for child in node.get("Plans", []):
+            walk(child, limit)
+
+    walk(plan, limit)
+    return plan.get("Total Cost"), nodes
+
+
+_MYSQL_BLOCKING = ("grouping_operation", "materialized_from_subquery", "windowing")
+
+
+def _mysql_plan(conn, sql: str, params: dict, limit):
+    value = conn.execute(text(f"EXPLAIN FORMAT=JSON {sql}"), params or {}).scalar()
+    block = json.loads(value)["query_block"]
+    nodes = []
+
+    def walk(value, limit):
+        if isinstance(value, list):
+            for item in value:
+                walk(item, limit)
+            return
+        if not isinstance(value, dict):
+            return
+        if value.get("using_filesort") or value.get("using_temporary_table"):
+            limit = None
+        table = value.get("table")
+        if isinstance(table, dict) and "table_name" in table:
+            nodes.append(_node(table.get("access_type", ""), table["table_name"],
+                               table.get("access_type") in ("ALL", "index"),
+                               table.get("rows_produced_per_join", table.get("rows_examined_per_scan")), limit))
+        for key, child in value.items():
+            if isinstance(child, (dict, list)):
+                walk(child, None if key in _MYSQL_BLOCKING else limit)
+
+    walk(block, limit)
+    cost = block.get("cost_info", {}).get("query_cost")
+    return float(cost) if cost is not None else None, nodes
+
+
+_ORACLE_FULL = {("TABLE ACCESS", "FULL"), ("INDEX", "FAST FULL SCAN"), ("INDEX", "FULL SCAN"),
+                ("MAT_VIEW ACCESS", "FULL")}
+
+
+def _oracle_plan(conn, sql: str, params: dict, limit):
+    # DBMS_XPLAN.DISPLAY가 읽는 PLAN_TABLE을 직접 조회 (행 수/비용을 숫자로 받기 위해)
+    statement_id = f"mcp{os.urandom(6).hex()}"
+    conn.execute(text(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {sql}"), params or {})
+    rows = conn.execute(text(
+        "SELECT id, parent_id, operation, options, object_name, cardinality, cost "
+        "FROM plan_table WHERE statement_id = :sid ORDER BY id"), {"sid": statement_id}).fetchall()
+    conn.execute(text("DELETE FROM plan_table WHERE statement_id = :sid"), {"sid": statement_id})
+    children = {}
+    for row in rows:
+        children.setdefault(row[1], []).append(row)
+    nodes = []
+
+    def walk(row, limit):
+        _, _, operation, options, object_name, cardinality, _ = row
+        options = options or ""
+        if "STOPKEY" in options:
+            limit = _min_limit(limit, cardinality)
+        elif operation in ("SORT", "HASH", "WINDOW"):
+            limit = None
+        if object_name and operation in ("TABLE ACCESS", "INDEX", "MAT_VIEW ACCESS"):
+            nodes.append(_node(f"{operation} {options}".strip(), object_name,
+                               (operation, options) in _ORACLE_FULL, cardinality, limit))
+        for position, child in enumerate(children.get(row[0], [])):
+            # HASH JOIN의 첫 번째 입력(build)은 끝까지 읽음
+            walk(child, None if operation == "HASH JOIN" and position == 0 else limit)
+
+    for root in children.get(None, []):
+        walk(root, limit)
+    return (rows[0][6] if rows else None), nodes
+
+
+_MSSQL_NS = "{http://schemas.microsoft.com/sqlserver/2004/07/showplan}"
+_MSSQL_BLOCKING = {"Sort", "Stream Aggregate", "Table Spool", "Index Spool", "Window Spool"}
+_MSSQL_FULL = {"Table Scan", "Clustered Index Scan", "Index Scan"}
+_MSSQL_META = {"OutputList", "Warnings", "MemoryFractions", "RunTimeInformation", "RunTimePartitionSummary",
+               "InternalInfo"}
+
+
+def _sqlserver_plan(conn, sql: str, params: dict, limit):
+    import xml.etree.ElementTree as ElementTree
+
+    conn.exec_driver_sql("SET SHOWPLAN_XML ON")
+    try:
+        value = conn.execute(text(sql), params or {}).scalar()
+    finally:
+        conn.exec_driver_sql("SET SHOWPLAN_XML OFF")
+    root = ElementTree.fromstring(value)
+    statement = root.find(f".//{_MSSQL_NS}StmtSimple")
+    nodes = []
+
+    def walk(relop, limit):
+        op = relop.get("PhysicalOp", "")
+        if op == "Top":
+            limit = _min_limit(limit, float(relop.get("EstimateRows", 0)))
+        elif op in _MSSQL_BLOCKING:
+            limit = None
+        # RelOp 아래에는 OutputList 등 부가 정보 다음에 연산자 요소(IndexScan, NestedLoops 등)가 옴
+        operators = [child for child in relop if child.tag.replace(_MSSQL_NS, "") not in _MSSQL_META]
+        if not operators:
+            return
+        operator = operators[-1]
+        obj = operator.find(f"{_MSSQL_NS}Object")
+        if obj is not None and obj.get("Table"):
+            # 행 목표(TOP)로 줄어들기 전의 추정치 사용
+            rows = relop.get("EstimateRowsWithoutRowGoal") or relop.get("EstimateRows")
+            nodes.append(_node(op, obj.get("Table").strip("[]"), op in _MSSQL_FULL,
+                               float(rows) if rows else None, limit))
+        for position, child in enumerate(operator.findall(f"{_MSSQL_NS}RelOp")):
+            walk(child, None if op == "Hash Match" and position == 0 else limit)
+
+    first = statement.find(f"{_MSSQL_NS}QueryPlan/{_MSSQL_NS}RelOp") if statement is not None else None
+    if first is not None:
+        walk(first, limit)
+    cost = statement.get("StatementSubTreeCost") if statement is not None else None
+    return float(cost) if cost else None, nodes
+
+
+def _sqlite_plan(conn, sql: str, params: dict, limit):
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params or {}).fetchall()
+    details = [row[-1] for row in rows]
+    # 임시 B-tree(정렬/그룹/중복 제거)가 있으면 모든 입력을 끝까지 읽음
+    if any(detail.startswith("USE TEMP B-TREE") for detail in details):
+        limit = None
+    nodes = []
+    for detail in details:
+        words = detail.split()
+        if len(words) < 2 or words[0] not in ("SCAN", "SEARCH") or words[1] in ("CONSTANT", "SUBQUERY"):
+            continue
+        # SQLite는 행 수를 추정하지 않음 - 필터가 없는 SCAN만 제한 값까지 읽는다고 봄
+        nodes.append(_node(detail, words[1], words[0] == "SCAN", None, limit))
+    return None, nodes
+
+
+_PLANNERS = {
+    "PostgreSQL": _postgres_plan,
+    "MySQL": _mysql_plan,
+    "Oracle": _oracle_plan,
+    "SQLServer": _sqlserver_plan,
+    "SQLite": _sqlite_plan,
+}
+
+
+def explain(conn, db_type: str, sql: str, params: dict = None, limit: int = None, table_rows=None) -> dict:
+    """실행 계획의 예상 비용과 읽는 행 수
+
+    limit: 호출하는 쪽에서 결과를 이 행 수까지만 읽는 경우 (계획에 행 수 제한이 없어도 적용)
+    table_rows: 테이블 이름 목록 -> {이름: 행 수} (카탈로그 통계) - 전체 스캔의 읽는 행 수 추정에 사용
+
+    반환값: {"cost", "rows", "full_scans": [(테이블, 읽는 행 수), ...]}
+    """
+    planner = _PLANNERS.get(db_type)
+    if planner is None:
+        raise ValueError(f"EXPLAIN is not supported for {db_type}")
+    cost, nodes = planner(conn, sql, params, limit)
+
+    aliases = _table_aliases(sql)
+    for node in nodes:
+        node["table"] = aliases.get(str(node["table"]).lower(), node["table"])
+    full_tables = sorted({node["table"] for node in nodes if node["full"]})
+    sizes = table_rows(full_tables) if table_rows and full_tables else {}
+    has_filter = re.search(r"\bWHERE\b", sql, re.IGNORECASE) is not None
+
+    rows = 0
+    full_scans = []
+    for node in nodes:
+        estimate = node["rows"]
+        if not node["full"]:
+            rows += estimate or 0
+            continue
+        total = sizes.get(node["table"], estimate) or 0
+        if node["limit"] is not None:
+            # 블로킹 연산 없이 행 수 제한이 걸린 스캔은 제한 값만큼 찾으면 멈춤
+            # (읽는 행 수 = 제한 값 / 선택도, 선택도를 모르면 필터가 없을 때만 적용)
+            if estimate:
+                total = min(total, math.ceil(node["limit"] * total / max(estimate, 1)))
+            elif not has_filter:
+                total = min(total, math.ceil(node["limit"]))
+        rows += total
+        full_scans.append((node["table"], int(total)))
+    return {"cost": float(cost) if cost is not None else None, "rows": int(rows), "full_scans": full_scans}
+
+
+class PlanGuard:
+    """실행 전 EXPLAIN으로 예상 비용을 확인하고 한도를 넘는 쿼리를 막음
+
+    판정은 (DB, 리터럴을 뺀 SQL, 행 수 제한) 단위로 캐시되므로 같은 모양의 쿼리는
+    EXPLAIN을 다시 실행하지 않습니다. EXPLAIN 자체가 실패하면 (권한 없음 등) 쿼리를 허용합니다.
+
+    action:
+    - off: 검사하지 않음
+    - warn: 실행하되 판정에 경고를 남김
+    - reject: 한도를 넘으면 거부
+    - rewrite: 도구가 준비한 대체 쿼리(정렬 제거, 인덱스 검색만 사용 등)가 한도 안이면 그것을 실행, 아니면 거부
+    """
+
+    def __init__(self, action: str = EXPLAIN_ACTION, max_rows: int = EXPLAIN_MAX_ROWS,
+                 max_cost: float = EXPLAIN_MAX_COST, ttl: float = EXPLAIN_CACHE_TTL,
+                 max_entries: int = EXPLAIN_CACHE_SIZE):
+        if action not in EXPLAIN_ACTIONS:
+            raise ValueError(f"Unknown MCP_EXPLAIN_ACTION '{action}'. Use one of: {', '.join(EXPLAIN_ACTIONS)}")
+        self.action = action
+        self.max_rows = max_rows
+        self.max_cost = max_cost
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._verdicts = OrderedDict()
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.hits = 0
+        self.rejected = 0
+        self.rewritten = 0
+        self.warnings = 0
+        self.errors = 0
+
+    def settings(self, overrides: dict = None) -> dict:
+        """connections.json의 "explain" 항목으로 DB별 한도 변경"""
+        settings = {"action": self.action, "max_rows": self.max_rows, "max_cost": self.max_cost}
+        settings.update({key: value for key, value in (overrides or {}).items() if key in settings})
+        return settings
+
+    def _verdict(self, settings: dict, estimate: dict) -> dict:
+        reasons = []
+        if settings["max_rows"] and estimate["rows"] > settings["max_rows"]:
+            reasons.append(f"reads ~{estimate['rows']:,} rows (limit {settings['max_rows']:,})")
+        if settings["max_cost"] and estimate["cost"] is not None and estimate["cost"] > settings["max_cost"]:
+            reasons.append(f"cost {estimate['cost']:,.0f} (limit {settings['max_cost']:,.0f})")
+        if estimate["full_scans"]:
+            scans = ", ".join(f"{table} (~{rows:,} rows)" for table, rows in estimate["full_scans"])
+        else:
+            scans = ""
+        return dict(estimate, allowed=not reasons,
+                    reason=("Query plan " + " and ".join(reasons) + (f"; full scan of {scans}" if scans else ""))
+                    if reasons else None)
+
+    def check(self, database: str, engine, db_type: str, sql: str, params: dict = None, limit: int = None,
+              table_rows=None, overrides: dict = None) -> dict:
+        """판정 반환: {"allowed", "reason", "rows", "cost", "full_scans", "cached"}"""
+        settings = self.settings(overrides)
+        key = (database, statement_shape(sql), limit)
+        now = time.monotonic()
+        with self._lock:
+            self.checks += 1
+            entry = self._verdicts.get(key)
+            if entry is not None and entry[0] > now:
+                self._verdicts.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1], cached=True)
+
+        try:
+            with engine.connect() as conn:
+                estimate = explain(conn, db_type, sql, params, limit, table_rows)
+                conn.rollback()
+            verdict = self._verdict(settings, estimate)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            # EXPLAIN을 할 수 없으면 막지 않음 (실행 시 제한 시간/행 수 제한은 그대로 적용)
+            verdict = {"allowed": True, "reason": None, "rows": None, "cost": None, "full_scans": [],
+                       "error": str(e).splitlines()[0] if str(e) else type(e).__name__}
+
+        with self._lock:
+            self._verdicts[key] = (time.monotonic() + self.ttl, verdict)
+            self._verdicts.move_to_end(key)
+            while len(self._verdicts) > self.max_entries:
+                self._verdicts.popitem(last=False)
+        return dict(verdict, cached=False)
+
+    def preflight(self, database: str, engine, db_type: str, sql: str, params: dict = None,
+                  limit: int = None, table_rows=None, overrides: dict = None, rewrites=()):
+        """실행할 (SQL, 파라미터, 안내 문구) 반환 - 거부되면 PlanRejected
+
+        rewrites: 한도를 넘을 때 차례로 시도할 (SQL, 파라미터, 설명) 목록
+        """
+        settings = self.settings(overrides)
+        if settings["action"] == "off":
+            return sql, params, None
+        verdict = self.check(database, engine, db_type, sql, params, limit, table_rows, overrides)
+        if verdict["allowed"]:
+            return sql, params, None
+
+        if settings["action"] == "warn":
+            with self._lock:
+                self.warnings += 1
+            return sql, params, f"⚠️ {verdict['reason']}"
+
+        if settings["action"] == "rewrite":
+            for new_sql, new_params, description in rewrites:
+                if self.check(database, engine, db_type, new_sql, new_params, limit, table_rows,
+                              overrides)["allowed"]:
+                    with self._lock:
+                        self.rewritten += 1
+                    return new_sql, new_params, f"⚠️ {verdict['reason']} - {description}"
+
+        with self._lock:
+            self.rejected += 1
+        raise PlanRejected(verdict)
+
+    def invalidate(self, database: str):
+        """DDL 후 호출 - 해당 DB의 판정 제거"""
+        with self._lock:
+            for key in [key for key in self._verdicts if key[0] == database]:
+                del self._verdicts[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "action": self.action,
+                "max_rows": self.max_rows,
+                "max_cost": self.max_cost,
+                "entries": len(self._verdicts),
+                "checks": self.checks,
+                "hits": self.hits,
+                "rejected": self.rejected,
+                "rewritten": self.rewritten,
+                "warnings": self.warnings,
+                "errors": self.errors,
+            }
@@ -0,0 +1,128 @@
+import json
+import os
+import time
+import telemetry
+
+# 결과 출력 설정 (환경 변수로 변경 가능)
+RESULT_FORMAT = os.environ.get("MCP_RESULT_FORMAT", "pretty")
+RESULT_MAX_BYTES = int(os.environ.get("MCP_RESULT_MAX_BYTES", "16000"))
+RESULT_MAX_CELL = int(os.environ.get("MCP_RESULT_MAX_CELL", "30"))
+
+FORMATS = ("pretty", "tsv", "json")
+
+
+def resolve_format(fmt: str) -> str:
+    """요청된 출력 형식 확인 (비어 있으면 서버 기본값)"""
+    fmt = (fmt or RESULT_FORMAT).strip().lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    return fmt
+
+
+def parse_column_limits(spec: str) -> dict:
+    """'col1:20,col2:50' 형식의 컬럼별 최대 글자 수 파싱"""
+    limits = {}
+    if not spec:
+        return limits
+    for pair in spec.split(','):
+        if ':' not in pair:
+            raise ValueError("Invalid truncate format. Use: column1:20,column2:50")
+        col, size = pair.split(':', 1)
+        limits[col.strip().lower()] = int(size.strip())
+    return limits
+
+
+def estimate_tokens(text: str) -> int:
+    """LLM 토큰 수 대략 추정 (영문/숫자는 4글자당 1토큰, 그 외 문자는 1글자당 1토큰)"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+def _cell_limits(headers: list, max_cell: int, column_limits: dict) -> list:
+    column_limits = column_limits or {}
+    return [column_limits.get(h.lower(), max_cell) for h in headers]
+
+
+def _truncate(val, limit):
+    """값을 문자열로 변환하고 limit 글자를 넘으면 자름 (숫자는 자르지 않음)"""
+    if isinstance(val, (int, float)):
+        return str(val)
+    str_val = str(val)
+    if limit and len(str_val) > limit:
+        str_val = str_val[:max(limit - 3, 1)] + "..."
+    return str_val
+
+
+def _pretty_lines(headers, rows, limits):
+    yield " | ".join(headers)
+    yield "=" * 60
+    for row in rows:
+        yield " | ".join("-" if val is None else _truncate(val, limit) for val, limit in zip(row, limits))
+
+
+def _tsv_cell(val, limit):
+    if val is None:
+        return ""
+    return _truncate(val, limit).replace("\t", " ").replace("\r", " ").replace("\n", " ")
+
+
+def _tsv_lines(headers, rows, limits):
+    yield "\t".join(headers)
+    for row in rows:
+        yield "\t".join(_tsv_cell(val, limit) for val, limit in zip(row, limits))
+
+
+def _json_value(val, limit):
+    if val is None or isinstance(val, (bool, int, float)):
+        return val
+    return _truncate(val, limit)
+
+
+def format_rows(headers: list, rows, fmt: str = "pretty", max_bytes: int = RESULT_MAX_BYTES,
+                max_cell: int = RESULT_MAX_CELL, column_limits: dict = None):
+    """조회 결과를 지정된 형식의 문자열로 변환
+
+    - pretty: 기존 ' | ' 구분 표 형식
+    - tsv: 탭 구분 (가장 작은 출력)
+    - json: 컬럼 단위 JSON {"columns": [...], "data": [[컬럼1 값들], [컬럼2 값들], ...]}
+
+    출력이 max_bytes를 넘으면 그 전까지의 행만 포함합니다.
+    반환값: (출력 문자열, 포함된 행 수)
+    """
+    started = time.perf_counter()
+    limits = _cell_limits(headers, max_cell, column_limits)
+    budget = max_bytes if max_bytes and max_bytes > 0 else None
+
+    if fmt == "json":
+        columns = [[] for _ in headers]
+        size = len(json.dumps({"columns": list(headers), "data": columns}, ensure_ascii=False))
+        shown = 0
+        for row in rows:
+            values = [_json_value(val, limit) for val, limit in zip(row, limits)]
+            # 값 사이의 ',' 구분자를 포함한 대략적인 크기
+            row_size = sum(len(json.dumps(v, ensure_ascii=False, default=str).encode('utf-8')) + 1 for v in values)
+            if budget is not None and shown > 0 and size + row_size > budget:
+                break
+            for column, value in zip(columns, values):
+                column.append(value)
+            size += row_size
+            shown += 1
+        text = json.dumps({"columns": list(headers), "data": columns},
+                          ensure_ascii=False, separators=(',', ':'), default=str)
+        telemetry.count("format_ms", (time.perf_counter() - started) * 1000)
+        return text + "\n", shown
+
+    line_iter = _tsv_lines(headers, rows, limits) if fmt == "tsv" else _pretty_lines(headers, rows, limits)
+    header_count = 1 if fmt == "tsv" else 2
+
+    lines = []
+    size = 0
+    for line in line_iter:
+        line_size = len(line.encode('utf-8')) + 1
+        # 헤더와 첫 행은 예산과 관계없이 항상 포함
+        if budget is not None and len(lines) > header_count and size + line_size > budget:
+            break
+        lines.append(line)
+        size += line_size
+    telemetry.count("format_ms", (time.perf_counter() - started) * 1000)
+    return "\n".join(lines) + "\n", len(lines) - header_count
@@ -0,0 +1,107 @@
+from collections import deque
+
+
+def load_fk_graph(insp) -> list:
+    """DB 전체의 외래 키 관계를 간선 목록으로 조회 (리플렉션 2회)
+
+    각 간선: {"child", "parent", "child_cols", "parent_cols", "nullable"}
+    nullable은 자식 쪽 FK 컬럼 중 NULL을 허용하는 컬럼이 있는지 여부입니다.
+    """
+    columns = insp.get_multi_columns()
+    nullable = {}
+    for (_, table), cols in columns.items():
+        for col in cols:
+            nullable[(table, col['name'])] = col.get('nullable', True)
+
+    edges = []
+    for (schema, table), fks in insp.get_multi_foreign_keys().items():
+        for fk in fks:
+            # 다른 스키마를 참조하는 FK는 제외
+            if fk.get('referred_schema') not in (None, schema):
+                continue
+            edges.append({
+                "child": table,
+                "parent": fk['referred_table'],
+                "child_cols": fk['constrained_columns'],
+                "parent_cols": fk['referred_columns'],
+                "nullable": any(nullable.get((table, col), True) for col in fk['constrained_columns']),
+            })
+    return edges
+
+
+def find_path(edges: list, start: str, goal: str):
+    """FK 그래프에서 start -> goal 최단 경로 [(간선, 출발 테이블, 도착 테이블), ...] (없으면 None)"""
+    if start == goal:
+        return []
+
+    neighbors = {}
+    for edge in edges:
+        neighbors.setdefault(edge["child"], []).append((edge, edge["parent"]))
+        neighbors.setdefault(edge["parent"], []).append((edge, edge["child"]))
+
+    previous = {start: None}
+    queue = deque([start])
+    while queue:
+        current = queue.popleft()
+        if current == goal:
+            break
+        for edge, nxt in neighbors.get(current, []):
+            if nxt not in previous:
+                previous[nxt] = (edge, current)
+                queue.append(nxt)
+
+    if goal not in previous:
+        return None
+
+    path = []
+    node = goal
+    while previous[node] is not None:
+        edge, prev = previous[node]
+        path.append((edge, prev, node))
+        node = prev
+    return list(reversed(path))
+
+
+def join_step(edge: dict, from_table: str, to_table: str) -> dict:
+    """FK 간선 하나를 JOIN 단계로 변환
+
+    - 자식 -> 부모: FK가 NOT NULL이면 항상 짝이 있으므로 INNER JOIN, NULL 허용이면 LEFT JOIN
+    - 부모 -> 자식: 자식이 없는 부모 행도 남도록 LEFT JOIN
+    """
+    if from_table == edge["child"]:
+        pairs = list(zip(edge["child_cols"], edge["parent_cols"]))
+        join_type = "LEFT JOIN" if edge["nullable"] else "INNER JOIN"
+    else:
+        pairs = list(zip(edge["parent_cols"], edge["child_cols"]))
+        join_type = "LEFT JOIN"
+    return {"from": from_table, "table": to_table, "pairs": pairs, "type": join_type}
+
+
+def plan_joins(edges: list, tables: list, already_joined: list = None):
+    """요청된 테이블 순서대로 FK 경로를 따라 JOIN 계획 작성
+
+    인접한 두 테이블이 직접 연결되어 있지 않으면 중간 테이블을 자동으로 추가합니다.
+    LEFT JOIN으로 붙은 테이블 뒤의 JOIN은 앞의 행이 사라지지 않도록 모두 LEFT JOIN으로 바꿉니다.
+    already_joined는 이미 FROM 절에 있는 테이블로, 경로에 나와도 다시 붙이지 않습니다.
+    반환값: (JOIN 단계 목록, None) 또는 (None, 연결할 수 없는 테이블 쌍)
+    """
+    steps = []
+    joined = list(already_joined or []) + [tables[0]]
+    optional = set()
+    for left, right in zip(tables, tables[1:]):
+        if right in joined:
+            continue
+        path = find_path(edges, left, right)
+        if path is None:
+            return None, (left, right)
+        for edge, from_table, to_table in path:
+            if to_table in joined:
+                continue
+            step = join_step(edge, from_table, to_table)
+            if from_table in optional:
+                step["type"] = "LEFT JOIN"
+            if step["type"] == "LEFT JOIN":
+                optional.add(to_table)
+            steps.append(step)
+            joined.append(to_table)
+    return steps, None
@@ -0,0 +1,276 @@
+import json
+import math
+import os
+from sqlalchemy import text
+from sqlalchemy import types as sqltypes
+from db_format import format_rows, RESULT_MAX_BYTES
+from db_sql import select_sql
+
+# 테이블 프로파일 설정 (환경 변수로 변경 가능)
+# 추정 행 수가 PROFILE_SAMPLE_ROWS를 넘는 테이블은 그 정도 행만 표본으로 읽음
+PROFILE_SAMPLE_ROWS = int(os.environ.get("MCP_PROFILE_SAMPLE_ROWS", "200000"))
+PROFILE_MAX_COLUMNS = int(os.environ.get("MCP_PROFILE_MAX_COLUMNS", "50"))
+PROFILE_TIMEOUT = float(os.environ.get("MCP_PROFILE_TIMEOUT", "60"))
+
+# 빈도 집계 시 값을 문자열로 변환하는 타입 (UNION ALL로 여러 컬럼을 합치기 위해)
+_TEXT_CAST = {
+    'PostgreSQL': "VARCHAR",
+    'MySQL': "CHAR",
+    'Oracle': "VARCHAR2(4000)",
+    'SQLServer': "NVARCHAR(4000)",
+    'SQLite': "TEXT",
+}
+
+
+# Text 계열 타입이 LOB이라 MIN/MAX, COUNT(DISTINCT), GROUP BY를 쓸 수 없는 DB
+# (Oracle CLOB/NCLOB/LONG, SQL Server TEXT/NTEXT) - PostgreSQL/MySQL/SQLite의 TEXT는 집계 가능
+_LOB_TEXT_DBS = ('Oracle', 'SQLServer')
+
+
+def column_kind(col_type, db_type: str = None) -> str:
+    """리플렉션한 컬럼 타입 -> 'numeric' | 'temporal' | 'boolean' | 'text' | 'other'
+
+    'other'(LOB, 바이너리, JSON 등)는 NULL 개수만 셉니다. MIN/MAX나 COUNT(DISTINCT)를
+    쓸 수 없는 타입입니다.
+    """
+    if isinstance(col_type, sqltypes.Boolean):
+        return 'boolean'
+    if isinstance(col_type, (sqltypes.Integer, sqltypes.Numeric, sqltypes.Float)):
+        return 'numeric'
+    if isinstance(col_type, (sqltypes.Date, sqltypes.DateTime, sqltypes.Time)):
+        return 'temporal'
+    if isinstance(col_type, sqltypes.Text) and db_type in _LOB_TEXT_DBS:
+        return 'other'
+    if isinstance(col_type, sqltypes.String):
+        return 'text'
+    return 'other'
+
+
+def sample_percent_for(total_rows) -> float:
+    """추정 행 수에 맞춘 표본 비율(%) - 작은 테이블은 None (전체 읽기)"""
+    if not total_rows or total_rows <= PROFILE_SAMPLE_ROWS:
+        return None
+    return max(0.0001, round(100.0 * PROFILE_SAMPLE_ROWS / total_rows, 4))
+
+
+def sample_source(db_type: str, quoted_table: str, percent: float = None):
+    """표본 추출 FROM 절과 WHERE 조건 (percent가 없으면 전체 테이블)
+
+    - PostgreSQL: TABLESAMPLE SYSTEM (블록 단위라 표본 크기만큼만 읽음)
+    - SQL Server: TABLESAMPLE (n PERCENT)
+    - Oracle: SAMPLE (n)
+    - MySQL, SQLite: 표본 문법이 없어 난수 조건으로 대신함 (읽기는 전체, 집계 대상만 줄어듦)
+    """
+    if not percent or percent >= 100:
+        return quoted_table, None
+    value = f"{percent:.6f}".rstrip('0').rstrip('.')
+    if db_type == 'PostgreSQL':
+        return f"{quoted_table} TABLESAMPLE SYSTEM ({value})", None
+    if db_type == 'SQLServer':
+        return f"{quoted_table} TABLESAMPLE ({value} PERCENT)", None
+    if db_type == 'Oracle':
+        return f"{quoted_table} SAMPLE ({value})", None
+    if db_type == 'MySQL':
+        return quoted_table, f"RAND() < {percent / 100:.8f}"
+    return quoted_table, f"ABS(RANDOM()) % 1000000 < {int(percent * 10000)}"
+
+
+def stats_sql(db_type: str, from_clause: str, where: str, columns: list):
+    """컬럼별 기본 통계를 한 번의 스캔으로 구하는 집계 쿼리 - (SQL, [(컬럼 위치, 통계 이름), ...])"""
+    exprs = ["COUNT(*)"]
+    fields = [(None, "rows")]
+    for i, col in enumerate(columns):
+        quoted, kind = col["quoted"], col["kind"]
+        exprs.append(f"COUNT({quoted})")
+        fields.append((i, "non_null"))
+        if kind == 'other':
+            continue
+        exprs.append(f"COUNT(DISTINCT {quoted})")
+        fields.append((i, "distinct"))
+        if kind == 'boolean':
+            continue
+        exprs += [f"MIN({quoted})", f"MAX({quoted})"]
+        fields += [(i, "min"), (i, "max")]
+        if kind == 'numeric':
+            # 정수 컬럼의 AVG가 정수로 잘리는 DB(SQL Server 등)가 있어 실수로 변환
+            exprs.append(f"AVG({quoted} * 1.0)")
+            fields.append((i, "mean"))
+    return select_sql(db_type, ", ".join(exprs), from_clause, where=where), fields
+
+
+def _histogram_edges(low, high, buckets: int, integer: bool) -> list:
+    """같은 폭의 구간 경계 (buckets + 1개)"""
+    low, high = float(low), float(high)
+    if integer:
+        # 정수는 값 범위보다 구간이 많을 필요가 없음
+        buckets = max(1, min(buckets, int(high - low) + 1))
+        width = (high - low + 1) / buckets
+    else:
+        width = (high - low) / buckets
+    return [low + width * j for j in range(buckets)] + [high]
+
+
+def _bucket_bounds(edges: list, integer: bool) -> list:
+    """구간 경계 -> 표시할 [(하한, 상한), ...] - 정수는 포함 범위로 변환 (예: [1, 11) -> 1~10)"""
+    bounds = list(zip(edges, edges[1:]))
+    if not integer:
+        return bounds
+    return [(math.ceil(low), int(high) if j == len(bounds) - 1 else math.ceil(high) - 1)
+            for j, (low, high) in enumerate(bounds)]
+
+
+def histogram_sql(db_type: str, from_clause: str, where: str, targets: list):
+    """수치 컬럼들의 구간별 행 수를 한 번의 스캔으로 구하는 쿼리 - (SQL, 파라미터)
+
+    targets: [(quoted 컬럼, 구간 경계), ...]. 첫 구간과 마지막 구간은 한쪽이 열려 있어
+    (표본이 달라) 최솟값/최댓값 밖에 있는 값도 빠지지 않습니다.
+    """
+    exprs, params = [], {}
+    for i, (quoted, edges) in enumerate(targets):
+        count = len(edges) - 1
+        for j in range(count):
+            conditions = []
+            if j > 0:
+                params[f"h{i}_{j}"] = edges[j]
+                conditions.append(f"{quoted} >= :h{i}_{j}")
+            if j < count - 1:
+                params[f"h{i}_{j + 1}"] = edges[j + 1]
+                conditions.append(f"{quoted} < :h{i}_{j + 1}")
+            if not conditions:
+                conditions.append(f"{quoted} IS NOT NULL")
+            exprs.append(f"SUM(CASE WHEN {' AND '.join(conditions)} THEN 1 ELSE 0 END)")
+    return select_sql(db_type, ", ".join(exprs), from_clause, where=where), params
+
+
+def top_values_sql(db_type: str, from_clause: str, where: str, targets: list, top_k: int) -> str:
+    """여러 컬럼의 최빈값 top_k개를 한 번에 구하는 쿼리
+
+    컬럼별 GROUP BY를 UNION ALL로 합친 뒤 ROW_NUMBER()로 컬럼마다 상위 k개만 남깁니다.
+    결과 행: (컬럼 위치, 값 문자열, 빈도)
+    """
+    cast = _TEXT_CAST.get(db_type, "VARCHAR(4000)")
+    groups = []
+    for i, quoted in targets:
+        conditions = [f"{quoted} IS NOT NULL"] + ([where] if where else [])
+        groups.append(select_sql(db_type, f"{i} AS c, CAST({quoted} AS {cast}) AS v, COUNT(*) AS n", from_clause,
+                                 where=" AND ".join(f"({c})" for c in conditions)) + f" GROUP BY {quoted}")
+    ranked = (f"SELECT c, v, n, ROW_NUMBER() OVER (PARTITION BY c ORDER BY n DESC, v) AS r "
+              f"FROM ({' UNION ALL '.join(groups)}) g")
+    return f"SELECT c, v, n FROM ({ranked}) ranked WHERE r <= {int(top_k)} ORDER BY c, r"
+
+
+def profile_columns(conn, db_type: str, quote, table: str, columns: list, top_k: int = 5,
+                    buckets: int = 10, percent: float = None) -> dict:
+    """테이블 컬럼 통계를 DB 안에서 계산 - 컬럼 수와 관계없이 쿼리 최대 3번
+
+    1. 행 수, NULL 수, 고유값 수, 최솟값/최댓값, 평균 (집계 한 번)
+    2. 수치 컬럼 히스토그램 (1의 최솟값/최댓값으로 구간을 정해 집계 한 번)
+    3. 값이 반복되는 컬럼의 최빈값 (UNION ALL + ROW_NUMBER 한 번)
+
+    columns는 리플렉션 결과(get_columns)이고, percent가 있으면 표본에서 계산합니다.
+    """
+    from_clause, where = sample_source(db_type, quote(table), percent)
+    cols = [{"name": col["name"], "type": str(col["type"]), "kind": column_kind(col["type"], db_type),
+             "integer": isinstance(col["type"], sqltypes.Integer), "quoted": quote(col["name"])}
+            for col in columns]
+
+    sql, fields = stats_sql(db_type, from_clause, where, cols)
+    row = conn.execute(text(sql)).fetchone()
+    rows = row[0] or 0
+    for (i, stat), value in zip(fields[1:], row[1:]):
+        cols[i][stat] = float(value) if stat == "mean" and value is not None else value
+    for col in cols:
+        col["nulls"] = rows - (col["non_null"] or 0)
+
+    hist_cols = [col for col in cols if buckets and col["kind"] == 'numeric'
+                 and col.get("min") is not None and col["min"] != col["max"]]
+    if hist_cols:
+        targets = [(col["quoted"], _histogram_edges(col["min"], col["max"], buckets, col["integer"]))
+                   for col in hist_cols]
+        sql, params = histogram_sql(db_type, from_clause, where, targets)
+        counts = iter(conn.execute(text(sql), params).fetchone())
+        for col, (_, edges) in zip(hist_cols, targets):
+            col["histogram"] = [[low, high, next(counts) or 0]
+                                for low, high in _bucket_bounds(edges, col["integer"])]
+
+    # 모든 값이 다른 컬럼(PK 등)은 최빈값이 의미 없으므로 제외
+    top_cols = [i for i, col in enumerate(cols) if top_k and col["kind"] != 'other'
+                and col.get("distinct") and col["distinct"] < col["non_null"]]
+    if top_cols:
+        sql = top_values_sql(db_type, from_clause, where, [(i, cols[i]["quoted"]) for i in top_cols], top_k)
+        for i, value, n in conn.execute(text(sql)):
+            cols[int(i)].setdefault("top", []).append([value, n])
+
+    for col in cols:
+        del col["quoted"], col["integer"]
+    return {"table": table, "rows": rows, "sample_percent": percent, "columns": cols}
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        if abs(value) >= 1e9 or (value and abs(value) < 1e-3):
+            return f"{value:.4g}"
+        return f"{value:.4f}".rstrip('0').rstrip('.')
+    return str(value)
+
+
+def _value(value, limit: int = 30) -> str:
+    if isinstance(value, float) or hasattr(value, "as_integer_ratio") and not isinstance(value, int):
+        return _number(float(value))   # float, Decimal
+    value = str(value)
+    return value if len(value) <= limit else value[:limit - 3] + "..."
+
+
+def format_profile(profile: dict, fmt: str = "pretty", total_rows=None, total_kind: str = None) -> str:
+    """profile_columns() 결과를 LLM에 넘길 짧은 요약으로 변환
+
+    total_rows/total_kind는 표본으로 계산했을 때 함께 보여줄 전체 행 수(카탈로그 추정치)입니다.
+    """
+    percent = profile["sample_percent"]
+    rows = profile["rows"]
+    if fmt == "json":
+        return json.dumps(dict(profile, total_rows=total_rows), ensure_ascii=False, separators=(',', ':'),
+                          default=str) + "\n"
+
+    if percent:
+        prefix = "~" if total_kind == 'estimate' else ""
+        total = f"{prefix}{total_rows:,} rows" if total_rows is not None else "rows"
+        scope = f"{total}, {percent:g}% sample of {rows:,} rows - counts below are for the sample"
+    else:
+        scope = f"{rows:,} rows"
+
+    def pct(col):
+        return f"{col['nulls'] / rows:.1%}" if rows else "0%"
+
+    def histogram(col):
+        return " | ".join(f"{_number(low)}{'' if low == high else '~' + _number(high)}: {n:,}"
+                          for low, high, n in col.get("histogram", []))
+
+    def top(col):
+        return ", ".join(f"{_value(value)} ({n:,})" for value, n in col.get("top", []))
+
+    if fmt == "tsv":
+        headers = ["column", "type", "nulls", "distinct", "min", "max", "mean", "top", "histogram"]
+        data = [[col["name"], col["type"], col["nulls"], col.get("distinct"),
+                 _value(col["min"]) if col.get("min") is not None else None,
+                 _value(col["max"]) if col.get("max") is not None else None,
+                 _number(col["mean"]) if col.get("mean") is not None else None,
+                 top(col) or None, histogram(col) or None] for col in profile["columns"]]
+        body, _ = format_rows(headers, data, "tsv", max_bytes=RESULT_MAX_BYTES, max_cell=0)
+        return f"{profile['table']}: {scope}\n" + body
+
+    output = f"📊 Profile of '{profile['table']}' ({scope}):\n\n"
+    for col in profile["columns"]:
+        parts = [f"nulls {col['nulls']:,} ({pct(col)})"]
+        if col.get("distinct") is not None:
+            parts.append(f"distinct {col['distinct']:,}")
+        if col.get("min") is not None:
+            parts.append(f"min {_value(col['min'])}, max {_value(col['max'])}")
+        if col.get("mean") is not None:
+            parts.append(f"mean {_number(col['mean'])}")
+        output += f"• {col['name']} ({col['type']}): " + ", ".join(parts) + "\n"
+        if col.get("top"):
+            output += f"    top: {top(col)}\n"
+        if col.get("histogram"):
+            output += f"    histogram: {histogram(col)}\n"
+    return output
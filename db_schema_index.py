@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+# 스키마 검색 인덱스 설정 (환경 변수로 변경 가능)
+SCHEMA_INDEX_DIR = os.environ.get("MCP_SCHEMA_INDEX_DIR", ".schema_index")
+SCHEMA_EMBEDDER = os.environ.get("MCP_SCHEMA_EMBEDDER", "hashing")   # hashing | ollama:<model>
+SCHEMA_SAMPLE_ROWS = int(os.environ.get("MCP_SCHEMA_SAMPLE_ROWS", "3"))
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|[0-9]+|[가-힣]+")
+
+
+def tokenize(text: str) -> list:
+    """snake_case/camelCase를 나누고 소문자로 변환한 토큰 목록"""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return [token.lower() for token in _TOKEN_PATTERN.findall(text)]
+
+
+def _stable_hash(value: str) -> int:
+    # hash()는 프로세스마다 달라지므로 디스크에 저장하는 값에는 사용하지 않음
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HashingEmbedder:
+    """Ollama 없이 동작하는 해싱 임베더 (단어 + 글자 3-gram, TF 가중치)
+
+    단어 단위로는 정확히 같은 이름을, 3-gram으로는 student/students 같은 변형을 맞춥니다.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str):
+        for token in tokenize(text):
+            yield token, 1.0
+            padded = f"^{token}$"
+            for i in range(len(padded) - 2):
+                yield "#" + padded[i:i + 3], 0.5
+
+    def embed(self, texts: list):
+        import numpy as np
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                h = _stable_hash(feature)
+                sign = 1.0 if (h >> 63) & 1 else -1.0
+                vectors[row, h % self.dim] += sign * weight
+        return _normalize(vectors)
+
+
+class OllamaEmbedder:
+    """Ollama 임베딩 모델 사용 (예: MCP_SCHEMA_EMBEDDER=ollama:nomic-embed-text)"""
+
+    def __init__(self, model: str):
+        from langchain_ollama import OllamaEmbeddings
+        self._embeddings = OllamaEmbeddings(model=model)
+        self.name = f"ollama-{model}"
+        self.dim = None
+
+    def embed(self, texts: list):
+        import numpy as np
+        vectors = np.asarray(self._embeddings.embed_documents(texts), dtype="float32")
+        self.dim = vectors.shape[1]
+        return _normalize(vectors)
+
+
+def _normalize(vectors):
+    import numpy as np
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def create_embedder(spec: str = SCHEMA_EMBEDDER):
+    """설정 문자열로 임베더 생성 ('hashing', 'hashing:512', 'ollama:<model>')"""
+    kind, _, option = spec.partition(":")
+    if kind == "hashing":
+        return HashingEmbedder(int(option) if option else 1024)
+    if kind == "ollama":
+        if not option:
+            raise ValueError("Specify the Ollama model, e.g. ollama:nomic-embed-text")
+        return OllamaEmbedder(option)
+    raise ValueError(f"Unknown schema embedder '{spec}'. Use hashing or ollama:<model>")
+
+
+def doc_id(database: str, table: str, column: str = None) -> int:
+    """문서의 고정 ID (FAISS ID는 int64)"""
+    return _stable_hash(f"{database}\x00{table}\x00{column or ''}") & 0x7FFFFFFFFFFFFFFF
+
+
+def schema_documents(database: str, description: str, tables: dict, descriptions: dict = None) -> list:
+    """검색용 문서 목록 - 테이블마다 1개, 컬럼마다 1개
+
+    tables: {테이블명: [{"name", "type", "samples"}, ...]}
+    descriptions: connections.json의 "descriptions" ({"students": "...", "students.gpa": "..."})
+    """
+    descriptions = {key.lower(): val for key, val in (descriptions or {}).items()}
+    docs = []
+    for table, columns in tables.items():
+        table_desc = descriptions.get(table.lower(), "")
+        col_names = ", ".join(col["name"] for col in columns)
+        docs.append({
+            "id": doc_id(database, table),
+            "database": database,
+            "table": table,
+            "column": None,
+            "text": f"table {table}. {table_desc} columns: {col_names}. database: {description}",
+        })
+        for col in columns:
+            col_desc = descriptions.get(f"{table}.{col['name']}".lower(), "")
+            samples = ", ".join(str(val) for val in col.get("samples", []))
+            docs.append({
+                "id": doc_id(database, table, col["name"]),
+                "database": database,
+                "table": table,
+                "column": col["name"],
+                "type": col.get("type", ""),
+                "text": f"column {col['name']} of table {table} ({col.get('type', '')}). {col_desc} "
+                        f"examples: {samples}",
+            })
+    for doc in docs:
+        doc["fp"] = hashlib.sha1(doc["text"].encode("utf-8")).hexdigest()
+    return docs
+
+
+class SchemaIndex:
+    """테이블/컬럼 문서를 FAISS 인덱스에 저장하고 질문과 가까운 테이블을 찾음
+
+    인덱스와 메타데이터는 디스크에 저장되고, sync()는 내용(fingerprint)이 바뀐 문서만
+    다시 임베딩합니다. faiss/numpy는 서버 시작을 늦추지 않도록 처음 사용할 때 import합니다.
+    """
+
+    def __init__(self, directory: str = SCHEMA_INDEX_DIR, embedder=None):
+        self.directory = directory
+        self._embedder = embedder
+        self._index = None
+        self._meta = {}      # id(str) -> 문서(텍스트 제외)
+        self._lock = threading.Lock()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = create_embedder()
+        return self._embedder
+
+    def _paths(self):
+        return (os.path.join(self.directory, "schema.faiss"),
+                os.path.join(self.directory, "schema_meta.json"))
+
+    def _load_locked(self):
+        if self._index is not None:
+            return
+        import faiss
+        index_path, meta_path = self._paths()
+        if os.path.exists(index_path) and os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            # 임베더가 바뀌었으면 벡터를 비교할 수 없으므로 새로 만듦
+            if saved.get("embedder") == self.embedder.name:
+                self._index = faiss.read_index(index_path)
+                self._meta = saved["docs"]
+                return
+        self._index = None
+        self._meta = {}
+
+    def _save_locked(self):
+        import faiss
+        os.makedirs(self.directory, exist_ok=True)
+        index_path, meta_path = self._paths()
+        faiss.write_index(self._index, index_path + ".tmp")
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"embedder": self.embedder.name, "docs": self._meta}, f, ensure_ascii=False)
+        os.replace(index_path + ".tmp", index_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def sync(self, database: str, docs: list) -> dict:
+        """DB의 문서 목록을 인덱스에 반영 (추가/변경/삭제된 문서만 처리)"""
+        import faiss
+        import numpy as np
+        with self._lock:
+            self._load_locked()
+            current = {str(doc["id"]): doc for doc in docs}
+            stale = [int(key) for key, meta in self._meta.items()
+                     if meta["database"] == database
+                     and (key not in current or current[key]["fp"] != meta["fp"])]
+            new_docs = [doc for key, doc in current.items()
+                        if key not in self._meta or self._meta[key]["fp"] != doc["fp"]]
+
+            if stale and self._index is not None:
+                self._index.remove_ids(np.asarray(stale, dtype="int64"))
+                for key in stale:
+                    self._meta.pop(str(key), None)
+
+            if new_docs:
+                vectors = self.embedder.embed([doc["text"] for doc in new_docs])
+                if self._index is None:
+                    self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+                self._index.add_with_ids(vectors, np.asarray([doc["id"] for doc in new_docs], dtype="int64"))
+                for doc in new_docs:
+                    self._meta[str(doc["id"])] = {key: val for key, val in doc.items() if key != "text"}
+
+            if stale or new_docs:
+                self._save_locked()
+            return {"added": len(new_docs), "removed": len(stale), "total": len(self._meta)}
+
+    def search(self, question: str, top_k: int = 5, database: str = None) -> list:
+        """질문과 관련된 테이블 top_k개 [{"database", "table", "score", "columns": [...]}, ...]
+
+        테이블 점수는 테이블 문서와 가장 가까운 컬럼 문서 중 높은 값입니다.
+        """
+        with self._lock:
+            self._load_locked()
+            if self._index is None or self._index.ntotal == 0:
+                return []
+            query = self.embedder.embed([question])
+            k = min(self._index.ntotal, max(top_k * 10, 50))
+            scores, ids = self._index.search(query, k)
+
+            tables = {}
+            for score, doc in zip(scores[0], ids[0]):
+                meta = self._meta.get(str(doc))
+                # 공통 단어가 전혀 없는 문서(점수 0 이하)는 제외
+                if meta is None or score <= 0 or (database and meta["database"] != database):
+                    continue
+                key = (meta["database"], meta["table"])
+                entry = tables.setdefault(key, {"database": key[0], "table": key[1], "score": float(score),
+                                                "columns": []})
+                entry["score"] = max(entry["score"], float(score))
+                if meta["column"] and len(entry["columns"]) < 5:
+                    entry["columns"].append((meta["column"], meta.get("type", ""), float(score)))
+
+        ranked = sorted(tables.values(), key=lambda entry: entry["score"], reverse=True)
+        return ranked[:top_k]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._index is not None,
+                "documents": len(self._meta),
+                "embedder": self._embedder.name if self._embedder is not None else SCHEMA_EMBEDDER,
+            }
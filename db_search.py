@@ -0,0 +1,161 @@
+import re
+from sqlalchemy import text
+from sqlalchemy import types as sqltypes
+from db_sql import select_sql
+
+SEARCH_MODES = ("contains", "prefix", "exact")
+
+# search_plan의 검색 방식 -> 결과 설명 (요청한 match가 아니라 실제로 실행한 방식 기준, 숫자 컬럼은 항상 equals)
+METHOD_DESCRIPTIONS = {
+    "exact": "equals",
+    "prefix": "starts with",
+    "prefix (indexed)": "starts with",
+    "trigram index": "contains",
+    "full-text index": "matches (full-text)",
+    "LIKE scan": "contains",
+}
+
+
+def detect_text_index(conn, db_type: str, table: str, column: str):
+    """컬럼에 사용할 수 있는 전문 검색(full-text) 인덱스 감지
+
+    반환값: {"kind": ...} 또는 None
+    - PostgreSQL: 'trgm' (pg_trgm GIN/GiST), 'tsvector' (to_tsvector 식 인덱스)
+    - MySQL: 'fulltext' (단일 컬럼 FULLTEXT 인덱스)
+    - Oracle: 'oracle_text' (CONTEXT 인덱스)
+    - SQL Server: 'mssql_fulltext' (full-text 인덱스)
+    """
+    try:
+        if db_type == 'PostgreSQL':
+            rows = conn.execute(text(
+                "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+                "WHERE indrelid = CAST(:t AS regclass)"
+            ), {"t": table}).fetchall()
+            # 앞뒤 경계를 검사해 first_name 인덱스를 name 컬럼의 인덱스로 보지 않도록 함
+            col_pattern = rf'(?<![\w$"])\(?"?{re.escape(column)}"?\)?(?![\w$])'
+            for (indexdef,) in rows:
+                if re.search(col_pattern + r'\s+(gin|gist)_trgm_ops', indexdef, re.IGNORECASE):
+                    return {"kind": "trgm"}
+                m = re.search(r"to_tsvector\('([\w.]+)'::regconfig,\s*" + col_pattern, indexdef, re.IGNORECASE)
+                if m:
+                    return {"kind": "tsvector", "config": m.group(1)}
+
+        elif db_type == 'MySQL':
+            rows = conn.execute(text(
+                "SELECT INDEX_NAME, COUNT(*) FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND INDEX_TYPE = 'FULLTEXT' "
+                "AND INDEX_NAME IN (SELECT INDEX_NAME FROM information_schema.STATISTICS "
+                "  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND COLUMN_NAME = :c) "
+                "GROUP BY INDEX_NAME"
+            ), {"t": table, "c": column}).fetchall()
+            # MATCH()는 인덱스의 컬럼 목록과 정확히 같아야 하므로 단일 컬럼 인덱스만 사용
+            if any(count == 1 for _, count in rows):
+                return {"kind": "fulltext"}
+
+        elif db_type == 'Oracle':
+            row = conn.execute(text(
+                "SELECT 1 FROM ALL_INDEXES i "
+                "JOIN ALL_IND_COLUMNS ic ON ic.INDEX_OWNER = i.OWNER AND ic.INDEX_NAME = i.INDEX_NAME "
+                "WHERE i.TABLE_OWNER = SYS_CONTEXT('USERENV', 'CURRENT_SCHEMA') "
+                "AND i.TABLE_NAME = UPPER(:t) AND ic.COLUMN_NAME = UPPER(:c) AND i.ITYP_NAME = 'CONTEXT'"
+            ), {"t": table, "c": column}).first()
+            if row:
+                return {"kind": "oracle_text"}
+
+        elif db_type == 'SQLServer':
+            row = conn.execute(text(
+                "SELECT 1 FROM sys.fulltext_index_columns fic "
+                "JOIN sys.columns c ON c.object_id = fic.object_id AND c.column_id = fic.column_id "
+                "WHERE fic.object_id = OBJECT_ID(:t) AND c.name = :c"
+            ), {"t": table, "c": column}).first()
+            if row:
+                return {"kind": "mssql_fulltext"}
+    except Exception:
+        # 카탈로그 조회 권한이 없거나 기능이 설치되지 않은 경우
+        conn.rollback()
+    return None
+
+
+def is_btree_indexed(column: str, indexes: list, pk_cols: list) -> bool:
+    """컬럼이 일반 인덱스(또는 PK)의 첫 번째 컬럼인지 확인 - = 와 'abc%' 검색에 인덱스 사용 가능"""
+    if pk_cols and pk_cols[0].lower() == column.lower():
+        return True
+    for index in indexes:
+        cols = index.get('column_names') or []
+        if cols and cols[0] and cols[0].lower() == column.lower():
+            return True
+    return False
+
+
+def escape_like(value: str, db_type: str) -> str:
+    """LIKE 패턴의 와일드카드 이스케이프 (ESCAPE '!' 사용)"""
+    value = value.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+    if db_type == 'SQLServer':
+        value = value.replace('[', '![')
+    return value
+
+
+def _numeric_value(value: str):
+    try:
+        return int(value) if value.lstrip('-').isdigit() else float(value)
+    except ValueError:
+        return None
+
+
+def search_plan(db_type: str, quoted_table: str, quoted_column: str, column_type, value: str,
+                mode: str, limit: int, text_index, indexed: bool) -> list:
+    """실행할 검색 쿼리 목록 [(방식, SQL, 파라미터), ...]
+
+    앞의 쿼리에서 결과가 충분하지 않을 때만 다음 쿼리를 실행합니다.
+    - 전문 검색 인덱스가 있으면 해당 인덱스를 사용
+    - 일반 인덱스가 있는 컬럼은 = / 'abc%' 검색을 먼저 시도
+    - '%abc%' LIKE 검색(전체 스캔)은 마지막 수단
+
+    column_type은 리플렉션한 SQLAlchemy 타입 객체입니다.
+    """
+    def query(where):
+        return select_sql(db_type, "*", quoted_table, where=where, limit=limit)
+
+    like = f"{quoted_column} LIKE :pattern ESCAPE '!'"
+    escaped = escape_like(value, db_type)
+
+    # 숫자형 컬럼은 = 비교 (PostgreSQL 등은 숫자에 LIKE 불가)
+    if isinstance(column_type, (sqltypes.Integer, sqltypes.Numeric, sqltypes.Float)):
+        number = _numeric_value(value)
+        if number is None:
+            return []
+        return [("exact", query(f"{quoted_column} = :value"), {"value": number})]
+
+    if mode == "exact":
+        return [("exact", query(f"{quoted_column} = :value"), {"value": value})]
+
+    plan = []
+    if mode == "prefix":
+        plan.append(("prefix", query(like), {"pattern": escaped + "%"}))
+        return plan
+
+    # contains
+    if text_index:
+        kind = text_index["kind"]
+        if kind == "trgm":
+            # pg_trgm 인덱스는 '%abc%' LIKE를 그대로 가속
+            return [("trigram index", query(like), {"pattern": f"%{escaped}%"})]
+        if kind == "tsvector":
+            config = text_index["config"]
+            where = f"to_tsvector('{config}', {quoted_column}) @@ plainto_tsquery('{config}', :value)"
+            plan.append(("full-text index", query(where), {"value": value}))
+        elif kind == "fulltext":
+            plan.append(("full-text index", query(f"MATCH({quoted_column}) AGAINST (:value IN BOOLEAN MODE)"),
+                         {"value": '"' + value.replace('"', ' ') + '"'}))
+        elif kind == "oracle_text":
+            # {} 로 감싸 Oracle Text 연산자를 이스케이프
+            plan.append(("full-text index", query(f"CONTAINS({quoted_column}, :value) > 0"),
+                         {"value": "{" + value.replace("}", "}}") + "}"}))
+        elif kind == "mssql_fulltext":
+            plan.append(("full-text index", query(f"CONTAINS({quoted_column}, :value)"),
+                         {"value": '"' + value.replace('"', '""') + '*"'}))
+    elif indexed:
+        plan.append(("prefix (indexed)", query(like), {"pattern": escaped + "%"}))
+
+    plan.append(("LIKE scan", query(like), {"pattern": f"%{escaped}%"}))
+    return plan
@@ -0,0 +1,329 @@
+import base64
+import json
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import text
+from db_cancel import cancel_statement
+
+# 읽기 전용 쿼리에서 허용하지 않는 키워드 (문자열/주석 제외 후 검사)
+FORBIDDEN_KEYWORDS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|UPSERT|DROP|ALTER|CREATE|TRUNCATE|RENAME|GRANT|REVOKE|"
+    r"EXEC|EXECUTE|CALL|DO|INTO|LOCK|UNLOCK|SET|COPY|VACUUM|ANALYZE|ATTACH|DETACH|PRAGMA|"
+    r"HANDLER|LOAD|SHUTDOWN|KILL|DBMS_\w+|UTL_\w+|XP_\w+|SP_\w+|PG_SLEEP|PG_TERMINATE_BACKEND|"
+    r"PG_CANCEL_BACKEND|PG_READ_FILE|LO_IMPORT|LO_EXPORT|OPENROWSET|OPENQUERY|OPENDATASOURCE)\b",
+    re.IGNORECASE,
+)
+
+
+def parse_value(val: str):
+    """도구 입력 문자열을 DB 값으로 변환 ('NULL' -> None, 숫자 -> int/float)"""
+    if val.upper() == 'NULL':
+        return None
+    if val.isdigit():
+        return int(val)
+    if val.replace('.', '', 1).isdigit():
+        return float(val)
+    return val
+
+
+def select_sql(db_type: str, columns: str, from_clause: str, where: str = None,
+               order_by: str = None, limit: int = None, offset: int = None) -> str:
+    """DB별 문법에 맞는 SELECT 문 생성 (행 수 제한/OFFSET 포함)
+
+    - MySQL, PostgreSQL, SQLite: LIMIT / OFFSET
+    - SQL Server: TOP, OFFSET이 있으면 OFFSET ... FETCH NEXT (ORDER BY 필수)
+    - Oracle: ROWNUM, OFFSET이 있으면 OFFSET ... FETCH NEXT (12c 이상)
+    """
+    limit = int(limit) if limit is not None else None
+    offset = int(offset) if offset else None
+
+    sql = "SELECT "
+    if db_type == 'SQLServer' and limit is not None and offset is None:
+        sql += f"TOP {limit} "
+    sql += f"{columns} FROM {from_clause}"
+
+    conditions = [where] if where else []
+    if db_type == 'Oracle' and limit is not None and offset is None and not order_by:
+        conditions.append(f"ROWNUM <= {limit}")
+    if conditions:
+        sql += " WHERE " + " AND ".join(f"({c})" for c in conditions)
+
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    elif db_type == 'SQLServer' and offset is not None:
+        sql += " ORDER BY (SELECT NULL)"
+
+    if limit is None and offset is None:
+        return sql
+
+    if db_type in ('SQLServer', 'Oracle'):
+        if offset is not None:
+            sql += f" OFFSET {offset} ROWS"
+            if limit is not None:
+                sql += f" FETCH NEXT {limit} ROWS ONLY"
+        elif db_type == 'Oracle' and order_by:
+            # ORDER BY 이후에 ROWNUM을 적용하려면 서브쿼리가 필요
+            sql = f"SELECT * FROM ({sql}) WHERE ROWNUM <= {limit}"
+    else:
+        if limit is not None:
+            sql += f" LIMIT {limit}"
+        elif db_type == 'MySQL':
+            sql += " LIMIT 18446744073709551615"
+        elif db_type == 'SQLite':
+            sql += " LIMIT -1"
+        if offset is not None:
+            sql += f" OFFSET {offset}"
+    return sql
+
+
+def supports_returning(engine, db_type: str, kind: str) -> bool:
+    """DELETE/UPDATE 결과를 RETURNING(SQL Server는 OUTPUT)으로 받을 수 있는지 확인
+
+    Oracle의 RETURNING INTO는 결과 집합이 아니라 OUT 바인드 변수이므로 제외합니다.
+    """
+    if db_type == 'Oracle':
+        return False
+    return bool(getattr(engine.dialect, f"{kind}_returning", False))
+
+
+def delete_sql(db_type: str, quoted_table: str, where: str, returning: bool = False) -> str:
+    if not returning:
+        return f"DELETE FROM {quoted_table} WHERE {where}"
+    if db_type == 'SQLServer':
+        return f"DELETE FROM {quoted_table} OUTPUT DELETED.* WHERE {where}"
+    return f"DELETE FROM {quoted_table} WHERE {where} RETURNING *"
+
+
+def update_sql(db_type: str, quoted_table: str, set_clause: str, where: str, returning: bool = False) -> str:
+    if not returning:
+        return f"UPDATE {quoted_table} SET {set_clause} WHERE {where}"
+    if db_type == 'SQLServer':
+        return f"UPDATE {quoted_table} SET {set_clause} OUTPUT INSERTED.* WHERE {where}"
+    return f"UPDATE {quoted_table} SET {set_clause} WHERE {where} RETURNING *"
+
+
+def delete_batch_sql(db_type: str, quoted_table: str, where: str, batch_size: int) -> str:
+    """조건에 맞는 행을 최대 batch_size개만 삭제하는 DELETE 문 (긴 잠금 방지용)"""
+    batch_size = int(batch_size)
+    if db_type == 'PostgreSQL':
+        return (f"DELETE FROM {quoted_table} WHERE ctid IN "
+                f"(SELECT ctid FROM {quoted_table} WHERE {where} LIMIT {batch_size})")
+    if db_type == 'MySQL':
+        return f"DELETE FROM {quoted_table} WHERE {where} LIMIT {batch_size}"
+    if db_type == 'SQLServer':
+        return f"DELETE TOP ({batch_size}) FROM {quoted_table} WHERE {where}"
+    if db_type == 'Oracle':
+        return f"DELETE FROM {quoted_table} WHERE ({where}) AND ROWNUM <= {batch_size}"
+    if db_type == 'SQLite':
+        return (f"DELETE FROM {quoted_table} WHERE rowid IN "
+                f"(SELECT rowid FROM {quoted_table} WHERE {where} LIMIT {batch_size})")
+    raise ValueError(f"Batched delete is not supported for {db_type}")
+
+
+def keyset_condition(quoted_keys: list, param_prefix: str = "k") -> str:
+    """키셋 페이지네이션 조건 - (k1, k2, ...) > (:k0, :k1, ...)
+
+    행 값 비교를 지원하지 않는 DB(Oracle, SQL Server)가 있으므로 OR/AND로 풀어서 작성합니다.
+    """
+    clauses = []
+    for i, key in enumerate(quoted_keys):
+        parts = [f"{quoted_keys[j]} = :{param_prefix}{j}" for j in range(i)]
+        parts.append(f"{key} > :{param_prefix}{i}")
+        clauses.append("(" + " AND ".join(parts) + ")")
+    return " OR ".join(clauses)
+
+
+def encode_cursor(state: dict) -> str:
+    """페이지네이션 상태를 불투명한 continuation 토큰으로 변환"""
+    raw = json.dumps(state, separators=(',', ':'), ensure_ascii=False, default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> dict:
+    """continuation 토큰을 페이지네이션 상태로 복원 (잘못된 토큰이면 ValueError)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor")
+    return state
+
+
+def _split_sql(sql: str):
+    """주석을 제거한 SQL과, 그중 문자열/따옴표 식별자를 공백으로 바꾼 골격 반환"""
+    code = []
+    skeleton = []
+    i = 0
+    n = len(sql)
+    while i < n:
+        ch = sql[i]
+        if sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            if end == -1:
+                raise ValueError("Unterminated comment")
+            code.append(' ')
+            skeleton.append(' ')
+            i = end + 2
+            continue
+        if ch in ("'", '"', '`', '['):
+            close = ']' if ch == '[' else ch
+            j = i + 1
+            while True:
+                j = sql.find(close, j)
+                if j == -1:
+                    raise ValueError("Unterminated quoted string")
+                # '' 처럼 두 번 쓰면 이스케이프
+                if close != ']' and sql.startswith(close * 2, j):
+                    j += 2
+                    continue
+                break
+            code.append(sql[i:j + 1])
+            skeleton.append(' ' * (j + 1 - i))
+            i = j + 1
+            continue
+        code.append(ch)
+        skeleton.append(ch)
+        i += 1
+    return ''.join(code), ''.join(skeleton)
+
+
+def validate_select(sql: str) -> str:
+    """SELECT(또는 WITH ... SELECT) 문 하나인지 검사하고 실행할 SQL 반환 (아니면 ValueError)"""
+    code, skeleton = _split_sql(sql)
+    code = code.strip().rstrip(';').strip()
+    skeleton = skeleton.strip().rstrip(';').strip()
+
+    if not skeleton:
+        raise ValueError("Empty query")
+    if ';' in skeleton:
+        raise ValueError("Only a single statement is allowed")
+    first_word = skeleton.split(None, 1)[0].upper()
+    if first_word not in ('SELECT', 'WITH'):
+        raise ValueError("Only SELECT queries are allowed")
+    match = FORBIDDEN_KEYWORDS.search(skeleton)
+    if match:
+        raise ValueError(f"'{match.group(0).upper()}' is not allowed in a read-only query")
+    return code
+
+
+@contextmanager
+def read_only(conn, db_type: str):
+    """현재 트랜잭션을 읽기 전용으로 설정 (지원하는 DB만, SQL Server는 검증으로 대신함)"""
+    if db_type in ('PostgreSQL', 'Oracle', 'MySQL'):
+        conn.execute(text("SET TRANSACTION READ ONLY"))
+        yield
+    elif db_type == 'SQLite':
+        conn.execute(text("PRAGMA query_only = ON"))
+        try:
+            yield
+        finally:
+            conn.execute(text("PRAGMA query_only = OFF"))
+    else:
+        yield
+
+
+@contextmanager
+def statement_timeout(conn, db_type: str, seconds: float):
+    """DB별 문장 실행 시간 제한 - 블록이 끝나면 풀로 돌아가는 커넥션을 원래 상태로 복구
+
+    - PostgreSQL: SET LOCAL statement_timeout (트랜잭션 범위)
+    - MySQL: max_execution_time (SELECT에만 적용, 끝나면 이전 세션 값으로 복구)
+    - Oracle: oracledb call_timeout
+    - SQLite: progress handler로 시간 초과 시 중단
+    - SQL Server: pyodbc는 connection.timeout, pymssql은 제한 시간이 지나면 타이머 스레드에서 dbcancel
+    """
+    ms = max(1, int(seconds * 1000))
+    dbapi_conn = conn.connection.dbapi_connection
+
+    if db_type == 'PostgreSQL':
+        conn.execute(text(f"SET LOCAL statement_timeout = {ms}"))
+        yield
+    elif db_type == 'MySQL':
+        # 서버/DSN에 설정된 세션 값이 있을 수 있으므로 0이 아니라 원래 값으로 복구
+        previous = int(conn.execute(text("SELECT @@SESSION.max_execution_time")).scalar() or 0)
+        conn.execute(text(f"SET SESSION max_execution_time = {ms}"))
+        try:
+            yield
+        finally:
+            conn.execute(text(f"SET SESSION max_execution_time = {previous}"))
+    elif db_type == 'Oracle' and hasattr(dbapi_conn, 'call_timeout'):
+        previous = dbapi_conn.call_timeout
+        dbapi_conn.call_timeout = ms
+        try:
+            yield
+        finally:
+            dbapi_conn.call_timeout = previous
+    elif db_type == 'SQLite' and hasattr(dbapi_conn, 'set_progress_handler'):
+        deadline = time.monotonic() + seconds
+        dbapi_conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+        try:
+            yield
+        finally:
+            dbapi_conn.set_progress_handler(None, 0)
+    elif db_type == 'SQLServer' and hasattr(dbapi_conn, 'timeout') and not hasattr(dbapi_conn, '_conn'):
+        # pyodbc: 커넥션의 쿼리 제한 시간(초)
+        previous = dbapi_conn.timeout
+        dbapi_conn.timeout = max(1, math.ceil(seconds))
+        try:
+            yield
+        finally:
+            dbapi_conn.timeout = previous
+    elif db_type == 'SQLServer':
+        # pymssql: 커넥션 단위 제한 시간이 없어 타이머로 dbcancel 호출
+        timer = threading.Timer(seconds, cancel_statement, (dbapi_conn, None, conn.engine))
+        timer.daemon = True
+        timer.start()
+        try:
+            yield
+        finally:
+            timer.cancel()
+    else:
+        yield
+
+
+def stream_select(conn, db_type: str, query: str, params: dict, max_rows: int, timeout: float,
+                  byte_budget: int):
+    """검증된 SELECT를 읽기 전용 트랜잭션에서 서버 측 커서로 조금씩 읽음 - (헤더, 행, 중단 사유)
+
+    행 수/크기/시간 예산을 넘으면 중단합니다. 읽기 전용 설정과 문장 제한 시간(SET ...)은 일반 커넥션에서
+    실행하고 stream_results는 SELECT 문에만 지정합니다. 커넥션에 지정하면 psycopg2가 SET 문까지
+    이름 있는 커서(DECLARE ... CURSOR FOR SET ...)로 실행해 문법 오류가 납니다.
+    """
+    started = time.monotonic()
+    rows = []
+    fetched_bytes = 0
+    stopped = None
+
+    with read_only(conn, db_type), statement_timeout(conn, db_type, timeout):
+        result = conn.execute(text(query).execution_options(stream_results=True, max_row_buffer=100),
+                              params or {})
+        headers = list(result.keys())
+        while True:
+            chunk = result.fetchmany(100)
+            if not chunk:
+                break
+            for row in chunk:
+                if len(rows) >= max_rows:
+                    stopped = f"row budget ({max_rows} rows)"
+                    break
+                rows.append(row)
+                fetched_bytes += sum(len(str(val)) for val in row if val is not None)
+                if fetched_bytes > byte_budget:
+                    stopped = f"size budget ({byte_budget:,} bytes)"
+                    break
+            if stopped:
+                break
+            if time.monotonic() - started > timeout:
+                stopped = f"time budget ({timeout}s)"
+                break
+        result.close()
+    return headers, rows, stopped
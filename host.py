@@ -3,52 +3,172 @@ import asyncio
 import nest_asyncio
 import traceback
 import json
+import time
+import uuid
+from contextlib import aclosing
 from langchain_core.messages import HumanMessage
-from client import create_agent
+from client import CLIENT_SESSION, answer_from_results, create_agent
+from conversation_memory import ConversationMemory
+from semantic_cache import SEMANTIC_CACHE
+import telemetry
 
 # ----------------------------------------------------
 # 1. 비동기(async) 및 에이전트 실행 관련 설정
 # ----------------------------------------------------
 
 nest_asyncio.apply()
+
+# 대화 기록을 토큰 예산 안으로 줄여서 에이전트에 전달 (오래된 도구 결과는 요약)
+MEMORY = ConversationMemory()
+
 if "event_loop" not in st.session_state:
     st.session_state.event_loop = asyncio.new_event_loop()
     asyncio.set_event_loop(st.session_state.event_loop)
 
+# 브라우저 세션 ID - 도구 호출의 _meta로 서버에 전달되어 세션 간 공정한 대기열 순서에 사용
+if "client_session" not in st.session_state:
+    st.session_state.client_session = uuid.uuid4().hex
+CLIENT_SESSION.set(st.session_state.client_session)
+
+# 화면 갱신 최대 횟수(초당) - 토큰마다 다시 그리지 않도록 제한
+RENDER_FPS = 15
+
+
+class RenderThrottle:
+    """placeholder 갱신을 초당 fps회 이하로 모아서 실행하고 렌더링에 쓴 시간을 측정"""
+
+    def __init__(self, fps: int = RENDER_FPS):
+        self.interval = 1.0 / fps
+        self.last = 0.0
+        self.frames = 0
+        self.render_time = 0.0
+
+    def render(self, draw, force=False):
+        now = time.perf_counter()
+        if not force and now - self.last < self.interval:
+            return False
+        draw()
+        self.last = time.perf_counter()
+        self.frames += 1
+        self.render_time += self.last - now
+        return True
+
+
+def format_tool_info(tool_calls, tool_results):
+    """도구 호출 요청(JSON)과 응답(markdown)을 하나의 문자열로 (대화 기록 저장 형식)"""
+    if not tool_calls:
+        return ""
+    tool_calls_pretty = json.dumps(tool_calls, indent=2, ensure_ascii=False)
+    info = f"```json\n# Tool Call Request (호출 요청)\n{tool_calls_pretty}\n```"
+    for call in tool_calls:
+        if call["id"] in tool_results:
+            info += (f"\n\n```markdown\n# Tool Call Response (호출 응답) - {call['name']}\n"
+                     f"{tool_results[call['id']]}\n```")
+    return info
+
+
 async def get_agent_response(inputs, text_placeholder, tool_placeholder):
     final_text = ""
-    tool_request_info = ""
-    tool_response_info = ""
-    tool_call_id = None
-
-    async for chunk in st.session_state.agent.astream(inputs, stream_mode="updates"):
-        if "agent" in chunk:
-            messages = chunk["agent"].get("messages", [])
-            if messages:
-                if hasattr(messages[-1], 'tool_calls') and messages[-1].tool_calls:
-                    tool_call_id = messages[-1].tool_calls[0]['id']
-                    tool_calls_pretty = json.dumps(messages[-1].tool_calls, indent=2, ensure_ascii=False)
-                    tool_request_info = f"```json\n# Tool Call Request (호출 요청)\n{tool_calls_pretty}\n```"
-                    with tool_placeholder.expander("🔧 도구 호출 정보", expanded=True):
-                        st.markdown(tool_request_info)
-                if messages[-1].content:
-                    final_text = messages[-1].content
-                    text_placeholder.markdown(final_text + " ▌")
+    message_id = None
+    tool_calls = []        # 병렬 호출을 포함한 모든 도구 호출
+    tool_results = {}      # tool_call_id -> 응답
+    tools_dirty = False
+    throttle = RenderThrottle()
+    started = time.perf_counter()
+    first_token = None
+    tokens = 0
+
+    def draw_tools():
+        with tool_placeholder.container():
+            with st.expander(f"🔧 도구 호출 정보 ({len(tool_calls)})", expanded=True):
+                st.markdown(format_tool_info(tool_calls, tool_results))
+
+    # 턴 전체를 하나의 trace로 기록 - 도구 호출 span과 서버 span이 하위에 연결됨
+    with telemetry.span("agent turn") as turn_span:
+        # messages: LLM 토큰 단위 스트림, updates: 완성된 도구 호출/응답
+        # 화면 갱신 중 예외(사용자가 페이지를 떠남, 재귀 한도 초과 등)가 나면 스트림을 바로 닫아 실행 중인
+        # 도구 호출을 취소 - 도구 호출의 MCP 세션이 닫히면 서버가 실행 중인 SQL을 DB에서 중단함
+        async with aclosing(st.session_state.agent.astream(inputs, stream_mode=["messages", "updates"])) as stream:
+            async for mode, chunk in stream:
+                if mode == "messages":
+                    message, metadata = chunk
+                    if metadata.get("langgraph_node") != "agent" or not isinstance(message.content, str):
+                        continue
+                    if message.id != message_id:
+                        # 새 응답 메시지가 시작되면 이전(도구 호출 전) 텍스트 대신 표시
+                        message_id = message.id
+                        final_text = ""
+                    if message.content:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        tokens += 1
+                        final_text += message.content
+                        throttle.render(lambda: text_placeholder.markdown(final_text + " ▌"))
+                    continue
+
+                if "agent" in chunk:
+                    for message in chunk["agent"].get("messages", []):
+                        if getattr(message, "tool_calls", None):
+                            tool_calls.extend(message.tool_calls)
+                            tools_dirty = True
+                        if message.content and isinstance(message.content, str):
+                            final_text = message.content
+
+                if "tools" in chunk:
+                    for message in chunk["tools"].get("messages", []):
+                        tool_results[message.tool_call_id] = message.content
+                        tools_dirty = True
+
+                if tools_dirty and throttle.render(draw_tools):
+                    tools_dirty = False
+
+        if tools_dirty:
+            throttle.render(draw_tools, force=True)
+        throttle.render(lambda: text_placeholder.markdown(final_text), force=True)
+
+    st.session_state.stream_stats = {
+        "ttft": first_token,
+        "total": time.perf_counter() - started,
+        "tokens": tokens,
+        "frames": throttle.frames,
+        "render_ms": throttle.render_time * 1000,
+    }
+    st.session_state.turn_breakdown = dict(telemetry.turn_breakdown(turn_span.spans),
+                                           render=throttle.render_time * 1000)
+    tool_call_id = tool_calls[0]["id"] if tool_calls else None
+    return final_text, format_tool_info(tool_calls, tool_results), tool_call_id, tool_calls
+
+
+async def replay_cached_plan(question, entry, text_placeholder, tool_placeholder):
+    """의미 기반 캐시 적중 - 저장된 도구 호출을 최신 데이터로 다시 실행하고 답변만 생성"""
+    started = time.perf_counter()
+    with telemetry.span("agent turn", cached=True) as turn_span:
+        results = await SEMANTIC_CACHE.replay(entry, st.session_state.tool_list)
         
-        if "tools" in chunk:
-            messages = chunk["tools"].get("messages", [])
-            if messages:
-                tool_response_content = messages[-1].content
-                tool_response_info = f"```markdown\n# Tool Call Response (호출 응답)\n{tool_response_content}\n```"
-                with tool_placeholder.expander("🔧 도구 호출 정보", expanded=True):
-                    st.markdown(tool_request_info)
-                    st.markdown(tool_response_info)
+        tool_calls, tool_results = [], {}
+        for idx, (call, result) in enumerate(results):
+            call_id = f"cached-{idx}"
+            tool_calls.append({"name": call["name"], "args": call["args"], "id": call_id, "type": "tool_call"})
+            tool_results[call_id] = result if isinstance(result, str) else str(result)
+        if tool_calls:
+            with tool_placeholder.container():
+                with st.expander(f"⚡ 캐시된 계획 재사용 (유사도 {entry['similarity']:.2f}, 도구 {len(tool_calls)}개)",
+                                 expanded=True):
+                    st.markdown(format_tool_info(tool_calls, tool_results))
         
-        await asyncio.sleep(0.01)
+        if results:
+            answer = await answer_from_results(st.session_state.model_name, question, results)
+        else:
+            # 도구 호출 없이 답한 질문은 저장된 답변 사용
+            answer = entry["answer"]
+        text_placeholder.markdown(answer)
     
-    text_placeholder.markdown(final_text)
-    full_tool_info = (tool_request_info + "\n\n" + tool_response_info).strip()
-    return final_text, full_tool_info, tool_call_id
+    elapsed = time.perf_counter() - started
+    SEMANTIC_CACHE.record_saving(entry["elapsed"] - elapsed)
+    st.session_state.stream_stats = {"ttft": None, "total": elapsed, "tokens": 0, "frames": 1, "render_ms": 0.0}
+    st.session_state.turn_breakdown = dict(telemetry.turn_breakdown(turn_span.spans), render=0.0)
+    tool_call_id = tool_calls[0]["id"] if tool_calls else None
+    return answer, format_tool_info(tool_calls, tool_results), tool_call_id
 
 # ----------------------------------------------------
 # 2. Streamlit UI 구성
@@ -122,6 +242,42 @@ with st.sidebar:
         # ▲▲▲ 여기까지 입니다 ▲▲▲
         
         st.markdown(f"<p style='margin-top: 0.5rem;'><b>MCP Status</b>: {st.session_state.get('mcp_status', 'Not Connected')}</p>", unsafe_allow_html=True)
+        
+        prompt_stats = st.session_state.get('prompt_stats')
+        if prompt_stats:
+            st.markdown(f"<p style='margin-top: 0.5rem;'><b>Prompt</b>: {prompt_stats['prompt_tokens']:,} tokens "
+                        f"(saved {prompt_stats['saved_tokens']:,} of {prompt_stats['original_tokens']:,})</p>",
+                        unsafe_allow_html=True)
+        
+        stream_stats = st.session_state.get('stream_stats')
+        if stream_stats:
+            ttft = f"{stream_stats['ttft']:.2f}s" if stream_stats['ttft'] is not None else "N/A"
+            st.markdown(f"<p style='margin-top: 0.5rem;'><b>Response</b>: first token {ttft}, "
+                        f"total {stream_stats['total']:.2f}s<br>"
+                        f"{stream_stats['tokens']:,} chunks, {stream_stats['frames']} renders "
+                        f"({stream_stats['render_ms']:.0f} ms)</p>",
+                        unsafe_allow_html=True)
+        
+        breakdown = st.session_state.get('turn_breakdown')
+        if breakdown:
+            # 마지막 턴의 단계별 소요 시간 (LLM / MCP 전송 / 서버 대기 / SQL / 결과 변환 / 화면 갱신)
+            st.markdown(f"<p style='margin-top: 0.5rem;'><b>Turn Breakdown</b>: {breakdown['total'] / 1000:.2f}s, "
+                        f"{breakdown['tool_calls']} tool calls<br>"
+                        f"LLM {breakdown['llm']:.0f} ms · MCP transport {breakdown['transport']:.0f} ms<br>"
+                        f"server queue {breakdown['queue']:.0f} ms · SQL {breakdown['sql']:.0f} ms "
+                        f"({breakdown['db_round_trips']:g} round trips) · format {breakdown['format']:.0f} ms · "
+                        f"other {breakdown['server_other']:.0f} ms<br>"
+                        f"{breakdown['rows']:,g} rows, {breakdown['bytes'] / 1024:,.1f} KB returned · "
+                        f"render {breakdown['render']:.0f} ms</p>",
+                        unsafe_allow_html=True)
+        
+        cache_stats = SEMANTIC_CACHE.stats()
+        if cache_stats["lookups"]:
+            st.markdown(f"<p style='margin-top: 0.5rem;'><b>Semantic Cache</b>: {cache_stats['hits']}/{cache_stats['lookups']} hits "
+                        f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} entries<br>"
+                        f"saved ~{cache_stats['saved_seconds']:.1f}s, invalidated {cache_stats['invalidations']}, "
+                        f"replay failures {cache_stats['replay_failures']}</p>",
+                        unsafe_allow_html=True)
 
     st.markdown("---")
     
@@ -167,12 +323,37 @@ if prompt := st.chat_input("여기에 메시지를 입력하세요..."):
         text_placeholder = st.empty()
         
         try:
-            inputs = {"messages": st.session_state.messages}
+            # 최근 턴은 그대로, 오래된 도구 결과는 요약/제외해서 전달
+            prompt_messages, prompt_stats = MEMORY.build(st.session_state.messages)
+            st.session_state.prompt_stats = prompt_stats
+            inputs = {"messages": prompt_messages}
 
             loop = st.session_state.event_loop
-            response_content, tool_info, tool_call_id = loop.run_until_complete(
-                get_agent_response(inputs, text_placeholder, tool_placeholder)
-            )
+            started = time.perf_counter()
+            
+            # 비슷한 질문의 도구 호출 계획이 있으면 LLM 계획 단계 없이 재실행
+            # 캐시는 질문 텍스트만으로 비교하므로 이전 대화가 없는 첫 질문에만 사용
+            # ("다음 페이지 보여줘", "그 중 3학년만" 같은 후속 질문은 다른 대화의 계획과 맞지 않음)
+            standalone = not any(msg["role"] == "user" for msg in st.session_state.messages[:-1])
+            response = None
+            cached = SEMANTIC_CACHE.lookup(prompt) if standalone else None
+            if cached is not None:
+                try:
+                    response = loop.run_until_complete(
+                        replay_cached_plan(prompt, cached, text_placeholder, tool_placeholder)
+                    )
+                except Exception:
+                    response = None  # 재실행에 실패하면 에이전트가 처리
+            
+            if response is not None:
+                response_content, tool_info, tool_call_id = response
+            else:
+                response_content, tool_info, tool_call_id, tool_calls = loop.run_until_complete(
+                    get_agent_response(inputs, text_placeholder, tool_placeholder)
+                )
+                SEMANTIC_CACHE.note_writes(tool_calls)
+                if standalone:
+                    SEMANTIC_CACHE.store(prompt, tool_calls, response_content, time.perf_counter() - started)
             
         except Exception as e:
             response_content = f"오류가 발생했습니다: {traceback.format_exc()}"
@@ -1,12 +1,237 @@
+import time
+_STARTED = time.perf_counter()  # 시작 시간 측정 (import 포함)
+
+import asyncio
+import contextvars
+import io
+import itertools
 import json
+import logging
+import os
+from contextlib import asynccontextmanager
 from mcp.server.fastmcp import FastMCP
-from sqlalchemy import create_engine, inspect, text
+from mcp.types import CallToolResult, TextContent
+from sqlalchemy import text
+import telemetry
+from db_bulk import INPUT_FORMATS, bulk_insert_records, iter_records, resolve_input_file, scan_record_keys
+from db_admission import ADMISSION_READ, AdmissionController, AdmissionRejected
+from db_cache import ResultCache
+from db_cancel import install_cancel_hooks
+from db_catalog import SchemaCache, get_row_counts
+from db_engines import EngineRegistry
+from db_executor import DBExecutor
+from db_explain import PlanGuard, PlanRejected
+from db_format import RESULT_MAX_BYTES, format_rows, parse_column_limits, resolve_format
+from db_join import load_fk_graph, plan_joins
+from db_profile import PROFILE_MAX_COLUMNS, PROFILE_TIMEOUT, format_profile, profile_columns, sample_percent_for
+from db_schema_index import SCHEMA_SAMPLE_ROWS, SchemaIndex, schema_documents
+from db_search import METHOD_DESCRIPTIONS, SEARCH_MODES, detect_text_index, is_btree_indexed, search_plan
+from db_sql import (decode_cursor, delete_batch_sql, delete_sql, encode_cursor, keyset_condition,
+                    parse_value, read_only, select_sql, statement_timeout, stream_select, supports_returning,
+                    update_sql, validate_select)
+
+# stdio 모드에서는 stdout이 MCP 프로토콜용이므로 로그는 stderr로만 출력
+logger = logging.getLogger("mcp_server_db")
+
+# 시작 단계별 소요 시간(초) - server_status에서 확인
+STARTUP = {"imports": time.perf_counter() - _STARTED}
+
+# 서버 시작 후 백그라운드에서 미리 연결할 DB ("all" 또는 쉼표로 구분한 이름, 비어 있으면 사용 안 함)
+PREWARM = os.environ.get("MCP_PREWARM", "")
 
 # DB 연결 카탈로그
 with open('connections.json', 'r', encoding='utf-8') as f:
     DB_CONNECTIONS = json.load(f)
 
-mcp = FastMCP("DatabaseMCP")
+# DB별 Engine(커넥션 풀) 레지스트리 - 처음 사용할 때 생성 후 재사용
+ENGINES = EngineRegistry(DB_CONNECTIONS)
+
+# DB 작업은 이벤트 루프를 막지 않도록 스레드 풀에서 실행
+DB_EXECUTOR = DBExecutor()
+install_cancel_hooks()
+
+# 도구 1회 실행 시간 제한(초) - 넘거나 클라이언트가 요청을 취소하면 실행 중인 SQL을 DB에서 중단
+# 도구별 값: MCP_TOOL_TIMEOUTS="bulk_insert=900,delete_data=600"
+TOOL_TIMEOUT = float(os.environ.get("MCP_TOOL_TIMEOUT", "120"))
+TOOL_TIMEOUTS = {name.strip(): float(value) for name, value in
+                 (item.split('=', 1) for item in os.environ.get("MCP_TOOL_TIMEOUTS", "").split(',') if '=' in item)}
+
+# DB별 동시 실행 제한 - 읽기/쓰기 lane을 나누고, 자리가 없으면 클라이언트 세션 순서대로 돌아가며 대기
+ADMISSION = AdmissionController()
+
+# database 인자로 대상 DB가 정해지는 도구의 lane (그 외 도구는 제한 없이 실행)
+TOOL_LANES = {
+    "list_tables": "read", "show_data": "read", "search_data": "read", "join_tables": "read",
+    "run_query": "read", "profile_table": "read", "refresh_schema": "read",
+    "add_data": "write", "bulk_insert": "write", "delete_data": "write", "update_data": "write",
+    "create_table": "write",
+}
+
+# 현재 도구 호출의 클라이언트 세션 (_meta.session, 없으면 trace ID) - query_databases의 DB별 대기에 사용
+CLIENT_SESSION = contextvars.ContextVar("client_session", default=None)
+
+# 스키마 메타데이터 캐시 - DDL 실행 시 invalidate_schema()로 무효화
+SCHEMA_CACHE = SchemaCache(ENGINES)
+
+# 조회 결과 캐시 - 서버를 통한 쓰기 시 invalidate_table()로 테이블 단위 무효화
+RESULT_CACHE = ResultCache()
+
+# 실행 전 EXPLAIN 검사 - 큰 테이블 전체 스캔 같은 쿼리를 실행 전에 막거나 대체 쿼리로 변경
+PLAN_GUARD = PlanGuard()
+
+# 스키마 검색 인덱스 (FAISS) - DB별로 마지막 동기화 시각을 기록하고 스키마 변경 시 다시 동기화
+SCHEMA_INDEX = SchemaIndex()
+SCHEMA_INDEX_SYNCED = {}
+
+# 도구별 지표 (지연 시간 히스토그램, SQL 횟수/시간, 행 수, 반환 바이트) - get_metrics, /metrics
+TOOL_METRICS = telemetry.ToolMetrics()
+telemetry.install_sqlalchemy_hooks()
+
+STARTUP["config"] = time.perf_counter() - _STARTED - STARTUP["imports"]
+
+
+def _prewarm_database(database: str) -> float:
+    """커넥션 풀과 스키마 캐시를 미리 채움 - 첫 요청의 연결/리플렉션 지연 제거"""
+    started = time.perf_counter()
+    engine = ENGINES.get(database)
+    with engine.connect():
+        pass
+    for table in SCHEMA_CACHE.table_names(database):
+        SCHEMA_CACHE.columns(database, table)
+        SCHEMA_CACHE.primary_key(database, table)
+    return time.perf_counter() - started
+
+
+async def _prewarm(databases: list):
+    # 드라이버 import와 연결은 스레드 풀에서 실행되므로 핸드셰이크와 요청 처리를 막지 않음
+    results = await asyncio.gather(*(DB_EXECUTOR.run(_prewarm_database, name) for name in databases),
+                                   return_exceptions=True)
+    STARTUP["prewarm"] = {}
+    for name, result in zip(databases, results):
+        if isinstance(result, BaseException):
+            STARTUP["prewarm"][name] = f"failed: {str(result).splitlines()[0] if str(result) else type(result).__name__}"
+        else:
+            STARTUP["prewarm"][name] = f"{result:.2f}s"
+    logger.info("prewarm finished: %s", STARTUP["prewarm"])
+
+
+_PREWARM_TASK = None
+
+
+@asynccontextmanager
+async def server_lifespan(server):
+    """서버 시작 시 한 번만 실행하는 작업 (준비 시간 기록, 미리 준비)
+
+    stateless streamable-HTTP에서는 요청마다 Server.run이 실행되어 lifespan에 다시 들어오므로
+    처음 들어왔을 때만 실행합니다 (await 전에 확인하고 기록하므로 동시 요청에도 한 번만 실행됨).
+    미리 준비 작업은 특정 세션에 묶이지 않도록 모듈에 보관하며, 요청이 끝나도 취소하지 않습니다.
+    """
+    global _PREWARM_TASK
+    if "ready" not in STARTUP:
+        STARTUP["ready"] = time.perf_counter() - _STARTED
+        logger.info("server ready in %.3fs (imports %.3fs, config %.3fs)",
+                    STARTUP["ready"], STARTUP["imports"], STARTUP["config"])
+        if PREWARM:
+            names = list(DB_CONNECTIONS) if PREWARM == "all" else \
+                [name.strip() for name in PREWARM.split(',') if name.strip() in DB_CONNECTIONS]
+            _PREWARM_TASK = asyncio.create_task(_prewarm(names))
+    yield {}
+
+
+def tool_deadline(name: str, arguments: dict) -> float:
+    """도구 호출의 실행 시간 제한(초)
+
+    timeout 인자가 있는 도구(run_query, query_databases)는 DB 쪽 문장 제한 시간이 먼저 적용되도록
+    그 값에 여유 시간을 더해 사용합니다.
+    """
+    deadline = TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT)
+    timeout = (arguments or {}).get("timeout")
+    if isinstance(timeout, (int, float)):
+        deadline = max(1, min(timeout, 300)) + 5
+    elif name == "profile_table":
+        deadline = max(deadline, PROFILE_TIMEOUT + 5)
+    return deadline
+
+
+def admission_settings(database: str) -> dict:
+    """DB의 동시 실행 한도 - 읽기 기본값은 커넥션 풀 크기, connections.json의 "admission"으로 변경"""
+    settings = dict(DB_CONNECTIONS[database].get("admission", {}))
+    if not ADMISSION_READ:
+        settings.setdefault("read", ENGINES.pool_settings(database)["pool_size"])
+    return settings
+
+
+def client_session(meta, request_context) -> str:
+    """공정 대기열의 세션 키 - 클라이언트가 보낸 _meta.session, trace ID, MCP 세션 순"""
+    extra = (meta.model_extra or {}) if meta is not None else {}
+    if extra.get("session"):
+        return str(extra["session"])
+    remote = telemetry.parse_traceparent(extra.get("traceparent") or "")
+    if remote:
+        return remote[0]
+    return f"mcp-{id(request_context.session)}" if request_context is not None else "local"
+
+
+class TracedFastMCP(FastMCP):
+    """도구 호출마다 span을 만들고 TOOL_METRICS에 기록하는 FastMCP
+
+    클라이언트가 요청의 _meta.traceparent를 보내면 같은 trace의 하위 span으로 이어지고,
+    서버 쪽 span 목록은 결과의 _meta.spans로 돌려줍니다 (도구 결과 텍스트는 그대로).
+    실행 시간 제한(tool_deadline)을 넘으면 호출을 취소하며, DB_EXECUTOR가 실행 중인 SQL을 중단합니다.
+    DB를 사용하는 도구는 ADMISSION에서 그 DB의 읽기/쓰기 자리를 얻은 뒤 실행하고 (대기 시간도 제한 시간에 포함),
+    대기열이 가득 차면 바로 재시도 안내를 돌려줍니다.
+    """
+
+    async def call_tool(self, name, arguments):
+        try:
+            request_context = self._mcp_server.request_context
+            meta = request_context.meta
+        except LookupError:
+            request_context, meta = None, None
+        traceparent = (meta.model_extra or {}).get("traceparent") if meta is not None else None
+        session = client_session(meta, request_context)
+        CLIENT_SESSION.set(session)
+
+        database = (arguments or {}).get("database")
+        lane = TOOL_LANES.get(name) if database in DB_CONNECTIONS else None
+        call = super().call_tool
+
+        async def admitted():
+            if lane is None:
+                return await call(name, arguments)
+            async with ADMISSION.admit(database, lane, session, admission_settings(database)) as waited:
+                telemetry.count("queue_ms", waited * 1000)
+                return await call(name, arguments)
+
+        started = time.perf_counter()
+        deadline = tool_deadline(name, arguments)
+        with telemetry.span(f"tool {name}", traceparent=traceparent) as tool_span:
+            try:
+                results = await asyncio.wait_for(admitted(), deadline)
+            except asyncio.TimeoutError:
+                TOOL_METRICS.observe(name, time.perf_counter() - started, tool_span.attributes, error=True)
+                message = (f"⏱️ {name} did not finish within {deadline:g}s and its running SQL was cancelled. "
+                           f"Narrow the request (filters, smaller limit) and try again")
+                return CallToolResult(content=[TextContent(type="text", text=message)], isError=True,
+                                      _meta={"spans": tool_span.spans})
+            except AdmissionRejected as e:
+                TOOL_METRICS.observe(name, time.perf_counter() - started, tool_span.attributes, error=True)
+                message = f"⏳ {e}. The server is at capacity for this database; retry in a few seconds"
+                return CallToolResult(content=[TextContent(type="text", text=message)], isError=True,
+                                      _meta={"spans": tool_span.spans})
+            except Exception:
+                TOOL_METRICS.observe(name, time.perf_counter() - started, tool_span.attributes, error=True)
+                raise
+
+            content, structured = results if isinstance(results, tuple) else (results, None)
+            telemetry.count("bytes", sum(len(block.text.encode("utf-8")) for block in content
+                                         if isinstance(block, TextContent)))
+        TOOL_METRICS.observe(name, time.perf_counter() - started, tool_span.attributes)
+        return CallToolResult(content=list(content), structuredContent=structured,
+                              _meta={"spans": tool_span.spans})
+
+
+mcp = TracedFastMCP("DatabaseMCP", lifespan=server_lifespan)
 
 def detect_db_type(url: str) -> str:
     """데이터베이스 타입 감지"""
@@ -22,6 +247,116 @@ def detect_db_type(url: str) -> str:
         return 'SQLServer'
     return 'Unknown'
 
+def invalidate_schema(database: str, table: str = None):
+    """DDL 실행 후 호출 - 스키마 변경에 의존하는 캐시 무효화"""
+    SCHEMA_CACHE.invalidate(database, table)
+    RESULT_CACHE.invalidate(database, table)
+    SCHEMA_INDEX_SYNCED.pop(database, None)
+    PLAN_GUARD.invalidate(database)
+
+def invalidate_table(database: str, table: str):
+    """INSERT/UPDATE/DELETE 후 호출 - 해당 테이블을 읽은 조회 결과 무효화"""
+    RESULT_CACHE.invalidate(database, table)
+
+def cached_query(database: str, engine, sql: str, params: dict, tables: list, max_rows: int = None):
+    """읽기 쿼리의 (헤더, 행) - 같은 쿼리는 결과 캐시에서 반환"""
+    def load():
+        with engine.connect() as conn:
+            result = conn.execute(text(sql), params or {})
+            rows = result.fetchmany(max_rows) if max_rows else result.fetchall()
+            telemetry.count("db.rows", len(rows))
+            return list(result.keys()), rows
+    return RESULT_CACHE.get_or_load(database, sql, params, tables, load)
+
+def cached_row_counts(database: str, engine, db_type: str, tables: list, exact: bool = False) -> dict:
+    """get_row_counts() 결과를 결과 캐시에 보관"""
+    return RESULT_CACHE.get_or_load(
+        database, f"ROW COUNTS exact={exact}", {"tables": tables}, tables,
+        lambda: get_row_counts(engine, db_type, tables, exact=exact,
+                               max_connections=ENGINES.pool_settings(database)["pool_size"],
+                               mapper=DB_EXECUTOR.map))
+
+def guarded_sql(database: str, engine, db_type: str, sql: str, params: dict = None, limit: int = None,
+                rewrites=()):
+    """EXPLAIN 검사 후 실행할 (SQL, 파라미터, 안내 문구) 반환 - 한도를 넘으면 PlanRejected
+
+    전체 스캔의 읽는 행 수는 카탈로그 통계(cached_row_counts)로 추정합니다.
+    """
+    def table_rows(names):
+        resolved = {name: SCHEMA_CACHE.resolve_table(database, name) for name in names}
+        tables = sorted({table for table in resolved.values() if table})
+        counts = cached_row_counts(database, engine, db_type, tables) if tables else {}
+        return {name: counts[table][0] for name, table in resolved.items()
+                if table in counts and counts[table][0] is not None}
+
+    return PLAN_GUARD.preflight(database, engine, db_type, sql, params, limit, table_rows,
+                                DB_CONNECTIONS[database].get("explain"), rewrites)
+
+
+PREVIEW_ROWS = 5
+
+
+def _parse_condition(database: str, table: str, condition: str, quote):
+    """'column:value' 조건을 (컬럼, 값, WHERE 절, 파라미터)로 변환 (오류 시 메시지 문자열)"""
+    if ':' not in condition:
+        return "Invalid condition format. Use: column:value (e.g., id:5)"
+    
+    column, value = condition.split(':', 1)
+    column = column.strip()
+    value = value.strip()
+    
+    col_info = SCHEMA_CACHE.resolve_column(database, table, column)
+    if col_info is None:
+        return f"Column '{column}' not found in table '{table}'"
+    
+    typed_value = parse_value(value)
+    if typed_value is None:
+        return column, value, f"{quote(col_info['name'])} IS NULL", {}
+    return column, value, f"{quote(col_info['name'])} = :cond_val", {"cond_val": typed_value}
+
+
+def _select_preview(conn, db_type: str, quoted_table: str, where: str, params: dict):
+    """조건에 맞는 행을 최대 PREVIEW_ROWS개만 조회"""
+    result = conn.execute(text(select_sql(db_type, "*", quoted_table, where=where, limit=PREVIEW_ROWS)), params)
+    rows = result.fetchall()
+    telemetry.count("db.rows", len(rows))
+    return list(result.keys()), rows
+
+
+def _preview_matches(engine, db_type: str, quoted_table: str, where: str, params: dict, count: bool = True):
+    """(일치하는 행 수, 헤더, 미리보기 행) - 데이터는 변경하지 않음"""
+    with engine.connect() as conn:
+        headers, preview = _select_preview(conn, db_type, quoted_table, where, params)
+        total = len(preview)
+        if count and preview:
+            total = conn.execute(text(f"SELECT COUNT(*) FROM {quoted_table} WHERE {where}"), params).scalar()
+    return total, headers, preview
+
+
+def _execute_with_preview(conn, sql: str, params: dict):
+    """RETURNING/OUTPUT이 있는 DML 실행 - 처음 PREVIEW_ROWS개만 보관하고 나머지는 세기만 함"""
+    result = conn.execute(text(sql), params)
+    headers = list(result.keys())
+    preview = result.fetchmany(PREVIEW_ROWS)
+    count = len(preview)
+    while True:
+        chunk = result.fetchmany(1000)
+        if not chunk:
+            break
+        count += len(chunk)
+    telemetry.count("db.rows", count)
+    return count, headers, preview
+
+
+def _format_preview(headers: list, preview: list, total: int) -> str:
+    if not headers or not preview:
+        return ""
+    body, _ = format_rows(headers, preview, "pretty", max_bytes=0)
+    if total > len(preview):
+        body += f"... and {total - len(preview)} more records\n"
+    return body
+
+
 # Tool 1: 데이터베이스 목록
 @mcp.tool()
 async def list_databases() -> str:
@@ -38,28 +373,40 @@ async def list_databases() -> str:
 
 # Tool 2: 테이블 목록 (데이터 개수 포함)
 @mcp.tool()
-async def list_tables(database: str) -> str:
-    """Show all tables in database with row counts"""
+async def list_tables(database: str, exact: bool = False) -> str:
+    """Show all tables in database with row counts.
+    Counts are fast catalog estimates by default; set exact=true to run COUNT(*) on every table."""
+    return await DB_EXECUTOR.run(_list_tables, database, exact)
+
+
+def _list_tables(database: str, exact: bool = False) -> str:
     if database not in DB_CONNECTIONS:
         return f"Database '{database}' not found"
     
     try:
-        engine = create_engine(DB_CONNECTIONS[database]["url"])
-        inspector = inspect(engine)
-        tables = inspector.get_table_names()
+        engine = ENGINES.get(database)
+        tables = SCHEMA_CACHE.table_names(database)
         
         if not tables:
             return f"No tables found in {database}"
         
+        # 기본은 카탈로그 통계(추정치), exact=True이면 COUNT(*)
+        db_type = detect_db_type(DB_CONNECTIONS[database]["url"])
+        counts = cached_row_counts(database, engine, db_type, tables, exact=exact)
+        
         result = f"📊 Tables in '{database}' database:\n\n"
         
         for idx, table in enumerate(tables, 1):
-            try:
-                with engine.connect() as conn:
-                    count = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
-                    result += f"{idx}. {table}: {count:,} records\n"
-            except:
+            count, kind = counts.get(table, (None, None))
+            if count is not None:
+                prefix = "~" if kind == 'estimate' else ""
+                result += f"{idx}. {table}: {prefix}{count:,} records ({kind})\n"
+            elif kind == 'unknown':
+                result += f"{idx}. {table}: ? records (no statistics)\n"
+            else:
                 result += f"{idx}. {table}\n"
+        if any(kind == 'unknown' for _, kind in counts.values()):
+            result += "\n💡 Tables without statistics show '?'. Use exact=true to count them with COUNT(*)\n"
         
         #result += f"\n💡 Use 'show_data' to view actual data from any table"
         return result
@@ -70,11 +417,26 @@ async def list_tables(database: str) -> str:
 
 # Tool 3: 데이터 보기
 @mcp.tool()
-async def show_data(database: str, table: str, limit: int) -> str:
-    """Show actual data from table"""
+async def show_data(database: str, table: str, limit: int, cursor: str = "",
+                    format: str = "", max_bytes: int = 0, truncate: str = "") -> str:
+    """Show actual data from table.
+    To get the next page, call again with the cursor value from the previous result.
+    format: pretty | tsv | json (tsv is the most compact). max_bytes: output size budget.
+    truncate: per-column max length, e.g. name:20,description:50"""
+    return await DB_EXECUTOR.run(_show_data, database, table, limit, cursor, format, max_bytes, truncate)
+
+
+def _show_data(database: str, table: str, limit: int, cursor: str = "",
+               format: str = "", max_bytes: int = 0, truncate: str = "") -> str:
     if database not in DB_CONNECTIONS:
         return f"Database '{database}' not found"
     
+    try:
+        fmt = resolve_format(format)
+        column_limits = parse_column_limits(truncate)
+    except ValueError as e:
+        return str(e)
+    
     # 기본값 및 제한
     if limit <= 0:
         limit = 10
@@ -83,60 +445,92 @@ async def show_data(database: str, table: str, limit: int) -> str:
     
     try:
         db_url = DB_CONNECTIONS[database]["url"]
-        engine = create_engine(db_url)
+        engine = ENGINES.get(database)
         
         # DB 타입 감지 (중요!)
         db_type = detect_db_type(db_url)
         
-        with engine.connect() as conn:
-            # 전체 개수 확인
-            total = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
-            
-            # DB별 다른 쿼리 사용
-            if db_type == 'Oracle':
-                query = text(f"SELECT * FROM {table} WHERE ROWNUM <= :limit")
-                result = conn.execute(query, {"limit": limit})
-            elif db_type == 'SQLServer':
-                query = text(f"SELECT TOP {limit} * FROM {table}")
-                result = conn.execute(query)  # SQL Server는 파라미터 없이
-            else:  # MySQL, PostgreSQL, SQLite
-                query = text(f"SELECT * FROM {table} LIMIT :limit")
-                result = conn.execute(query, {"limit": limit})
-            
-            data = result.fetchall()
-            headers = list(result.keys())
-            
-            if not data:
-                return f"The table '{table}' is empty (no data)"
-            
+        resolved = SCHEMA_CACHE.resolve_table(database, table)
+        if resolved is None:
+            return f"Table '{table}' not found in database '{database}'"
+        table = resolved
+        
+        # 이전 페이지의 continuation 토큰
+        state = {}
+        if cursor:
+            try:
+                state = decode_cursor(cursor)
+            except ValueError:
+                return "Invalid cursor. Call show_data without a cursor to start from the first page"
+            if state.get("db") != database or state.get("t") != table:
+                return f"This cursor belongs to another table ({state.get('db')}.{state.get('t')})"
+        
+        quote = engine.dialect.identifier_preparer.quote
+        pk_cols = SCHEMA_CACHE.primary_key(database, table)
+        quoted_pk = [quote(col) for col in pk_cols]
+        params = {}
+        
+        if pk_cols:
+            # 키셋 페이지네이션: 마지막으로 본 PK 다음부터 읽으므로 몇 번째 페이지든 비용이 같음
+            where = None
+            if state.get("k"):
+                where = keyset_condition(quoted_pk)
+                params = {f"k{i}": val for i, val in enumerate(state["k"])}
+            sql = select_sql(db_type, "*", quote(table), where=where,
+                             order_by=", ".join(quoted_pk), limit=limit + 1)
+        else:
+            # PK가 없는 테이블은 OFFSET으로 대체
+            sql = select_sql(db_type, "*", quote(table), limit=limit + 1, offset=state.get("o", 0))
+        
+        headers, data = cached_query(database, engine, sql, params, [table], max_rows=limit + 1)
+        
+        has_more = len(data) > limit
+        data = data[:limit]
+        
+        if not data:
+            if state:
+                return f"No more data in '{table}' table"
+            return f"The table '{table}' is empty (no data)"
+        
+        # 전체 개수는 첫 페이지에서만 구하고(카탈로그 추정치 우선) 토큰에 담아 재사용
+        if "n" in state:
+            total, total_kind = state["n"], state["nk"]
+        else:
+            total, total_kind = cached_row_counts(database, engine, db_type, [table]).get(table, (None, None))
+        
+        start = state.get("o", 0)
+        body, shown = format_rows(headers, data, fmt, max_bytes=max_bytes or RESULT_MAX_BYTES,
+                                  column_limits=column_limits)
+        # 출력 예산 때문에 잘린 경우 다음 페이지는 잘린 지점부터 시작
+        if shown < len(data):
+            data = data[:shown]
+            has_more = True
+        
+        total_str = ""
+        if total is not None:
+            prefix = "~" if total_kind == 'estimate' else ""
+            total_str = f" of {prefix}{total:,} total records"
+        
+        if fmt == "pretty":
             # 사용자 친화적 출력
             output = f"📊 Data from '{table}' table:\n"
-            output += f"📌 Showing {len(data)} of {total:,} total records\n\n"
-            
-            # 컬럼 헤더
-            output += " | ".join(headers) + "\n"
-            output += "=" * 60 + "\n"
-            
-            # 실제 데이터
-            for row in data:
-                row_values = []
-                for val in row:
-                    if val is None:
-                        row_values.append("-")
-                    elif isinstance(val, (int, float)):
-                        row_values.append(str(val))
-                    else:
-                        str_val = str(val)
-                        if len(str_val) > 30:
-                            str_val = str_val[:27] + "..."
-                        row_values.append(str_val)
-                
-                output += " | ".join(row_values) + "\n"
-            
-            if total > limit:
-                output += f"\n더 많은 데이터를 보려면 말씀해주세요"
-            
-            return output
+            output += f"📌 Showing records {start + 1}-{start + len(data)}{total_str}\n\n"
+        else:
+            output = f"{table}: records {start + 1}-{start + len(data)}{total_str}\n"
+        output += body
+        
+        if has_more:
+            next_state = {"db": database, "t": table, "o": start + len(data), "n": total, "nk": total_kind}
+            if pk_cols:
+                lower_headers = [h.lower() for h in headers]
+                last_row = data[-1]
+                next_state["k"] = [last_row[lower_headers.index(col.lower())] for col in pk_cols]
+            if fmt == "pretty":
+                output += f"\n더 많은 데이터를 보려면 cursor=\"{encode_cursor(next_state)}\" 로 다시 요청해주세요"
+            else:
+                output += f"next_cursor={encode_cursor(next_state)}\n"
+        
+        return output
             
     except Exception as e:
         return f"Error reading data: {str(e)}"
@@ -144,46 +538,120 @@ async def show_data(database: str, table: str, limit: int) -> str:
 
 # Tool 4: 데이터 검색/필터링
 @mcp.tool()
-async def search_data(database: str, table: str, column: str, value: str) -> str:
-    """Search for specific data in table"""
+async def search_data(database: str, table: str, column: str, value: str, match: str = "contains",
+                      format: str = "", max_bytes: int = 0, truncate: str = "") -> str:
+    """Search for specific data in table.
+    match: contains (default) | prefix (starts with) | exact.
+    format: pretty | tsv | json (tsv is the most compact). max_bytes: output size budget.
+    truncate: per-column max length, e.g. name:20,description:50"""
+    return await DB_EXECUTOR.run(_search_data, database, table, column, value, match, format, max_bytes, truncate)
+
+
+def _search_data(database: str, table: str, column: str, value: str, match: str = "contains",
+                 format: str = "", max_bytes: int = 0, truncate: str = "") -> str:
     if database not in DB_CONNECTIONS:
         return f"Database '{database}' not found"
     
+    match = (match or "contains").strip().lower()
+    if match not in SEARCH_MODES:
+        return f"Unknown match '{match}'. Use one of: {', '.join(SEARCH_MODES)}"
+    
+    try:
+        fmt = resolve_format(format)
+        column_limits = parse_column_limits(truncate)
+    except ValueError as e:
+        return str(e)
+    
+    limit = 20
+    
     try:
-        engine = create_engine(DB_CONNECTIONS[database]["url"])
+        engine = ENGINES.get(database)
+        db_type = detect_db_type(DB_CONNECTIONS[database]["url"])
+        quote = engine.dialect.identifier_preparer.quote
         
-        with engine.connect() as conn:
-            # 검색 쿼리 (LIKE 사용)
-            query = text(f"""
-                SELECT * FROM {table} 
-                WHERE {column} LIKE :search_value 
-                LIMIT 20
-            """)
-            
-            # 부분 매칭을 위해 % 추가
-            search_pattern = f"%{value}%"
-            result = conn.execute(query, {"search_value": search_pattern})
-            
-            data = result.fetchall()
-            headers = list(result.keys())
-            
-            if not data:
-                return f"No results found for '{value}' in column '{column}'"
-            
-            # 결과 출력
+        resolved = SCHEMA_CACHE.resolve_table(database, table)
+        if resolved is None:
+            return f"Table '{table}' not found in database '{database}'"
+        table = resolved
+        
+        col_info = SCHEMA_CACHE.resolve_column(database, table, column)
+        if col_info is None:
+            columns = [col['name'] for col in SCHEMA_CACHE.columns(database, table)]
+            return f"Column '{column}' not found in table '{table}'\nAvailable columns: {', '.join(columns)}"
+        column = col_info['name']
+        # 사용 가능한 인덱스 확인 (스키마 캐시에 저장)
+        def load_text_index(insp):
+            with insp.bind.connect() as conn:
+                return detect_text_index(conn, db_type, table, column)
+        
+        text_index = SCHEMA_CACHE.cached(database, f"text_index:{column}", table, load_text_index)
+        indexed = is_btree_indexed(column, SCHEMA_CACHE.indexes(database, table),
+                                   SCHEMA_CACHE.primary_key(database, table))
+        
+        plan = search_plan(db_type, quote(table), quote(column), col_info['type'], value,
+                           match, limit, text_index, indexed)
+        if not plan:
+            return f"No results found for '{value}' in column '{column}' (column is numeric)"
+        
+        # 실행 계획 검사 - 한도를 넘는 단계(인덱스 없는 contains 검색 등)는 다른 단계가 남아 있으면 건너뜀
+        checked, skipped, guard_notes = [], [], []
+        for method, sql, params in plan:
+            try:
+                sql, params, note = guarded_sql(database, engine, db_type, sql, params, limit=limit)
+            except PlanRejected as e:
+                skipped.append((method, e))
+                continue
+            checked.append((method, sql, params))
+            if note:
+                guard_notes.append(note)
+        guard_action = PLAN_GUARD.settings(DB_CONNECTIONS[database].get("explain"))["action"]
+        if skipped and (not checked or guard_action == "reject"):
+            method, error = skipped[0]
+            return (f"❌ Search not run: {error} ({method}). "
+                    f"Use match=exact or match=prefix on an indexed column, or search a smaller table")
+        if skipped:
+            guard_notes.append("⚠️ Skipped " + ", ".join(f"{method} search ({error})" for method, error in skipped))
+        plan = checked
+        
+        def run_plan():
+            data, headers, method = [], [], None
+            with engine.connect() as conn:
+                # 인덱스를 사용하는 쿼리부터 실행하고, 결과가 부족할 때만 다음 방식으로 넘어감
+                for step, (method, sql, params) in enumerate(plan):
+                    result = conn.execute(text(sql), params)
+                    data = result.fetchall()
+                    headers = list(result.keys())
+                    telemetry.count("db.rows", len(data))
+                    is_last = step == len(plan) - 1
+                    if is_last or len(data) >= limit or (data and not method.startswith("prefix")):
+                        break
+            return data, headers, method
+        
+        plan_params = {f"{i}.{key}": val for i, (_, _, params) in enumerate(plan) for key, val in params.items()}
+        data, headers, method = RESULT_CACHE.get_or_load(database, "; ".join(sql for _, sql, _ in plan),
+                                                         plan_params, [table], run_plan)
+        
+        if not data:
+            return f"No results found for '{value}' in column '{column}'"
+        
+        body, shown = format_rows(headers, data, fmt, max_bytes=max_bytes or RESULT_MAX_BYTES,
+                                  column_limits=column_limits)
+        
+        description = METHOD_DESCRIPTIONS.get(method, match)
+        
+        # 결과 출력
+        if fmt == "pretty":
             output = f"🔍 Search Results:\n"
-            output += f"📌 Found {len(data)} record(s) where '{column}' contains '{value}'\n\n"
-            
-            # 헤더
-            output += " | ".join(headers) + "\n"
-            output += "=" * 60 + "\n"
-            
-            # 데이터
-            for row in data:
-                row_values = [str(val) if val is not None else "-" for val in row]
-                output += " | ".join(row_values) + "\n"
-            
-            return output
+            output += f"📌 Found {len(data)} record(s) where '{column}' {description} '{value}' (method: {method})\n\n"
+        else:
+            output = f"{table}: {len(data)} record(s) where {column} {description} '{value}' ({method})\n"
+        output += body
+        if shown < len(data):
+            output += f"... {len(data) - shown} more record(s) not shown (output size limit)\n"
+        for note in guard_notes:
+            output += note + "\n"
+        
+        return output
             
     except Exception as e:
         return f"Search error: {str(e)}"
@@ -193,10 +661,23 @@ async def search_data(database: str, table: str, column: str, value: str) -> str
 @mcp.tool()
 async def add_data(database: str, table: str, data: str) -> str:
     """Add new data to table. Format: column1:value1,column2:value2"""
+    return await DB_EXECUTOR.run(_add_data, database, table, data)
+
+
+def _add_data(database: str, table: str, data: str) -> str:
     if database not in DB_CONNECTIONS:
         return f"Database '{database}' not found"
     
     try:
+        engine = ENGINES.get(database)
+        quote = engine.dialect.identifier_preparer.quote
+        
+        # 다른 쓰기 도구와 같이 실제 테이블/컬럼명으로 변환 후 인용
+        resolved = SCHEMA_CACHE.resolve_table(database, table)
+        if resolved is None:
+            return f"Table '{table}' not found in database '{database}'"
+        table = resolved
+        
         # 데이터 파싱 (column:value,column:value 형식)
         pairs = data.split(',')
         columns = []
@@ -207,38 +688,29 @@ async def add_data(database: str, table: str, data: str) -> str:
                 return f"Invalid format. Use: column1:value1,column2:value2"
             
             col, val = pair.split(':', 1)
-            columns.append(col.strip())
+            col_info = SCHEMA_CACHE.resolve_column(database, table, col.strip())
+            if col_info is None:
+                return f"Column '{col.strip()}' not found in table '{table}'"
+            columns.append(col_info['name'])
             values.append(val.strip())
         
-        # SQL 생성
-        columns_str = ", ".join(columns)
-        placeholders = ", ".join([f":{col}" for col in columns])
+        # SQL 생성 (바인드 이름은 컬럼명 대신 순번 사용)
+        columns_str = ", ".join(quote(col) for col in columns)
+        placeholders = ", ".join(f":p{i}" for i in range(len(columns)))
         
-        insert_sql = f"INSERT INTO {table} ({columns_str}) VALUES ({placeholders})"
-        
-        engine = create_engine(DB_CONNECTIONS[database]["url"])
+        insert_sql = f"INSERT INTO {quote(table)} ({columns_str}) VALUES ({placeholders})"
         
         with engine.connect() as conn:
             # 트랜잭션 시작
             trans = conn.begin()
             try:
-                # 값 딕셔너리 생성
-                value_dict = {}
-                for col, val in zip(columns, values):
-                    # 'NULL' 문자열을 None으로 변환
-                    if val.upper() == 'NULL':
-                        value_dict[col] = None
-                    # 숫자 변환 시도
-                    elif val.isdigit():
-                        value_dict[col] = int(val)
-                    elif val.replace('.', '', 1).isdigit():
-                        value_dict[col] = float(val)
-                    else:
-                        value_dict[col] = val
+                # 값 딕셔너리 생성 ('NULL' -> None, 숫자 변환)
+                value_dict = {f"p{i}": parse_value(val) for i, val in enumerate(values)}
                 
                 # INSERT 실행
                 conn.execute(text(insert_sql), value_dict)
                 trans.commit()
+                invalidate_table(database, table)
                 
                 # 성공 메시지
                 output = f"✅ Successfully added new record to '{table}'!\n\n"
@@ -259,226 +731,345 @@ async def add_data(database: str, table: str, data: str) -> str:
         return f"Error: {str(e)}"
 
 
-# Tool 6: 데이터 삭제 (DELETE) - 수정된 버전
+# Tool 6: 대량 데이터 추가 (Bulk INSERT)
 @mcp.tool()
-async def delete_data(database: str, table: str, condition: str) -> str:
-    """Delete data from table. Format: column:value"""
+async def bulk_insert(database: str, table: str, data: str = "", file_path: str = "",
+                      input_format: str = "csv", chunk_size: int = 1000) -> str:
+    """Insert many rows at once from CSV (with header row) or JSONL text in data, or from a local file_path.
+    input_format: csv | jsonl. Rows are committed every chunk_size rows."""
+    return await DB_EXECUTOR.run(_bulk_insert, database, table, data, file_path, input_format, chunk_size)
+
+
+def _bulk_insert(database: str, table: str, data: str = "", file_path: str = "",
+                 input_format: str = "csv", chunk_size: int = 1000) -> str:
     if database not in DB_CONNECTIONS:
         return f"Database '{database}' not found"
     
+    input_format = (input_format or "csv").strip().lower()
+    if input_format not in INPUT_FORMATS:
+        return f"Unknown input_format '{input_format}'. Use one of: {', '.join(INPUT_FORMATS)}"
+    if bool(data) == bool(file_path):
+        return "Provide either data or file_path (not both)"
+    chunk_size = max(1, min(chunk_size, 50000))
+    
     try:
-        # 조건 파싱
-        if ':' not in condition:
-            return "Invalid format. Use: column:value (e.g., id:5)"
+        engine = ENGINES.get(database)
+        db_type = detect_db_type(DB_CONNECTIONS[database]["url"])
         
-        column, value = condition.split(':', 1)
-        column = column.strip()
-        value = value.strip()
+        resolved = SCHEMA_CACHE.resolve_table(database, table)
+        if resolved is None:
+            return f"Table '{table}' not found in database '{database}'"
+        table = resolved
         
-        engine = create_engine(DB_CONNECTIONS[database]["url"])
-        
-        # 값 타입 처리
-        if value.isdigit():
-            typed_value = int(value)
-        elif value.replace('.', '', 1).isdigit():
-            typed_value = float(value)
+        if file_path:
+            stream = open(resolve_input_file(file_path), 'r', encoding='utf-8', newline='')
         else:
-            typed_value = value
+            stream = io.StringIO(data)
         
-        # 방법 1: 각각 별도의 connection 사용
-        # 먼저 삭제될 데이터 확인
-        with engine.connect() as conn:
-            check_sql = text(f"SELECT * FROM {table} WHERE {column} = :value")
-            result = conn.execute(check_sql, {"value": typed_value})
-            to_delete = result.fetchall()
-            headers = list(result.keys()) if to_delete else []
+        with stream:
+            # 모든 행의 키를 실제 테이블 컬럼명으로 매핑 (INSERT 전에 검사해 일부만 들어가지 않도록)
+            column_map = {}
+            for key, record_no in scan_record_keys(stream, input_format).items():
+                col_info = SCHEMA_CACHE.resolve_column(database, table, key)
+                if col_info is None:
+                    return f"Column '{key}' (first used in record {record_no}) not found in table '{table}'"
+                column_map[key] = col_info['name']
+            
+            records = iter_records(stream, input_format)
+            first = next(records, None)
+            if first is None:
+                return "No rows to insert"
+            
+            renamed = ({column_map[key]: rec.get(key) for key in column_map}
+                       for rec in itertools.chain([first], records))
+            try:
+                stats = bulk_insert_records(engine, db_type, table, list(column_map.values()),
+                                            renamed, chunk_size)
+            finally:
+                # 실패해도 앞의 청크는 커밋되었을 수 있음
+                invalidate_table(database, table)
         
-        if not to_delete:
-            return f"No records found with {column} = '{value}'"
+        output = f"✅ Successfully added {stats['rows']:,} record(s) to '{table}'\n\n"
+        output += f"Method: {stats['method']}, {stats['chunks']} chunk(s) of up to {chunk_size:,} rows\n"
+        output += f"Elapsed: {stats['elapsed']:.2f}s ({stats['rows_per_sec']:,.0f} rows/sec)\n"
+        output += f"\n💡 Use 'show_data' to see the updated table"
+        return output
+        
+    except (ValueError, RuntimeError) as e:
+        return f"❌ Bulk insert failed: {str(e)}"
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+# Tool 7: 데이터 삭제 (DELETE)
+@mcp.tool()
+async def delete_data(database: str, table: str, condition: str, dry_run: bool = False,
+                      batch_size: int = 0) -> str:
+    """Delete data from table. Format: column:value
+    dry_run=true only shows what would be deleted. batch_size>0 deletes in chunks of that many rows
+    (each chunk is committed separately to avoid long locks)."""
+    return await DB_EXECUTOR.run(_delete_data, database, table, condition, dry_run, batch_size)
+
+
+def _delete_data(database: str, table: str, condition: str, dry_run: bool = False,
+                 batch_size: int = 0) -> str:
+    if database not in DB_CONNECTIONS:
+        return f"Database '{database}' not found"
+    
+    try:
+        engine = ENGINES.get(database)
+        db_type = detect_db_type(DB_CONNECTIONS[database]["url"])
+        quote = engine.dialect.identifier_preparer.quote
         
-        # 삭제 확인 메시지
-        output = f"⚠️ About to delete {len(to_delete)} record(s):\n\n"
+        resolved = SCHEMA_CACHE.resolve_table(database, table)
+        if resolved is None:
+            return f"Table '{table}' not found in database '{database}'"
+        table = resolved
         
-        # 삭제될 데이터 미리보기 (최대 5개)
-        if headers:
-            output += " | ".join(headers) + "\n"
-            output += "-" * 50 + "\n"
-            
-            for row in to_delete[:5]:
-                row_str = " | ".join(str(val) if val else "-" for val in row)
-                output += row_str + "\n"
-            
-            if len(to_delete) > 5:
-                output += f"... and {len(to_delete) - 5} more records\n"
+        # 조건 파싱
+        parsed = _parse_condition(database, table, condition, quote)
+        if isinstance(parsed, str):
+            return parsed
+        column, value, where, params = parsed
         
-        # 실제 삭제 실행 (새로운 connection과 명시적 트랜잭션)
-        with engine.begin() as conn:  # begin()이 자동으로 commit/rollback 처리
+        if dry_run:
+            count, headers, preview = _preview_matches(engine, db_type, quote(table), where, params)
+            if not count:
+                return f"No records found with {column} = '{value}'"
+            output = f"🔎 Dry run: {count} record(s) would be deleted from '{table}'\n\n"
+            output += _format_preview(headers, preview, count)
+            output += f"\n💡 Call again without dry_run to delete"
+            return output
+        
+        if batch_size and batch_size > 0:
+            # 미리보기 후 batch_size개씩 나누어 삭제 (배치마다 커밋)
+            _, headers, preview = _preview_matches(engine, db_type, quote(table), where, params, count=False)
+            if not preview:
+                return f"No records found with {column} = '{value}'"
+            batch_sql = text(delete_batch_sql(db_type, quote(table), where, batch_size))
+            deleted = 0
+            batches = 0
             try:
-                delete_sql = text(f"DELETE FROM {table} WHERE {column} = :value")
-                conn.execute(delete_sql, {"value": typed_value})
-                # commit은 자동으로 됨 (with 블록 종료 시)
-                
-                output += f"\n✅ Successfully deleted {len(to_delete)} record(s) from '{table}'"
-                output += f"\n💡 Use 'show_data' to see the updated table"
-                
-                return output
-                
-            except Exception as e:
-                # rollback도 자동으로 됨 (예외 발생 시)
-                return f"❌ Failed to delete: {str(e)}"
+                while True:
+                    with engine.begin() as conn:
+                        affected = conn.execute(batch_sql, params).rowcount
+                    deleted += affected
+                    batches += 1
+                    if affected < batch_size:
+                        break
+            finally:
+                invalidate_table(database, table)
+            
+            output = f"✅ Successfully deleted {deleted} record(s) from '{table}' in {batches} batch(es)\n\n"
+            output += _format_preview(headers, preview, deleted)
+            output += f"\n💡 Use 'show_data' to see the updated table"
+            return output
+        
+        # 하나의 트랜잭션에서 삭제 (RETURNING/OUTPUT 지원 시 한 번의 왕복)
+        returning = supports_returning(engine, db_type, "delete")
+        with engine.begin() as conn:
+            if returning:
+                count, headers, preview = _execute_with_preview(conn, delete_sql(db_type, quote(table), where, True), params)
+            else:
+                headers, preview = _select_preview(conn, db_type, quote(table), where, params)
+                count = conn.execute(text(delete_sql(db_type, quote(table), where)), params).rowcount
+        if count:
+            invalidate_table(database, table)
+        
+        if not count:
+            return f"No records found with {column} = '{value}'"
+        
+        output = f"✅ Successfully deleted {count} record(s) from '{table}'\n\n"
+        output += _format_preview(headers, preview, count)
+        output += f"\n💡 Use 'show_data' to see the updated table"
+        return output
                 
     except Exception as e:
         return f"Error: {str(e)}"
 
-# Tool 7: 데이터 수정 (UPDATE)
+# Tool 8: 데이터 수정 (UPDATE)
 @mcp.tool()
-async def update_data(database: str, table: str, set_data: str, condition: str) -> str:
-    """Update existing data. Format set_data: col1:val1,col2:val2 condition: col:val"""
+async def update_data(database: str, table: str, set_data: str, condition: str, dry_run: bool = False) -> str:
+    """Update existing data. Format set_data: col1:val1,col2:val2 condition: col:val
+    dry_run=true only shows which rows would be updated."""
+    return await DB_EXECUTOR.run(_update_data, database, table, set_data, condition, dry_run)
+
+
+def _update_data(database: str, table: str, set_data: str, condition: str, dry_run: bool = False) -> str:
     if database not in DB_CONNECTIONS:
         return f"Database '{database}' not found"
     
     try:
+        engine = ENGINES.get(database)
+        db_type = detect_db_type(DB_CONNECTIONS[database]["url"])
+        quote = engine.dialect.identifier_preparer.quote
+        
+        resolved = SCHEMA_CACHE.resolve_table(database, table)
+        if resolved is None:
+            return f"Table '{table}' not found in database '{database}'"
+        table = resolved
+        
         # SET 절 파싱
         set_pairs = set_data.split(',')
         set_parts = []
         set_values = {}
+        set_columns = {}   # 컬럼명(소문자) -> 새 값 (미리보기 표시용)
         
         for i, pair in enumerate(set_pairs):
             if ':' not in pair:
                 return "Invalid set format. Use: column1:value1,column2:value2"
             
             col, val = pair.split(':', 1)
-            col = col.strip()
-            val = val.strip()
-            
-            set_parts.append(f"{col} = :set_{i}")
+            col_info = SCHEMA_CACHE.resolve_column(database, table, col.strip())
+            if col_info is None:
+                return f"Column '{col.strip()}' not found in table '{table}'"
             
-            # 타입 변환
-            if val.upper() == 'NULL':
-                set_values[f'set_{i}'] = None
-            elif val.isdigit():
-                set_values[f'set_{i}'] = int(val)
-            elif val.replace('.', '', 1).isdigit():
-                set_values[f'set_{i}'] = float(val)
-            else:
-                set_values[f'set_{i}'] = val
+            set_parts.append(f"{quote(col_info['name'])} = :set_{i}")
+            set_values[f'set_{i}'] = parse_value(val.strip())
+            set_columns[col_info['name'].lower()] = set_values[f'set_{i}']
         
         # WHERE 절 파싱
-        if ':' not in condition:
-            return "Invalid condition format. Use: column:value"
-        
-        cond_col, cond_val = condition.split(':', 1)
-        cond_col = cond_col.strip()
-        cond_val = cond_val.strip()
-        
-        # 조건 값 타입 변환
-        if cond_val.isdigit():
-            typed_cond_val = int(cond_val)
-        elif cond_val.replace('.', '', 1).isdigit():
-            typed_cond_val = float(cond_val)
-        else:
-            typed_cond_val = cond_val
+        parsed = _parse_condition(database, table, condition, quote)
+        if isinstance(parsed, str):
+            return parsed
+        cond_col, cond_val, where, params = parsed
         
-        engine = create_engine(DB_CONNECTIONS[database]["url"])
+        if dry_run:
+            count, headers, preview = _preview_matches(engine, db_type, quote(table), where, params)
+            if not count:
+                return f"No records found with {cond_col} = '{cond_val}'"
+            output = f"🔎 Dry run: {count} record(s) would be updated in '{table}'\n\n"
+            output += _format_preview(headers, preview, count)
+            output += f"\n💡 Call again without dry_run to update"
+            return output
         
-        # 먼저 영향받을 행 확인
-        with engine.connect() as conn:
-            check_sql = text(f"SELECT * FROM {table} WHERE {cond_col} = :cond_val")
-            result = conn.execute(check_sql, {"cond_val": typed_cond_val})
-            affected = result.fetchall()
-            
-        if not affected:
-            return f"No records found with {cond_col} = '{cond_val}'"
+        # 모든 파라미터 합치기
+        all_params = set_values.copy()
+        all_params.update(params)
+        set_clause = ", ".join(set_parts)
         
-        # UPDATE 실행
+        # 하나의 트랜잭션에서 수정 (RETURNING/OUTPUT 지원 시 수정된 행을 바로 받음)
+        returning = supports_returning(engine, db_type, "update")
         with engine.begin() as conn:
-            set_clause = ", ".join(set_parts)
-            update_sql = text(f"UPDATE {table} SET {set_clause} WHERE {cond_col} = :cond_val")
-            
-            # 모든 파라미터 합치기
-            all_params = set_values.copy()
-            all_params['cond_val'] = typed_cond_val
-            
-            conn.execute(update_sql, all_params)
-            
-            output = f"✅ Successfully updated {len(affected)} record(s) in '{table}'\n\n"
-            output += "Updated fields:\n"
-            for pair in set_pairs:
-                col, val = pair.split(':', 1)
-                output += f"  • {col.strip()} → {val.strip()}\n"
-            output += f"\nCondition: {cond_col} = {cond_val}\n"
-            output += f"💡 Use 'show_data' to see the changes"
-            
-            return output
+            statement = update_sql(db_type, quote(table), set_clause, where, returning)
+            if returning:
+                count, headers, preview = _execute_with_preview(conn, statement, all_params)
+            else:
+                # 같은 트랜잭션에서 수정 전에 대상 행을 최대 PREVIEW_ROWS개 읽고 새 값을 반영해 표시
+                # (조건 컬럼을 수정하면 수정 후에는 같은 조건으로 다시 찾을 수 없음)
+                headers, preview = _select_preview(conn, db_type, quote(table), where, params)
+                count = conn.execute(text(statement), all_params).rowcount
+                preview = [tuple(set_columns.get(header.lower(), value) for header, value in zip(headers, row))
+                           for row in preview]
+        if count:
+            invalidate_table(database, table)
+        
+        if not count:
+            return f"No records found with {cond_col} = '{cond_val}'"
+        
+        output = f"✅ Successfully updated {count} record(s) in '{table}'\n\n"
+        output += "Updated fields:\n"
+        for pair in set_pairs:
+            col, val = pair.split(':', 1)
+            output += f"  • {col.strip()} → {val.strip()}\n"
+        output += f"\nCondition: {cond_col} = {cond_val}\n"
+        if preview:
+            output += "\nUpdated rows:\n" + _format_preview(headers, preview, count)
+        output += f"💡 Use 'show_data' to see the changes"
+        
+        return output
             
     except Exception as e:
         return f"Update error: {str(e)}"
 
 
-# Tool 8: 테이블 조인 (수정된 버전)
+# Tool 9: 테이블 조인
 @mcp.tool()
-async def join_tables(database: str, table1: str, table2: str, join_key: str) -> str:
-    """Join two tables to show related data together"""
+async def join_tables(database: str, table1: str, table2: str, join_key: str = "", extra_tables: str = "",
+                      format: str = "", max_bytes: int = 0, truncate: str = "") -> str:
+    """Join tables to show related data together. Join columns are found from foreign keys;
+    join_key (e.g. 'course_id=id') is only needed when there is no foreign key between table1 and table2.
+    extra_tables: more tables to join after table2, comma separated (intermediate tables are added automatically).
+    format: pretty | tsv | json (tsv is the most compact). max_bytes: output size budget.
+    truncate: per-column max length, e.g. name:20,description:50"""
+    return await DB_EXECUTOR.run(_join_tables, database, table1, table2, join_key, extra_tables,
+                                 format, max_bytes, truncate)
+
+
+def _parse_join_key(join_key: str, table1: str, table2: str, cols1: list, cols2: list):
+    """join_key 또는 컬럼 이름 규칙으로 (table1 컬럼, table2 컬럼) 찾기 (실패 시 None)"""
+    if '=' in join_key:
+        # 형식: "students.course_id=courses.id"
+        left_part, right_part = join_key.split('=')
+        left_key = left_part.strip().split('.')[-1]
+        right_key = right_part.strip().split('.')[-1]
+        return left_key, right_key
+    
+    if ':' in join_key:
+        # 형식: "course_id:id"
+        left_key, right_key = join_key.split(':')
+        return left_key.strip(), right_key.strip()
+    
+    if join_key.strip():
+        # 단순 형식: "id" (양쪽 테이블에 같은 이름의 컬럼이 있다고 가정)
+        return join_key.strip(), join_key.strip()
+    
+    # 자동 매칭 시도 (foreign key 이름 패턴 찾기)
+    for col in cols1:
+        if col == f"{table2}_id" or col == f"{table2[:-1]}_id":  # courses -> course_id
+            return col, 'id'
+        elif col == 'id' and f"{table1}_id" in cols2:
+            return 'id', f"{table1}_id"
+    
+    # 공통 컬럼 찾기
+    common_cols = sorted(set(cols1) & set(cols2))
+    if common_cols:
+        return common_cols[0], common_cols[0]
+    return None
+
+
+def _join_tables(database: str, table1: str, table2: str, join_key: str = "", extra_tables: str = "",
+                 format: str = "", max_bytes: int = 0, truncate: str = "") -> str:
     if database not in DB_CONNECTIONS:
         return f"Database '{database}' not found"
     
     try:
-        engine = create_engine(DB_CONNECTIONS[database]["url"])
+        fmt = resolve_format(format)
+        column_limits = parse_column_limits(truncate)
+    except ValueError as e:
+        return str(e)
+    
+    try:
+        engine = ENGINES.get(database)
+        db_type = detect_db_type(DB_CONNECTIONS[database]["url"])
+        quote = engine.dialect.identifier_preparer.quote
         
-        with engine.connect() as conn:
-            inspector = inspect(engine)
-            
-            # 각 테이블의 컬럼 가져오기
-            cols1 = [col['name'] for col in inspector.get_columns(table1)]
-            cols2 = [col['name'] for col in inspector.get_columns(table2)]
-            
-            # 조인 키 파싱 (여러 형식 지원)
-            if '=' in join_key:
-                # 형식: "students.course_id=courses.id"
-                left_part, right_part = join_key.split('=')
-                
-                # 테이블명 제거
-                if '.' in left_part:
-                    left_table, left_key = left_part.strip().split('.')
-                else:
-                    left_key = left_part.strip()
-                    left_table = table1
-                
-                if '.' in right_part:
-                    right_table, right_key = right_part.strip().split('.')
-                else:
-                    right_key = right_part.strip()
-                    right_table = table2
-            else:
-                # 단순 형식: "id" (양쪽 테이블에 같은 이름의 컬럼이 있다고 가정)
-                # 또는 "course_id:id" 형식
-                if ':' in join_key:
-                    left_key, right_key = join_key.split(':')
-                    left_key = left_key.strip()
-                    right_key = right_key.strip()
-                else:
-                    # 자동 매칭 시도 (foreign key 패턴 찾기)
-                    left_key = None
-                    right_key = None
-                    
-                    # table1에서 table2_id 패턴 찾기
-                    for col in cols1:
-                        if col == f"{table2}_id" or col == f"{table2[:-1]}_id":  # courses -> course_id
-                            left_key = col
-                            right_key = 'id'
-                            break
-                        elif col == 'id' and f"{table1}_id" in cols2:
-                            left_key = 'id'
-                            right_key = f"{table1}_id"
-                            break
-                    
-                    if not left_key:
-                        # 공통 컬럼 찾기
-                        common_cols = set(cols1) & set(cols2)
-                        if common_cols:
-                            left_key = right_key = list(common_cols)[0]
-                        else:
-                            return f"❌ Cannot find join columns. Please specify like 'course_id=id' or 'course_id:id'"
+        requested = [table1, table2] + [t.strip() for t in extra_tables.split(',') if t.strip()]
+        tables = []
+        for name in requested:
+            resolved = SCHEMA_CACHE.resolve_table(database, name)
+            if resolved is None:
+                return f"❌ Table '{name}' not found in database '{database}'"
+            tables.append(resolved)
+        table1, table2 = tables[0], tables[1]
+        
+        # 외래 키 그래프 (스키마 캐시, DDL 시 무효화)
+        edges = SCHEMA_CACHE.cached(database, 'fk_graph', None, load_fk_graph)
+        
+        key_source = "foreign key"
+        if join_key.strip():
+            steps, missing = None, (table1, table2)
+        else:
+            steps, missing = plan_joins(edges, tables)
+        
+        if steps is None and missing == (table1, table2):
+            # FK가 없거나 join_key가 주어진 경우 - 컬럼 이름으로 조인
+            cols1 = [col['name'] for col in SCHEMA_CACHE.columns(database, table1)]
+            cols2 = [col['name'] for col in SCHEMA_CACHE.columns(database, table2)]
+            keys = _parse_join_key(join_key, table1, table2, cols1, cols2)
+            if keys is None:
+                return f"❌ Cannot find join columns. Please specify like 'course_id=id' or 'course_id:id'"
+            left_key, right_key = keys
             
             # 조인 키 검증
             if left_key not in cols1:
@@ -486,109 +1077,113 @@ async def join_tables(database: str, table1: str, table2: str, join_key: str) ->
             if right_key not in cols2:
                 return f"❌ Column '{right_key}' not found in table '{table2}'\nAvailable columns: {', '.join(cols2)}"
             
-            # 조인 타입 결정 (실제 관계 확인)
-            # 먼저 INNER JOIN으로 시도
-            join_sql = text(f"""
-                SELECT 
-                    t1.*,
-                    t2.*
-                FROM {table1} t1
-                INNER JOIN {table2} t2 ON t1.{left_key} = t2.{right_key}
-                LIMIT 20
-            """)
-            
-            result = conn.execute(join_sql)
-            data = result.fetchall()
-            headers = list(result.keys())
-            
-            # 결과가 없으면 LEFT JOIN 시도
-            if not data:
-                join_sql = text(f"""
-                    SELECT 
-                        t1.*,
-                        t2.*
-                    FROM {table1} t1
-                    LEFT JOIN {table2} t2 ON t1.{left_key} = t2.{right_key}
-                    LIMIT 20
-                """)
-                
-                result = conn.execute(join_sql)
-                data = result.fetchall()
-                headers = list(result.keys())
-                join_type = "LEFT JOIN"
+            key_source = "join_key" if join_key.strip() else "column names"
+            first = {"from": table1, "table": table2, "pairs": [(left_key, right_key)],
+                     "type": "LEFT JOIN", "matched_first": True}
+            rest, missing = plan_joins(edges, tables[1:], [table1]) if len(tables) > 2 else ([], None)
+            if rest is not None:
+                # table2가 LEFT JOIN으로 붙었으므로 이후 JOIN도 LEFT JOIN
+                for step in rest:
+                    step["type"] = "LEFT JOIN"
+                steps = [first] + rest
             else:
-                join_type = "INNER JOIN"
-            
-            if not data:
-                return f"❌ No data found in '{table1}' or join produced no results"
-            
-            # 조인 통계
-            total_t1 = conn.execute(text(f"SELECT COUNT(*) FROM {table1}")).scalar()
-            total_t2 = conn.execute(text(f"SELECT COUNT(*) FROM {table2}")).scalar()
-            
-            # 결과 출력
-            output = f"📊 Join Result: {table1} ⟷ {table2}\n"
-            output += f"Join Type: {join_type}\n"
-            output += f"Join Condition: {table1}.{left_key} = {table2}.{right_key}\n"
-            output += f"Tables: {table1} ({total_t1} rows) + {table2} ({total_t2} rows)\n"
+                steps = None
+        
+        if steps is None:
+            return (f"❌ No foreign key path between '{missing[0]}' and '{missing[1]}'. "
+                    f"Join them separately with join_key like 'course_id=id'")
+        
+        # 별칭(t0, t1, ...)과 SELECT 컬럼 목록
+        joined = [table1] + [step["table"] for step in steps]
+        alias = {table: f"t{i}" for i, table in enumerate(joined)}
+        select_cols = []
+        display_headers = []
+        for table in joined:
+            for col in SCHEMA_CACHE.columns(database, table):
+                select_cols.append(f"{alias[table]}.{quote(col['name'])} AS c{len(select_cols)}")
+                display_headers.append(f"{table}.{col['name']}")
+        
+        from_clause = f"{quote(table1)} {alias[table1]}"
+        order_by = None
+        for step in steps:
+            conditions = " AND ".join(f"{alias[step['from']]}.{quote(left)} = {alias[step['table']]}.{quote(right)}"
+                                      for left, right in step["pairs"])
+            from_clause += f" {step['type']} {quote(step['table'])} {alias[step['table']]} ON {conditions}"
+            if step.get("matched_first"):
+                # INNER JOIN 결과가 없을 때 다시 조회하지 않도록 LEFT JOIN에서 짝이 있는 행을 먼저 정렬
+                right = step["pairs"][0][1]
+                order_by = f"CASE WHEN {alias[step['table']]}.{quote(right)} IS NULL THEN 1 ELSE 0 END"
+        
+        join_sql = select_sql(db_type, ", ".join(select_cols), from_clause, order_by=order_by, limit=20)
+        
+        # 실행 계획 검사 - 정렬 때문에 조인 전체를 읽어야 하면 정렬 없이 처음 20행만 읽는 쿼리로 대체
+        rewrites = []
+        if order_by:
+            rewrites.append((select_sql(db_type, ", ".join(select_cols), from_clause, limit=20), None,
+                             "showing the first rows without sorting matched rows first"))
+        try:
+            join_sql, _, guard_note = guarded_sql(database, engine, db_type, join_sql, limit=20, rewrites=rewrites)
+        except PlanRejected as e:
+            return (f"❌ Join not run: {e}. "
+                    f"Join fewer tables, or use run_query with a selective WHERE clause")
+        
+        _, data = cached_query(database, engine, join_sql, None, joined)
+        
+        if not data:
+            return f"❌ No data found in '{table1}' or join produced no results"
+        
+        # 테이블 크기는 COUNT(*) 대신 카탈로그 통계 사용
+        sizes = cached_row_counts(database, engine, db_type, joined)
+        
+        def size_str(table):
+            count, kind = sizes.get(table, (None, None))
+            if count is None:
+                return "?"
+            return f"{'~' if kind == 'estimate' else ''}{count:,}"
+        
+        # 너무 많은 컬럼이면 주요 컬럼만 표시
+        header_indices = list(range(len(display_headers)))
+        if len(display_headers) > 8:
+            # id, name 등 주요 컬럼 우선 표시
+            important = [i for i, h in enumerate(display_headers)
+                         if any(key in h.split('.')[1].lower() for key in ['id', 'name', 'title', 'course', 'student'])]
+            header_indices = (important or header_indices)[:8]
+        
+        # 표시할 컬럼만 추려서 출력 (최대 10행)
+        shown_rows = [[row[idx] for idx in header_indices] for row in data[:10]]
+        body, shown = format_rows([display_headers[idx].split('.')[1] for idx in header_indices], shown_rows, fmt,
+                                  max_bytes=max_bytes or RESULT_MAX_BYTES,
+                                  max_cell=15, column_limits=column_limits)
+        
+        condition_strs = [" AND ".join(f"{step['from']}.{left} = {step['table']}.{right}" for left, right in step["pairs"])
+                          for step in steps]
+        
+        if fmt == "pretty":
+            output = f"📊 Join Result: {' ⟷ '.join(joined)}\n"
+            for step, condition in zip(steps, condition_strs):
+                output += f"Join Type: {step['type']}\n"
+                output += f"Join Condition: {condition} ({key_source})\n"
+            output += f"Tables: {' + '.join(f'{t} ({size_str(t)} rows)' for t in joined)}\n"
             output += f"Showing {len(data)} joined record(s)\n"
             output += "=" * 80 + "\n\n"
-            
-            # 헤더 출력 (중복 제거 및 테이블명 표시)
-            display_headers = []
-            for i, header in enumerate(headers):
-                # 어느 테이블에서 온 컬럼인지 표시
-                if i < len(cols1):
-                    display_headers.append(f"{table1}.{header}")
-                else:
-                    display_headers.append(f"{table2}.{header}")
-            
-            # 너무 많은 컬럼이면 주요 컬럼만 표시
-            if len(display_headers) > 8:
-                # id, name 등 주요 컬럼 우선 표시
-                important_cols = []
-                for h in display_headers:
-                    if any(key in h.lower() for key in ['id', 'name', 'title', 'course', 'student']):
-                        important_cols.append(h)
-                        if len(important_cols) >= 8:
-                            break
-                
-                if important_cols:
-                    display_headers = important_cols[:8]
-                else:
-                    display_headers = display_headers[:8]
-                
-                header_indices = [headers.index(h.split('.')[1]) for h in display_headers]
-            else:
-                header_indices = list(range(len(headers)))
-            
-            # 헤더 출력
-            output += " | ".join([h.split('.')[1] for h in display_headers]) + "\n"
-            output += "-" * 80 + "\n"
-            
-            # 데이터 출력
-            for row_num, row in enumerate(data[:10], 1):
-                row_values = []
-                for idx in header_indices:
-                    val = row[idx]
-                    if val is None:
-                        row_values.append("-")
-                    else:
-                        str_val = str(val)
-                        if len(str_val) > 15:
-                            str_val = str_val[:12] + "..."
-                        row_values.append(str_val)
-                
-                output += " | ".join(row_values) + "\n"
-            
-            if len(data) > 10:
-                output += f"\n... and {len(data) - 10} more rows\n"
-            
+        else:
+            output = f"{table1}"
+            for step, condition in zip(steps, condition_strs):
+                output += f" {step['type']} {step['table']} ON {condition}"
+            output += "; " + ", ".join(f"{t}: {size_str(t)} rows" for t in joined) + "\n"
+        output += body
+        
+        if len(data) > shown:
+            output += f"\n... and {len(data) - shown} more rows\n"
+        
+        if guard_note:
+            output += f"\n{guard_note}\n"
+        
+        if fmt == "pretty":
             # 조인 설명 추가
-            output += f"\n💡 This shows {table1} records with their related {table2} information"
-            output += f"\n💡 Each row combines data from both tables where {left_key} matches"
-            
-            return output
+            output += f"\n💡 This shows {table1} records with their related {', '.join(joined[1:])} information"
+        
+        return output
             
     except Exception as e:
         # 에러 메시지 개선
@@ -599,10 +1194,14 @@ async def join_tables(database: str, table1: str, table2: str, join_key: str) ->
             return f"❌ Join error: {error_msg}"
 
 
-# Tool 9: 테이블 생성
+# Tool 10: 테이블 생성
 @mcp.tool()
 async def create_table(database: str, table_name: str, columns: str) -> str:
     """Create new table. Format: col1:type1,col2:type2 (types: text,number,date)"""
+    return await DB_EXECUTOR.run(_create_table, database, table_name, columns)
+
+
+def _create_table(database: str, table_name: str, columns: str) -> str:
     if database not in DB_CONNECTIONS:
         return f"Database '{database}' not found"
     
@@ -614,6 +1213,8 @@ async def create_table(database: str, table_name: str, columns: str) -> str:
         # DB 타입 감지
         db_url = DB_CONNECTIONS[database]["url"]
         is_postgres = 'postgresql' in db_url
+        engine = ENGINES.get(database)
+        quote = engine.dialect.identifier_preparer.quote
         
         for col_def in col_defs:
             if ':' not in col_def:
@@ -642,45 +1243,510 @@ async def create_table(database: str, table_name: str, columns: str) -> str:
             else:
                 sql_type = 'TEXT'  # 기본값
             
-            # PRIMARY KEY가 이미 포함된 경우가 아니면 컬럼 추가
+            # PRIMARY KEY가 이미 포함된 경우가 아니면 컬럼 추가 (이름은 다른 도구와 같이 인용)
             if 'PRIMARY KEY' in sql_type and col_name != 'id':
-                sql_columns.append(f"{col_name} {sql_type}")
+                sql_columns.append(f"{quote(col_name)} {sql_type}")
             elif col_name == 'id' and 'PRIMARY KEY' not in sql_type:
-                sql_columns.append(f"{col_name} {sql_type} PRIMARY KEY")
+                sql_columns.append(f"{quote(col_name)} {sql_type} PRIMARY KEY")
             else:
-                sql_columns.append(f"{col_name} {sql_type}")
+                sql_columns.append(f"{quote(col_name)} {sql_type}")
         
         # CREATE TABLE 쿼리 생성
-        create_sql = f"CREATE TABLE {table_name} (\n  " + ",\n  ".join(sql_columns) + "\n)"
+        create_sql = f"CREATE TABLE {quote(table_name)} (\n  " + ",\n  ".join(sql_columns) + "\n)"
         
-        engine = create_engine(DB_CONNECTIONS[database]["url"])
+        # 테이블이 이미 존재하는지 확인 (스키마 캐시, 대소문자 무시)
+        existing = SCHEMA_CACHE.resolve_table(database, table_name)
+        if existing is not None:
+            return f"❌ Table '{existing}' already exists in database '{database}'"
         
         # 테이블 생성 실행
-        with engine.begin() as conn:
-            # 테이블이 이미 존재하는지 확인
-            inspector = inspect(engine)
-            existing_tables = inspector.get_table_names()
-            
-            if table_name in existing_tables:
-                return f"❌ Table '{table_name}' already exists in database '{database}'"
-            
-            # 테이블 생성
-            conn.execute(text(create_sql))
-            
-            output = f"✅ Successfully created table '{table_name}' in database '{database}'\n\n"
-            output += "Table structure:\n"
-            for col_def in col_defs:
-                col_name, col_type = col_def.split(':', 1)
-                output += f"  • {col_name.strip()}: {col_type.strip()}\n"
-            
-            output += f"\n💡 Use 'show_data' to view the table (initially empty)"
-            output += f"\n💡 Use 'add_data' to insert records"
-            
-            return output
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(create_sql))
+        finally:
+            # 성공/실패와 관계없이 스키마가 바뀌었을 수 있으므로 캐시 무효화
+            invalidate_schema(database, table_name)
+        
+        output = f"✅ Successfully created table '{table_name}' in database '{database}'\n\n"
+        output += "Table structure:\n"
+        for col_def in col_defs:
+            col_name, col_type = col_def.split(':', 1)
+            output += f"  • {col_name.strip()}: {col_type.strip()}\n"
+        
+        output += f"\n💡 Use 'show_data' to view the table (initially empty)"
+        output += f"\n💡 Use 'add_data' to insert records"
+        
+        return output
             
     except Exception as e:
         return f"Create table error: {str(e)}"
 
 
+# Tool 11: 읽기 전용 SQL 실행
+@mcp.tool()
+async def run_query(database: str, sql: str, max_rows: int = 200, timeout: int = 30,
+                    format: str = "", max_bytes: int = 0, truncate: str = "") -> str:
+    """Run a read-only SELECT query and return the rows. Use this for aggregates (COUNT, AVG, GROUP BY ...)
+    so the database does the calculation. Use the SQL dialect of the target database.
+    max_rows: row budget (max 1000). timeout: seconds before the query is stopped.
+    format: pretty | tsv | json (tsv is the most compact). max_bytes: output size budget."""
+    return await DB_EXECUTOR.run(_run_query, database, sql, max_rows, timeout, format, max_bytes, truncate)
+
+
+def _stream_query(database: str, query: str, max_rows: int, timeout: int, byte_budget: int):
+    """검증된 SELECT를 읽기 전용으로 실행 - (헤더, 행, 중단 사유, 경과 시간, 실행 계획 안내 문구)
+
+    서버 측 커서로 조금씩 가져오면서 행 수/크기/시간 예산을 넘으면 중단합니다 (stream_select).
+    """
+    engine = ENGINES.get(database)
+    db_type = detect_db_type(DB_CONNECTIONS[database]["url"])
+    
+    # 행 수 제한(max_rows)까지만 읽으므로 정렬/집계가 없는 계획은 그만큼만 읽는다고 봄
+    query, params, guard_note = guarded_sql(database, engine, db_type, query, limit=max_rows)
+    
+    started = time.monotonic()
+    with engine.connect() as conn:
+        headers, rows, stopped = stream_select(conn, db_type, query, params, max_rows, timeout, byte_budget)
+        conn.rollback()
+    
+    telemetry.count("db.rows", len(rows))
+    return headers, rows, stopped, time.monotonic() - started, guard_note
+
+
+def _run_query(database: str, sql: str, max_rows: int = 200, timeout: int = 30,
+               format: str = "", max_bytes: int = 0, truncate: str = "") -> str:
+    if database not in DB_CONNECTIONS:
+        return f"Database '{database}' not found"
+    
+    try:
+        fmt = resolve_format(format)
+        column_limits = parse_column_limits(truncate)
+        query = validate_select(sql)
+    except ValueError as e:
+        return f"❌ {str(e)}"
+    
+    max_rows = max(1, min(max_rows, 1000))
+    timeout = max(1, min(timeout, 300))
+    byte_budget = max_bytes or RESULT_MAX_BYTES
+    
+    try:
+        headers, rows, stopped, elapsed, guard_note = _stream_query(database, query, max_rows, timeout, byte_budget)
+        if not rows:
+            return f"Query returned no rows ({elapsed:.2f}s)" + (f"\n{guard_note}" if guard_note else "")
+        
+        body, shown = format_rows(headers, rows, fmt, max_bytes=byte_budget, column_limits=column_limits)
+        if shown < len(rows) and not stopped:
+            stopped = f"size budget ({byte_budget:,} bytes)"
+        
+        if fmt == "pretty":
+            output = f"📊 Query Result ({shown} row(s), {elapsed:.2f}s):\n\n"
+        else:
+            output = f"{shown} row(s), {elapsed:.2f}s\n"
+        output += body
+        if stopped:
+            output += f"\n⚠️ Output stopped at the {stopped}. Add filters or aggregate in SQL to reduce the result."
+        if guard_note:
+            output += f"\n{guard_note}"
+        return output
+        
+    except PlanRejected as e:
+        return (f"❌ Query not run: {e}. "
+                f"Add a selective WHERE clause on an indexed column or aggregate a smaller range")
+    except Exception as e:
+        return f"Query error: {str(e)}"
+
+
+# Tool 12: 여러 DB 동시 조회
+@mcp.tool()
+async def query_databases(sql: str = "", table: str = "", databases: str = "", max_rows: int = 50,
+                          timeout: int = 15, format: str = "", max_bytes: int = 0, truncate: str = "") -> str:
+    """Run the same read on several databases at once and merge the rows into one table with a source_db column.
+    Give either sql (a SELECT valid on every target) or table (reads rows from that table on each database).
+    databases: comma separated names (default: all). timeout: seconds per database;
+    databases that fail or time out are reported and the other results are still returned.
+    format: pretty | tsv | json (tsv is the most compact). max_bytes: output size budget."""
+    targets = [name.strip() for name in databases.split(',') if name.strip()] or list(DB_CONNECTIONS)
+    unknown = [name for name in targets if name not in DB_CONNECTIONS]
+    if unknown:
+        return f"Database '{unknown[0]}' not found"
+    if bool(sql.strip()) == bool(table.strip()):
+        return "Provide either sql or table (not both)"
+    
+    try:
+        fmt = resolve_format(format)
+        column_limits = parse_column_limits(truncate)
+        query = validate_select(sql) if sql.strip() else None
+    except ValueError as e:
+        return f"❌ {str(e)}"
+    
+    max_rows = max(1, min(max_rows, 1000))
+    timeout = max(1, min(timeout, 300))
+    byte_budget = max_bytes or RESULT_MAX_BYTES
+    
+    async def admitted(database):
+        async with ADMISSION.admit(database, "read", CLIENT_SESSION.get(), admission_settings(database)) as waited:
+            telemetry.count("queue_ms", waited * 1000)
+            # 자리를 기다린 시간만큼 DB 쪽 문장 제한 시간도 줄임
+            remaining = max(1, int(timeout - waited))
+            return await DB_EXECUTOR.run(_fanout_query, database, query, table.strip(), max_rows, remaining,
+                                         byte_budget)
+    
+    async def run_one(database):
+        # DB마다 제한 시간을 따로 적용 - 느리거나 응답 없는 DB가 전체 결과를 막지 않음
+        # 실행 자리 대기도 같은 제한 시간 안에 포함해야 도구 전체 제한 시간(timeout + 5초)을 넘지 않음
+        try:
+            return await asyncio.wait_for(admitted(database), timeout=timeout)
+        except asyncio.TimeoutError:
+            return f"timed out after {timeout}s"
+        except AdmissionRejected as e:
+            return f"{e} (retry later)"
+        except Exception as e:
+            return str(e).splitlines()[0] if str(e) else type(e).__name__
+    
+    started = time.monotonic()
+    results = await asyncio.gather(*(run_one(database) for database in targets))
+    elapsed = time.monotonic() - started
+    
+    # 컬럼은 대소문자를 무시하고 합침 (Oracle은 대문자 컬럼명)
+    headers, positions = ["source_db"], {}
+    merged, status = [], []
+    stopped, guard_notes = [], []
+    for database, result in zip(targets, results):
+        if isinstance(result, str):
+            status.append(f"❌ {database}: {result}")
+            continue
+        db_headers, rows, db_stopped, db_elapsed, guard_note = result
+        status.append(f"✅ {database}: {len(rows)} row(s), {db_elapsed:.2f}s")
+        if db_stopped:
+            stopped.append(f"{database} ({db_stopped})")
+        if guard_note:
+            guard_notes.append(f"{database}: {guard_note}")
+        for header in db_headers:
+            if header.lower() not in positions:
+                positions[header.lower()] = len(headers)
+                headers.append(header)
+        index = [positions[header.lower()] for header in db_headers]
+        for row in rows:
+            values = [database] + [None] * (len(headers) - 1)
+            for pos, val in zip(index, row):
+                values[pos] = val
+            merged.append(values)
+    merged = [row + [None] * (len(headers) - len(row)) for row in merged]
+    
+    succeeded = sum(1 for result in results if not isinstance(result, str))
+    if fmt == "pretty":
+        output = f"📊 Results from {succeeded}/{len(targets)} database(s) ({elapsed:.2f}s):\n"
+    else:
+        output = f"{succeeded}/{len(targets)} database(s), {len(merged)} row(s), {elapsed:.2f}s\n"
+    output += "\n".join(status) + "\n\n"
+    
+    if merged:
+        body, shown = format_rows(headers, merged, fmt, max_bytes=byte_budget, column_limits=column_limits)
+        output += body
+        if shown < len(merged):
+            output += f"... {len(merged) - shown} more row(s) not shown (output size limit)\n"
+    else:
+        output += "No rows returned\n"
+    if stopped:
+        output += f"\n⚠️ Output stopped early for: {', '.join(stopped)}"
+    for note in guard_notes:
+        output += f"\n{note}"
+    return output
+
+
+def _fanout_query(database: str, query: str, table: str, max_rows: int, timeout: int, byte_budget: int):
+    """query_databases의 DB 하나 - table이 주어지면 DB별 문법으로 SELECT 생성"""
+    if query is None:
+        resolved = SCHEMA_CACHE.resolve_table(database, table)
+        if resolved is None:
+            raise ValueError(f"table '{table}' not found")
+        engine = ENGINES.get(database)
+        db_type = detect_db_type(DB_CONNECTIONS[database]["url"])
+        query = select_sql(db_type, "*", engine.dialect.identifier_preparer.quote(resolved), limit=max_rows)
+    return _stream_query(database, query, max_rows, timeout, byte_budget)
+
+
+# Tool 13: 질문과 관련된 테이블/컬럼 찾기
+@mcp.tool()
+async def find_schema(question: str, top_k: int = 5, database: str = "") -> str:
+    """Find the tables and columns most relevant to a question, across all databases (or one database).
+    Use this first instead of listing every table; then query the suggested tables."""
+    return await DB_EXECUTOR.run(_find_schema, question, top_k, database)
+
+
+def _sync_schema_index(database: str) -> dict:
+    """DB 스키마(컬럼, 설명, 샘플 값)를 검색 인덱스에 반영 - 바뀐 문서만 다시 임베딩"""
+    engine = ENGINES.get(database)
+    db_type = detect_db_type(DB_CONNECTIONS[database]["url"])
+    quote = engine.dialect.identifier_preparer.quote
+    
+    tables = {}
+    for table in SCHEMA_CACHE.table_names(database):
+        columns = [{"name": col['name'], "type": str(col['type']), "samples": []}
+                   for col in SCHEMA_CACHE.columns(database, table)]
+        if SCHEMA_SAMPLE_ROWS > 0:
+            try:
+                sql = select_sql(db_type, "*", quote(table), limit=SCHEMA_SAMPLE_ROWS)
+                _, rows = cached_query(database, engine, sql, None, [table])
+                for idx, col in enumerate(columns):
+                    col["samples"] = [str(row[idx])[:30] for row in rows if row[idx] is not None]
+            except Exception:
+                pass
+        tables[table] = columns
+    
+    info = DB_CONNECTIONS[database]
+    docs = schema_documents(database, info.get("description", ""), tables, info.get("descriptions"))
+    stats = SCHEMA_INDEX.sync(database, docs)
+    SCHEMA_INDEX_SYNCED[database] = time.monotonic()
+    return stats
+
+
+def _find_schema(question: str, top_k: int = 5, database: str = "") -> str:
+    if database and database not in DB_CONNECTIONS:
+        return f"Database '{database}' not found"
+    top_k = max(1, min(top_k, 20))
+    
+    try:
+        # 스키마 캐시 TTL이 지났거나 DDL이 있었던 DB만 다시 동기화
+        errors = []
+        for name in ([database] if database else list(DB_CONNECTIONS)):
+            synced = SCHEMA_INDEX_SYNCED.get(name)
+            if synced is not None and time.monotonic() - synced < SCHEMA_CACHE.ttl:
+                continue
+            try:
+                _sync_schema_index(name)
+            except Exception as e:
+                errors.append(f"{name}: {str(e).splitlines()[0]}")
+        
+        matches = SCHEMA_INDEX.search(question, top_k, database or None)
+        if not matches:
+            output = f"No matching tables found for '{question}'"
+        else:
+            output = f"🔎 Relevant tables for '{question}':\n\n"
+            for idx, match in enumerate(matches, 1):
+                output += f"{idx}. {match['database']}.{match['table']} (score {match['score']:.2f})\n"
+                if match["columns"]:
+                    output += "   columns: " + ", ".join(f"{col} {col_type}".strip()
+                                                      for col, col_type, _ in match["columns"]) + "\n"
+        if errors:
+            output += "\n⚠️ Skipped (unavailable): " + "; ".join(errors) + "\n"
+        return output
+        
+    except Exception as e:
+        return f"Schema search error: {str(e)}"
+
+
+# Tool 14: 스키마 캐시 새로고침
+@mcp.tool()
+async def refresh_schema(database: str) -> str:
+    """Reload cached table and column metadata, e.g. after the schema was changed outside this server"""
+    return await DB_EXECUTOR.run(_refresh_schema, database)
+
+
+def _refresh_schema(database: str) -> str:
+    if database not in DB_CONNECTIONS:
+        return f"Database '{database}' not found"
+    
+    try:
+        invalidate_schema(database)
+        tables = SCHEMA_CACHE.table_names(database)
+        return f"🔄 Schema cache refreshed for '{database}' ({len(tables)} tables)"
+    except Exception as e:
+        return f"Refresh error: {str(e)}"
+
+
+# Tool 15: 서버 상태 (커넥션 풀 통계)
+@mcp.tool()
+async def server_status() -> str:
+    """Show connection pool status for each database"""
+    ENGINES.evict_idle()
+    pools = ENGINES.stats()
+
+    result = "🖥️ Server status:\n\n"
+    result += "Connection pools:\n"
+    if not pools:
+        result += "  (no database has been used yet)\n"
+    for name, info in pools.items():
+        settings = ENGINES.pool_settings(name)
+        result += f"  • {name} [{info['pool_class']}]\n"
+        if "checkedout" in info:
+            result += (f"    in use: {info['checkedout']}, idle: {info['checkedin']}, "
+                       f"overflow: {info['overflow']} "
+                       f"(size {settings['pool_size']} + max overflow {settings['max_overflow']})\n")
+        result += f"    age: {info['age_sec']}s, idle for: {info['idle_sec']}s\n"
+
+    schema = SCHEMA_CACHE.stats()
+    result += "\nSchema cache:\n"
+    result += (f"  entries: {schema['entries']}/{schema['max_entries']}, ttl: {schema['ttl_sec']}s, "
+               f"hits: {schema['hits']}, misses: {schema['misses']}\n")
+
+    cache = RESULT_CACHE.stats()
+    result += "\nResult cache:\n"
+    if not cache["enabled"]:
+        result += "  disabled (MCP_RESULT_CACHE_TTL=0)\n"
+    else:
+        result += (f"  entries: {cache['entries']}/{cache['max_entries']}, "
+                   f"size: {cache['bytes'] / 1024:,.0f}/{cache['max_bytes'] / 1024:,.0f} KB, ttl: {cache['ttl_sec']}s\n"
+                   f"  hits: {cache['hits']}, misses: {cache['misses']} (hit rate {cache['hit_rate']:.0%}), "
+                   f"invalidations: {cache['invalidations']}\n")
+
+    guard = PLAN_GUARD.stats()
+    result += "\nQuery plan guard:\n"
+    if guard["action"] == "off":
+        result += "  disabled (MCP_EXPLAIN_ACTION=off)\n"
+    else:
+        result += (f"  action: {guard['action']}, max rows: {guard['max_rows']:,}"
+                   + (f", max cost: {guard['max_cost']:,.0f}" if guard['max_cost'] else "") + "\n"
+                   f"  checks: {guard['checks']} (cached {guard['hits']}), rejected: {guard['rejected']}, "
+                   f"rewritten: {guard['rewritten']}, warnings: {guard['warnings']}, explain errors: {guard['errors']}\n")
+    
+    index = SCHEMA_INDEX.stats()
+    result += "\nSchema search index:\n"
+    result += (f"  embedder: {index['embedder']}, documents: {index['documents']}, "
+               f"synced databases: {len(SCHEMA_INDEX_SYNCED)}\n")
+
+    result += "\nStartup:\n"
+    result += (f"  imports: {STARTUP['imports']:.3f}s, config: {STARTUP['config']:.3f}s, "
+               f"ready: {STARTUP.get('ready', 0):.3f}s\n")
+    if PREWARM:
+        prewarm = STARTUP.get("prewarm")
+        result += "  prewarm: " + (", ".join(f"{name} {value}" for name, value in prewarm.items())
+                                   if prewarm else "running") + "\n"
+
+    executor = DB_EXECUTOR.stats()
+    result += "\nExecutor:\n"
+    result += (f"  workers: {executor['max_workers']}, concurrency limit: {executor['max_concurrency']}\n"
+               f"  running: {executor['active']}, waiting: {executor['waiting']}, "
+               f"completed: {executor['completed']}, cancelled: {executor['cancelled']}\n"
+               f"  tool timeout: {TOOL_TIMEOUT:g}s"
+               + "".join(f", {name} {value:g}s" for name, value in sorted(TOOL_TIMEOUTS.items())) + "\n")
+
+    admission = ADMISSION.stats()
+    result += "\nAdmission (per database):\n"
+    if not admission:
+        result += "  (no database call yet)\n"
+    for name, lanes in admission.items():
+        for lane, info in lanes.items():
+            result += (f"  • {name} {lane}: running {info['running']}/{info['limit']}, "
+                       f"waiting {info['waiting']}/{info['max_queue']} ({info['sessions_waiting']} session(s)), "
+                       f"admitted: {info['admitted']}, rejected: {info['rejected']}, timeouts: {info['timeouts']}, "
+                       f"wait p50/p95: {info['wait_ms']['p50']:.0f}/{info['wait_ms']['p95']:.0f} ms\n")
+    return result
+
+
+# Tool 16: 도구별 지표
+@mcp.tool()
+async def get_metrics(format: str = "json") -> str:
+    """Show per-tool metrics of this server: calls, errors, latency percentiles, SQL round trips,
+    SQL time, rows fetched, formatting time and bytes returned.
+    format: json | prometheus (Prometheus text exposition)."""
+    if format == "prometheus":
+        return TOOL_METRICS.prometheus() + ADMISSION.prometheus()
+    return json.dumps({"uptime_sec": round(time.perf_counter() - _STARTED, 3), "tools": TOOL_METRICS.snapshot(),
+                       "admission": ADMISSION.stats()}, ensure_ascii=False, indent=2)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request):
+    """HTTP 모드에서 Prometheus가 수집하는 엔드포인트"""
+    from starlette.responses import PlainTextResponse
+    return PlainTextResponse(TOOL_METRICS.prometheus() + ADMISSION.prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# Tool 17: 테이블 컬럼 통계
+@mcp.tool()
+async def profile_table(database: str, table: str, columns: str = "", top_k: int = 5, buckets: int = 10,
+                        sample_percent: float = 0, format: str = "") -> str:
+    """Summarize the columns of a table with statistics computed inside the database:
+    row count, nulls, distinct values, min/max, mean, most frequent values and a histogram of numeric columns.
+    Use this instead of show_data for questions about averages, ranges or value distributions.
+    columns: comma separated (default: all). top_k: frequent values per column. buckets: histogram buckets.
+    sample_percent: 0 = sample large tables automatically, 100 = always read the whole table.
+    format: pretty | tsv | json."""
+    return await DB_EXECUTOR.run(_profile_table, database, table, columns, top_k, buckets, sample_percent, format)
+
+
+def _profile_table(database: str, table: str, columns: str = "", top_k: int = 5, buckets: int = 10,
+                   sample_percent: float = 0, format: str = "") -> str:
+    if database not in DB_CONNECTIONS:
+        return f"Database '{database}' not found"
+
+    try:
+        fmt = resolve_format(format)
+    except ValueError as e:
+        return str(e)
+
+    top_k = max(0, min(top_k, 20))
+    buckets = max(0, min(buckets, 20))
+
+    try:
+        engine = ENGINES.get(database)
+        db_type = detect_db_type(DB_CONNECTIONS[database]["url"])
+
+        resolved = SCHEMA_CACHE.resolve_table(database, table)
+        if resolved is None:
+            return f"Table '{table}' not found in database '{database}'"
+        table = resolved
+
+        if columns:
+            selected = []
+            for name in columns.split(','):
+                col_info = SCHEMA_CACHE.resolve_column(database, table, name.strip())
+                if col_info is None:
+                    return f"Column '{name.strip()}' not found in table '{table}'"
+                selected.append(col_info)
+        else:
+            selected = SCHEMA_CACHE.columns(database, table)
+        truncated = len(selected) > PROFILE_MAX_COLUMNS
+        selected = selected[:PROFILE_MAX_COLUMNS]
+
+        # 표본 비율: 0이면 카탈로그 추정 행 수로 자동 결정
+        total, total_kind = cached_row_counts(database, engine, db_type, [table]).get(table, (None, None))
+        if sample_percent and sample_percent > 0:
+            percent = sample_percent if sample_percent < 100 else None
+        else:
+            percent = sample_percent_for(total)
+
+        quote = engine.dialect.identifier_preparer.quote
+
+        def load():
+            with engine.connect() as conn:
+                with read_only(conn, db_type), statement_timeout(conn, db_type, PROFILE_TIMEOUT):
+                    profile = profile_columns(conn, db_type, quote, table, selected, top_k, buckets, percent)
+                conn.rollback()
+            return profile
+
+        # 쓰기가 있으면 invalidate_table()로 함께 무효화됨
+        params = {"columns": [col['name'] for col in selected], "top_k": top_k, "buckets": buckets,
+                  "percent": percent}
+        profile = RESULT_CACHE.get_or_load(database, f"PROFILE {table}", params, [table], load)
+
+        output = format_profile(profile, fmt, total, total_kind)
+        if truncated:
+            output += f"\n⚠️ Only the first {PROFILE_MAX_COLUMNS} columns were profiled. Use columns=... for the rest."
+        return output
+
+    except Exception as e:
+        return f"Profile error: {str(e)}"
+
+
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Database MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"],
+                        default=os.environ.get("MCP_TRANSPORT", "stdio"),
+                        help="stdio: 클라이언트가 실행하는 프로세스, streamable-http/sse: 여러 클라이언트가 공유하는 서버")
+    parser.add_argument("--host", default=os.environ.get("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("MCP_PORT", "8000")))
+    args = parser.parse_args()
+    
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    # langchain-mcp-adapters는 도구 호출마다 새 세션을 열므로 세션 상태를 보관하지 않음
+    mcp.settings.stateless_http = True
+    try:
+        mcp.run(transport=args.transport)
+    finally:
+        DB_EXECUTOR.shutdown()
+        ENGINES.dispose_all()
\ No newline at end of file
@@ -0,0 +1,217 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from db_schema_index import HashingEmbedder, tokenize
+
+# 의미 기반 캐시 설정 (환경 변수로 변경 가능, 크기 0이면 사용 안 함)
+CHAT_SEMANTIC_CACHE_SIZE = int(os.environ.get("CHAT_SEMANTIC_CACHE_SIZE", "200"))
+CHAT_SEMANTIC_CACHE_TTL = float(os.environ.get("CHAT_SEMANTIC_CACHE_TTL", "3600"))
+CHAT_SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("CHAT_SEMANTIC_CACHE_THRESHOLD", "0.9"))
+
+# 데이터를 변경하는 도구 - 계획에 포함되면 캐시하지 않고, 호출되면 해당 테이블 항목을 무효화
+WRITE_TOOLS = {"add_data", "bulk_insert", "delete_data", "update_data", "create_table"}
+
+_TABLE_ARGS = ("table", "table1", "table2", "table_name")
+_SQL_TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+([\w."\[\]`]+)', re.IGNORECASE)
+_LITERAL_PATTERN = re.compile(r"'[^']*'|\"[^\"]*\"|\d+(?:\.\d+)?")
+
+# 한국어 조사/높임 어미 - 같은 질문의 표현 차이가 임베딩에 영향을 주지 않도록 제거
+_PARTICLE_PATTERN = re.compile(r"(?<=[가-힣])(?:으로|에서|에게|까지|부터|이랑|하고|을|를|이|가|은|는|의|에|로|도|만|과|와)(?=\s|$)")
+_ENDING_PATTERN = re.compile(r"(?:주세요|주실래요|줄래요?|줘요|주라)(?=[\s?.!]*$)")
+
+# 식별자 비교에서 제외하는 단어 - 서술어 어미, 의문사/수식어, 요청 표현 (이름이 아님)
+_PREDICATE_PATTERN = re.compile(r"(?:줘|해|야|요|니|까|죠|래|어)$")
+_STOPWORDS = {
+    "뭐", "무엇", "몇", "어떤", "무슨", "어느", "모든", "전체", "각", "가장", "좀", "얼마", "얼마나", "총",
+    "목록", "리스트", "정보", "데이터",
+    "the", "a", "an", "of", "in", "on", "from", "for", "to", "and", "or", "me", "all", "with", "by",
+    "is", "are", "what", "which", "how", "many", "show", "list", "please",
+}
+
+
+def normalize_question(question: str) -> str:
+    """임베딩 전 질문 정규화 (조사 제거, '보여주세요' -> '보여줘')"""
+    question = _ENDING_PATTERN.sub("줘", question.strip())
+    return _PARTICLE_PATTERN.sub("", question)
+
+
+def plan_tables(tool_calls: list) -> set:
+    """도구 호출 계획이 읽거나 쓰는 (database, table) 목록 - database를 모르면 '*'"""
+    tables = set()
+    for call in tool_calls:
+        args = call.get("args", {})
+        database = args.get("database") or "*"
+        names = [args[key] for key in _TABLE_ARGS if args.get(key)]
+        names += [name for name in str(args.get("extra_tables", "")).split(",") if name.strip()]
+        names += _SQL_TABLE_PATTERN.findall(args.get("sql") or "")
+        for name in names:
+            name = name.strip().strip('"[]`').split(".")[-1].strip('"[]`')
+            if name:
+                tables.add((database, name.lower()))
+    return tables
+
+
+def question_literals(question: str) -> tuple:
+    """숫자/따옴표 값 - 이 값이 다르면 비슷한 질문이라도 계획을 재사용하지 않음 (예: 5명 vs 10명)"""
+    return tuple(sorted(_LITERAL_PATTERN.findall(question)))
+
+
+def question_identifiers(question: str) -> tuple:
+    """이름으로 보이는 단어 - 이 단어가 다르면 비슷한 질문이라도 계획을 재사용하지 않음
+
+    DB/테이블/컬럼 이름이나 학과명 하나만 다른 질문은 임베딩 유사도가 threshold를 넘으므로
+    (예: postgres DB vs oracle DB, 컴퓨터공학과 vs 전자공학과) 정확히 같아야 합니다.
+    영문 단어는 모두(이름은 대부분 영문), 한글은 조사를 뗀 뒤 서술어와 의문사가 아닌 단어를 사용합니다.
+    """
+    identifiers = set()
+    for token in tokenize(normalize_question(question)):
+        if token.isdigit() or token in _STOPWORDS:
+            continue
+        if "가" <= token[0] <= "힣" and _PREDICATE_PATTERN.search(token):
+            continue
+        identifiers.add(token)
+    return tuple(sorted(identifiers))
+
+
+class SemanticCache:
+    """비슷한 질문에 대해 이전 도구 호출 계획을 재사용하는 캐시
+
+    질문의 임베딩이 threshold 이상으로 비슷하고 숫자/따옴표 값과 이름(DB, 테이블, 컬럼, 학과명 등)이
+    같으면 캐시 적중으로 보고,
+    LLM이 다시 계획을 세우는 대신 저장된 도구 호출을 최신 데이터로 다시 실행합니다.
+    쓰기 도구가 포함된 계획이나 이전 결과에 이어지는 계획(cursor 인자)은 저장하지 않으며,
+    쓰기 도구가 호출되면 해당 테이블을 사용하는 항목을 제거합니다. 질문 텍스트만으로 비교하므로
+    이전 대화에 의존하는 질문("다음 페이지", "그 중 3학년만")에는 사용하지 않아야 합니다 (host는
+    대화의 첫 질문만 조회/저장).
+    """
+
+    def __init__(self, max_entries: int = CHAT_SEMANTIC_CACHE_SIZE, ttl: float = CHAT_SEMANTIC_CACHE_TTL,
+                 threshold: float = CHAT_SEMANTIC_CACHE_THRESHOLD, embedder=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.embedder = embedder or HashingEmbedder()
+        self._entries = OrderedDict()   # 질문 -> 항목
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.replay_failures = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def lookup(self, question: str):
+        """가장 비슷한 항목 반환 (없으면 None) - 반환값의 "similarity"에 유사도"""
+        if not self.enabled:
+            return None
+        vector = self.embedder.embed([normalize_question(question)])[0]
+        literals = question_literals(question)
+        identifiers = question_identifiers(question)
+        now = time.monotonic()
+        with self._lock:
+            self.lookups += 1
+            best, best_score = None, self.threshold
+            for key, entry in list(self._entries.items()):
+                if entry["expires"] <= now:
+                    del self._entries[key]
+                    self.evictions += 1
+                    continue
+                if entry["literals"] != literals or entry["identifiers"] != identifiers:
+                    continue
+                score = float(vector @ entry["vector"])
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is None:
+                return None
+            self.hits += 1
+            best["hits"] += 1
+            self._entries.move_to_end(best["question"])
+            return dict(best, similarity=best_score)
+
+    def store(self, question: str, tool_calls: list, answer: str, elapsed: float):
+        """에이전트 실행 결과 저장 (쓰기 도구나 페이지 cursor가 있는 계획은 저장하지 않음)"""
+        if not self.enabled or not answer:
+            return
+        if any(call["name"] in WRITE_TOOLS for call in tool_calls):
+            return
+        # cursor는 이전 페이지 결과에 묶인 값이므로 다른 대화에서 재실행하면 엉뚱한 위치를 읽음
+        if any(call.get("args", {}).get("cursor") for call in tool_calls):
+            return
+        plan = [{"name": call["name"], "args": call.get("args", {})} for call in tool_calls]
+        entry = {
+            "question": question,
+            "vector": self.embedder.embed([normalize_question(question)])[0],
+            "literals": question_literals(question),
+            "identifiers": question_identifiers(question),
+            "plan": plan,
+            "tables": plan_tables(plan),
+            "answer": answer,
+            "elapsed": elapsed,
+            "expires": time.monotonic() + self.ttl,
+            "hits": 0,
+        }
+        with self._lock:
+            self._entries[question] = entry
+            self._entries.move_to_end(question)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def note_writes(self, tool_calls: list):
+        """쓰기 도구 호출 후 호출 - 해당 테이블을 사용하는 항목 제거"""
+        written = plan_tables([call for call in tool_calls if call["name"] in WRITE_TOOLS])
+        if not written:
+            return
+        def same_table(a, b):
+            # database를 모르는 경우('*')는 테이블 이름만 비교
+            return a[1] == b[1] and (a[0] == b[0] or "*" in (a[0], b[0]))
+
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if any(same_table(used, write) for used in entry["tables"] for write in written):
+                    del self._entries[key]
+                    self.invalidations += 1
+
+    async def replay(self, entry: dict, tools: list) -> list:
+        """저장된 계획을 다시 실행해 [(도구 호출, 결과), ...] 반환 (실패 시 항목 제거 후 예외)"""
+        by_name = {tool.name: tool for tool in tools}
+        results = []
+        try:
+            for call in entry["plan"]:
+                if call["name"] not in by_name:
+                    raise LookupError(f"tool '{call['name']}' is not available")
+                results.append((call, await by_name[call["name"]].ainvoke(call["args"])))
+        except Exception:
+            with self._lock:
+                self.replay_failures += 1
+                self._entries.pop(entry["question"], None)
+            raise
+        return results
+
+    def record_saving(self, seconds: float):
+        with self._lock:
+            self.saved_seconds += max(0.0, seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "replay_failures": self.replay_failures,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "saved_seconds": self.saved_seconds,
+            }
+
+
+# 프로세스 전체에서 공유 (Streamlit의 모든 세션)
+SEMANTIC_CACHE = SemanticCache()
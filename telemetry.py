@@ -0,0 +1,289 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 지연 시간 히스토그램 구간(초) - Prometheus 기본값에 긴 쿼리용 구간 추가
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 도구별 누적 카운터 (span 속성 이름 -> Prometheus 지표 이름, 설명)
+COUNTERS = {
+    "db.round_trips": ("db_round_trips_total", "SQL statements sent to the database"),
+    "db.sql_ms": ("db_sql_seconds_total", "Time spent executing SQL statements"),
+    "db.rows": ("rows_fetched_total", "Rows fetched from the database"),
+    "format_ms": ("format_seconds_total", "Time spent formatting results"),
+    "bytes": ("bytes_returned_total", "Bytes returned to the client"),
+}
+
+_CURRENT = contextvars.ContextVar("telemetry_span", default=None)
+_COUNT_LOCK = threading.Lock()   # 병렬 DB 작업이 같은 부모 span에 동시에 더하는 경우
+
+
+class Span:
+    """하나의 작업 구간 - 같은 trace의 span은 spans 목록을 공유
+
+    attributes의 숫자 값은 count()로 누적되며, 부모 span에도 함께 더해지므로
+    최상위 span에서 하위 작업 전체의 SQL 횟수/시간을 볼 수 있습니다.
+    """
+
+    def __init__(self, name: str, trace_id: str, parent=None, parent_id: str = None, spans: list = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.parent_id = parent.span_id if parent is not None else parent_id
+        self.spans = spans if spans is not None else []
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        self.attributes = {}
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent 형식 - 다른 프로세스로 trace를 이어갈 때 사용"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self):
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self._started) * 1000
+            self.spans.append(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": dict(self.attributes),
+        }
+
+
+def parse_traceparent(value: str):
+    """'00-<trace_id>-<span_id>-<flags>' -> (trace_id, span_id), 형식이 다르면 None"""
+    parts = (value or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def current_span():
+    return _CURRENT.get()
+
+
+@contextmanager
+def span(name: str, traceparent: str = None, **attributes):
+    """현재 span의 하위 span 생성 (현재 span이 없으면 traceparent 또는 새 trace로 시작)"""
+    parent = _CURRENT.get()
+    if parent is not None:
+        new = Span(name, parent.trace_id, parent=parent, spans=parent.spans)
+    else:
+        remote = parse_traceparent(traceparent)
+        if remote:
+            new = Span(name, remote[0], parent_id=remote[1])
+        else:
+            new = Span(name, os.urandom(16).hex())
+    new.attributes.update(attributes)
+    token = _CURRENT.set(new)
+    try:
+        yield new
+    except BaseException as e:
+        new.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _CURRENT.reset(token)
+        new.end()
+
+
+def count(key: str, value: float = 1):
+    """현재 span과 그 부모 span들의 속성 값에 더함 (span이 없으면 무시)"""
+    node = _CURRENT.get()
+    if node is None:
+        return
+    with _COUNT_LOCK:
+        while node is not None:
+            node.attributes[key] = node.attributes.get(key, 0) + value
+            node = node.parent
+
+
+@contextmanager
+def timed(key: str):
+    """블록 실행 시간(ms)을 현재 span의 key 속성에 누적"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        count(key, (time.perf_counter() - started) * 1000)
+
+
+def install_sqlalchemy_hooks():
+    """모든 Engine의 SQL 실행 횟수/시간을 실행 중인 span에 기록 (한 번만 등록)"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if getattr(install_sqlalchemy_hooks, "installed", False):
+        return
+    install_sqlalchemy_hooks.installed = True
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("telemetry_started", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("telemetry_started")
+        if started:
+            count("db.sql_ms", (time.perf_counter() - started.pop()) * 1000)
+        count("db.round_trips")
+
+
+class Histogram:
+    """누적 구간 히스토그램 (Prometheus histogram과 같은 구간 방식)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 마지막은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """구간 상한값 기준 분위수 추정 (+Inf 구간이면 마지막 상한값)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class ToolMetrics:
+    """도구별 호출 수, 오류 수, 지연 시간 히스토그램, SQL 횟수/시간, 행 수, 반환 바이트"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._tools = {}
+        self._lock = threading.Lock()
+
+    def observe(self, tool: str, seconds: float, attributes: dict = None, error: bool = False):
+        attributes = attributes or {}
+        with self._lock:
+            entry = self._tools.get(tool)
+            if entry is None:
+                entry = self._tools[tool] = {"calls": 0, "errors": 0, "latency": Histogram(self.buckets),
+                                             **{key: 0 for key in COUNTERS}}
+            entry["calls"] += 1
+            entry["errors"] += 1 if error else 0
+            entry["latency"].observe(seconds)
+            for key in COUNTERS:
+                entry[key] += attributes.get(key, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            result = {}
+            for tool, entry in sorted(self._tools.items()):
+                latency = entry["latency"]
+                result[tool] = {
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "latency_ms": {
+                        "mean": latency.sum / latency.count * 1000 if latency.count else 0.0,
+                        "p50": latency.quantile(0.5) * 1000,
+                        "p95": latency.quantile(0.95) * 1000,
+                        "p99": latency.quantile(0.99) * 1000,
+                    },
+                    "db_round_trips": entry["db.round_trips"],
+                    "db_sql_ms": round(entry["db.sql_ms"], 3),
+                    "rows": entry["db.rows"],
+                    "format_ms": round(entry["format_ms"], 3),
+                    "bytes": entry["bytes"],
+                }
+            return result
+
+    def prometheus(self, prefix: str = "mcp_tool") -> str:
+        """Prometheus text exposition 형식"""
+        lines = [f"# HELP {prefix}_calls_total Tool calls",
+                 f"# TYPE {prefix}_calls_total counter"]
+        with self._lock:
+            tools = sorted(self._tools.items())
+            for tool, entry in tools:
+                lines.append(f'{prefix}_calls_total{{tool="{tool}"}} {entry["calls"]}')
+            lines += [f"# HELP {prefix}_errors_total Tool calls that failed",
+                      f"# TYPE {prefix}_errors_total counter"]
+            for tool, entry in tools:
+                lines.append(f'{prefix}_errors_total{{tool="{tool}"}} {entry["errors"]}')
+
+            lines += [f"# HELP {prefix}_latency_seconds Tool call latency",
+                      f"# TYPE {prefix}_latency_seconds histogram"]
+            for tool, entry in tools:
+                latency = entry["latency"]
+                cumulative = 0
+                for bound, n in zip(latency.buckets, latency.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_latency_seconds_bucket{{tool="{tool}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_latency_seconds_bucket{{tool="{tool}",le="+Inf"}} {latency.count}')
+                lines.append(f'{prefix}_latency_seconds_sum{{tool="{tool}"}} {latency.sum:.6f}')
+                lines.append(f'{prefix}_latency_seconds_count{{tool="{tool}"}} {latency.count}')
+
+            for key, (name, description) in COUNTERS.items():
+                lines += [f"# HELP {prefix}_{name} {description}", f"# TYPE {prefix}_{name} counter"]
+                for tool, entry in tools:
+                    value = entry[key] / 1000 if key.endswith("_ms") else entry[key]
+                    lines.append(f'{prefix}_{name}{{tool="{tool}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+
+def turn_breakdown(spans: list) -> dict:
+    """host의 한 턴 span 목록 -> 단계별 소요 시간(ms)
+
+    - llm: 전체 시간 중 도구 호출이 없던 시간 (모델 추론 + 스트리밍)
+    - transport: 클라이언트 도구 호출 시간 - 서버 처리 시간 (세션 연결, stdio 프로세스 시작, 직렬화)
+    - queue / sql / format / server_other: 서버 안에서의 대기, SQL 실행, 결과 형식 변환, 나머지
+    """
+    root = next((s for s in spans if s["name"] == "agent turn"), None)
+    calls = [s for s in spans if s["name"].startswith("mcp call ")]
+    servers = {s["parent_id"]: s for s in spans if s["name"].startswith("tool ")}
+
+    # 병렬 호출은 구간이 겹치므로 합집합 길이로 계산
+    intervals = sorted((s["start"], s["start"] + s["duration_ms"] / 1000) for s in calls)
+    tool_wall, end = 0.0, None
+    for start, stop in intervals:
+        if end is None or start > end:
+            tool_wall += stop - start
+            end = stop
+        elif stop > end:
+            tool_wall += stop - end
+            end = stop
+
+    server_ms = sum(servers[c["span_id"]]["duration_ms"] for c in calls if c["span_id"] in servers)
+    sql_ms = sum(s["attributes"].get("db.sql_ms", 0) for s in servers.values())
+    format_ms = sum(s["attributes"].get("format_ms", 0) for s in servers.values())
+    queue_ms = sum(s["attributes"].get("queue_ms", 0) for s in servers.values())
+    total_ms = root["duration_ms"] if root else sum(c["duration_ms"] for c in calls)
+    return {
+        "total": total_ms,
+        "llm": max(0.0, total_ms - tool_wall * 1000),
+        "transport": max(0.0, sum(c["duration_ms"] for c in calls) - server_ms),
+        "queue": queue_ms,
+        "sql": sql_ms,
+        "format": format_ms,
+        "server_other": max(0.0, server_ms - queue_ms - sql_ms - format_ms),
+        "tool_calls": len(calls),
+        "db_round_trips": sum(s["attributes"].get("db.round_trips", 0) for s in servers.values()),
+        "rows": sum(s["attributes"].get("db.rows", 0) for s in servers.values()),
+        "bytes": sum(s["attributes"].get("bytes", 0) for s in servers.values()),
+    }
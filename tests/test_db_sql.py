@@ -0,0 +1,161 @@
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, exc, text  # noqa: E402
+
+from db_sql import statement_timeout, stream_select  # noqa: E402
+
+
+class _PgCursor:
+    """psycopg2 커서 흉내 - 이름 있는 커서는 PostgreSQL처럼 DECLARE ... CURSOR FOR <문장>으로 실행"""
+
+    def __init__(self, conn, name=None):
+        self.connection = conn
+        self.name = name
+        self.description = None
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        conn = self.connection
+        if self.name:
+            conn.log.append(f"DECLARE {self.name} CURSOR FOR {sql}")
+            if not re.match(r"\s*(SELECT|VALUES|WITH)\b", sql, re.IGNORECASE):
+                raise conn.dbapi.ProgrammingError(f'syntax error at or near "{sql.split()[0]}"')
+        else:
+            conn.log.append(sql)
+
+        lowered = sql.strip().lower()
+        if lowered.startswith("select pg_catalog.version"):
+            self._result([("PostgreSQL 16.0",)])
+        elif lowered.startswith("select current_schema"):
+            self._result([("public",)])
+        elif lowered.startswith("show transaction isolation level"):
+            self._result([("read committed",)])
+        elif lowered.startswith("show standard_conforming_strings"):
+            self._result([("on",)])
+        elif lowered.startswith("set local "):
+            name, value = re.match(r"set local (\w+) = (\d+)", lowered).groups()
+            conn.local[name] = f"{value}ms"
+            self._result(None)
+        elif lowered.startswith("set transaction read only"):
+            conn.local["transaction_read_only"] = "on"
+            self._result(None)
+        elif lowered.startswith("show "):
+            name = lowered.split()[1]
+            self._result([(conn.local.get(name, "0" if name == "statement_timeout" else "off"),)])
+        elif lowered.startswith("select current_setting"):
+            name = re.search(r"current_setting\('(\w+)'\)", lowered).group(1)
+            self._result([(conn.local.get(name, "0" if name == "statement_timeout" else "off"),)])
+        else:
+            self._result([(1, "a"), (2, "b"), (3, "c")], names=("id", "name"))
+
+    def _result(self, rows, names=("value",)):
+        self._rows = list(rows or [])
+        self.description = None if rows is None else [(n, 25, None, None, None, None, None) for n in names]
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        chunk, self._rows = self._rows[:size], self._rows[size:]
+        return chunk
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+class _PgConnection:
+    """SET LOCAL 값은 트랜잭션이 끝나면(commit/rollback) 사라짐"""
+
+    autocommit = False
+    notices = []
+
+    def __init__(self, dbapi):
+        self.dbapi = dbapi
+        self.log = []
+        self.local = {}
+
+    def cursor(self, name=None, **kwargs):
+        return _PgCursor(self, name)
+
+    def commit(self):
+        self.local.clear()
+
+    def rollback(self):
+        self.local.clear()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_pg(monkeypatch):
+    """psycopg2 dialect + 풀 커넥션, 실제 서버 대신 _PgConnection 사용"""
+    psycopg2 = pytest.importorskip("psycopg2")
+    import psycopg2.extras
+    monkeypatch.setattr(psycopg2.extras, "register_uuid", lambda *args, **kwargs: None)
+    conn = _PgConnection(psycopg2)
+    engine = create_engine("postgresql+psycopg2://", creator=lambda: conn, use_native_hstore=False)
+    yield engine, conn
+    engine.dispose()
+
+
+def test_stream_select_declares_only_the_select(fake_pg):
+    engine, conn = fake_pg
+    with engine.connect() as c:
+        headers, rows, stopped = stream_select(c, 'PostgreSQL', "SELECT id, name FROM t", {}, 2, 5, 10000)
+        c.rollback()
+    assert headers == ["id", "name"]
+    assert [tuple(row) for row in rows] == [(1, "a"), (2, "b")]
+    assert stopped == "row budget (2 rows)"
+    declared = [sql for sql in conn.log if sql.startswith("DECLARE")]
+    assert len(declared) == 1 and declared[0].endswith("FOR SELECT id, name FROM t")
+    assert "SET TRANSACTION READ ONLY" in conn.log
+
+
+def test_statement_timeout_applies_to_the_streamed_select(fake_pg):
+    engine, conn = fake_pg
+    with engine.connect() as c:
+        _, rows, _ = stream_select(c, 'PostgreSQL', "SELECT current_setting('statement_timeout')", {}, 10, 1.5, 10000)
+        c.rollback()
+        assert rows[0][0] == "1500ms"
+        with statement_timeout(c, 'PostgreSQL', 2):
+            assert c.execute(text("SHOW statement_timeout")).scalar() == "2000ms"
+        c.rollback()
+        assert c.execute(text("SHOW statement_timeout")).scalar() == "0"
+
+
+def test_statement_timeout_interrupts_sqlite():
+    engine = create_engine("sqlite://")
+    slow = ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) "
+            "SELECT COUNT(*) FROM n")
+    with engine.connect() as c:
+        with pytest.raises(exc.OperationalError, match="interrupted"):
+            stream_select(c, 'SQLite', slow, {}, 10, 0.2, 10000)
+
+
+@pytest.mark.skipif(not os.environ.get("MCP_TEST_POSTGRES_URL"), reason="MCP_TEST_POSTGRES_URL not set")
+def test_stream_select_on_postgres():
+    engine = create_engine(os.environ["MCP_TEST_POSTGRES_URL"])
+    try:
+        with engine.connect() as c:
+            _, rows, _ = stream_select(c, 'PostgreSQL', "SELECT current_setting('statement_timeout')",
+                                       {}, 10, 1.5, 10000)
+            c.rollback()
+            assert rows[0][0] == "1500ms"
+            with pytest.raises(exc.OperationalError, match="statement timeout"):
+                stream_select(c, 'PostgreSQL', "SELECT pg_sleep(5)", {}, 10, 0.5, 10000)
+            c.rollback()
+    finally:
+        engine.dispose()
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip("numpy")
+
+from semantic_cache import SemanticCache, normalize_question, question_identifiers  # noqa: E402
+
+PLAN = [{"name": "show_data", "args": {"database": "university_db_postgre", "table": "students", "limit": 10}}]
+
+# 이름 하나만 다른 질문 - 임베딩 유사도는 threshold(0.9)를 넘음
+NAME_PAIRS = [
+    ("university postgres DB에서 컴퓨터공학과 학생들의 이름과 학번과 이메일과 전화번호와 주소를 학년 순서로 정렬해서 보여줘",
+     "university oracle DB에서 컴퓨터공학과 학생들의 이름과 학번과 이메일과 전화번호와 주소를 학년 순서로 정렬해서 보여줘"),
+    ("postgres DB에서 컴퓨터공학과 소속 학생들의 이름, 학번, 이메일, 전화번호, 주소, 입학년도를 학년 순으로 보여줘",
+     "postgres DB에서 전자공학과 소속 학생들의 이름, 학번, 이메일, 전화번호, 주소, 입학년도를 학년 순으로 보여줘"),
+]
+
+
+def _cache(question: str) -> SemanticCache:
+    cache = SemanticCache(max_entries=10, ttl=60, threshold=0.9)
+    cache.store(question, PLAN, "answer", 1.0)
+    return cache
+
+
+@pytest.mark.parametrize("stored, asked", NAME_PAIRS)
+def test_name_change_is_a_miss(stored, asked):
+    cache = _cache(stored)
+    vectors = cache.embedder.embed([normalize_question(stored), normalize_question(asked)])
+    assert float(vectors[0] @ vectors[1]) >= cache.threshold
+    assert question_identifiers(stored) != question_identifiers(asked)
+    assert cache.lookup(asked) is None
+
+
+def test_wording_change_is_a_hit():
+    cache = _cache("컴퓨터공학과 학생 목록을 보여주세요")
+    hit = cache.lookup("컴퓨터공학과 학생 목록 보여줘")
+    assert hit is not None and hit["plan"] == PLAN